@@ -0,0 +1,93 @@
+"""
+浏览器相关开销: WebManager启动、浏览器启动、context和page创建, 以及pre_application各个流程在本地桩服务上的端到端耗时
+
+    $ python -m benchmarks.browserCost --runs 10 --profile ci-fast
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List
+from benchmarks.stubApp import serve_preapp
+from benchmarks.resolverCost import FLOWS
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """把耗时样本(秒)汇总为毫秒统计"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'p50_ms': round(statistics.median(ordered) * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def _timed(action: Callable[[], Any]) -> float:
+    begin = time.perf_counter()
+    action()
+    return time.perf_counter() - begin
+
+
+def measure(runs: int = 10, profile: str = 'ci-fast', browser: str = 'chrome') -> Dict[str, Any]:
+    """
+    Returns:
+        Dict: manager: startup_ms(启动playwright)、launch_ms(预热浏览器池)、context/page/goto的耗时统计;
+            flows: 每个流程在新租用的page上执行的耗时统计(不含打开首页)
+    """
+    from core.webManger import WebManager
+    from pages.application.preApplication import pre_application
+
+    with serve_preapp():
+        begin = time.perf_counter()
+        manager = WebManager(env='bench', browser_type=browser, pool_size=1, profile=profile)
+        startup = time.perf_counter() - begin
+        try:
+            launch = _timed(manager.get_pool)
+            pool = manager.get_pool()
+            context_samples, page_samples, goto_samples = [], [], []
+            for _ in range(runs):
+                begin = time.perf_counter()
+                with pool.lease() as context:
+                    context_samples.append(time.perf_counter() - begin)
+                    begin = time.perf_counter()
+                    page = context.new_page()
+                    page_samples.append(time.perf_counter() - begin)
+                    goto_samples.append(_timed(lambda: page.goto(manager.start_url)))
+
+            flows: Dict[str, Any] = {}
+            for name, kwargs in FLOWS.items():
+                samples = []
+                for _ in range(runs):
+                    with manager.lease_page():
+                        samples.append(_timed(lambda: pre_application(**kwargs)))
+                flows[name] = summarize(samples)
+        finally:
+            manager.close()
+
+    return {
+        'manager': {
+            'startup_ms': round(startup * 1000, 3),
+            'launch_ms': round(launch * 1000, 3),
+            'context': summarize(context_samples),
+            'page': summarize(page_samples),
+            'goto': summarize(goto_samples),
+        },
+        'flows': flows,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='测量浏览器管理器和页面流程的耗时')
+    parser.add_argument('--runs', type=int, default=10, help='每项测量的重复次数')
+    parser.add_argument('--profile', default='ci-fast', help='浏览器启动配置, 见config.yml的launch_profiles')
+    parser.add_argument('--browser', default='chrome', choices=['chrome', 'firefox', 'webkit'])
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.runs, args.profile, args.browser), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+启动耗时基准: 使用 python -X importtime 测量conftest、页面模块和用例模块的导入耗时
+
+超出预算, 或在导入阶段、pytest --collect-only 期间加载了禁止的重型依赖(如playwright)时以非0状态码退出, 可直接接入CI:
+
+    $ python -m benchmarks.importTime --budget-ms 60
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def discover_case_modules() -> List[str]:
+    """cases下所有 test_*.py 用例模块, 新增的用例自动纳入测量"""
+    return ['.'.join(path.relative_to(project_path).with_suffix('').parts)
+            for path in sorted(Path(project_path, 'cases').rglob('test_*.py'))]
+
+
+# 启动阶段需要测量的模块, pytest自身的导入不计入预算
+TARGET_MODULES = ['conftest', 'pages.application.preApplication', *discover_case_modules()]
+# 启动阶段不允许导入的模块, 它们应该在第一次使用时才加载
+FORBIDDEN_MODULES = ['playwright', 'core.webManger', 'colorlog', 'yaml']
+# pytest --collect-only(页面描述校验默认开启)期间不允许导入的模块, 配置文件在添加命令行参数时就需要解析, 不包含yaml
+COLLECT_FORBIDDEN_MODULES = ['playwright', 'core.webManger']
+DEFAULT_BUDGET_MS = 60.0
+
+
+def _imported_modules(stderr: str) -> List[Tuple[str, int]]:
+    """解析 -X importtime 的输出, 返回 (带缩进的模块名, 累计耗时微秒)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name, int(cumulative)))
+    return modules
+
+
+def measure(modules: List[str], runs: int) -> Tuple[Dict[str, float], List[str]]:
+    """
+    在独立的子进程中导入模块, 返回每个模块的累计导入耗时(毫秒, 取多次运行的最小值)以及导入过的全部模块
+    """
+    best: Dict[str, float] = {}
+    imported: List[str] = []
+    code = "import pytest\n" + "".join(f"import {module}\n" for module in modules)
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=project_path,
+                                capture_output=True, text=True, check=True)
+        imported = []
+        for name, cumulative in _imported_modules(result.stderr):
+            imported.append(name.strip())
+            if name.strip() in modules and not name.startswith("  "):
+                cost = cumulative / 1000
+                best[name.strip()] = min(best.get(name.strip(), cost), cost)
+    return best, imported
+
+
+def collect_imports() -> List[str]:
+    """
+    以默认参数运行 pytest --collect-only(包括conftest的各个钩子和页面描述校验的开关), 返回导入过的全部模块
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "pytest", "--collect-only", "-q",
+                             "-p", "no:cacheprovider"], cwd=project_path, capture_output=True, text=True)
+    if result.returncode not in (0, 5):  # 5: 没有收集到用例
+        raise RuntimeError(f"pytest --collect-only 失败:\n{result.stdout[-2000:]}")
+    return [name.strip() for name, _cumulative in _imported_modules(result.stderr)]
+
+
+def _leaked(imported: List[str], forbidden_modules: List[str]) -> List[str]:
+    return sorted({name for name in imported for forbidden in forbidden_modules
+                   if name == forbidden or name.startswith(f"{forbidden}.")})
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='测量项目启动阶段的导入耗时')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='所有目标模块累计导入耗时的上限(毫秒)')
+    parser.add_argument('--runs', type=int, default=5, help='重复测量次数, 取最小值以降低噪声')
+    parser.add_argument('--output', default=None, help='把结果以JSON写入该文件')
+    args = parser.parse_args(argv)
+
+    costs, imported = measure(TARGET_MODULES, args.runs)
+    total = sum(costs.values())
+    leaked = _leaked(imported, FORBIDDEN_MODULES)
+    collect_leaked = _leaked(collect_imports(), COLLECT_FORBIDDEN_MODULES)
+    report = {'modules_ms': costs, 'total_ms': round(total, 3), 'budget_ms': args.budget_ms, 'forbidden': leaked,
+              'collect_forbidden': collect_leaked}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if leaked:
+        print(f"启动阶段导入了应当延迟加载的模块: {', '.join(leaked)}", file=sys.stderr)
+        return 1
+    if collect_leaked:
+        print(f"pytest --collect-only 导入了应当延迟加载的模块: {', '.join(collect_leaked)}", file=sys.stderr)
+        return 1
+    if total > args.budget_ms:
+        print(f"启动导入耗时 {total:.1f}ms 超出预算 {args.budget_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+属性解析器的解释开销: 使用不访问浏览器的模拟Page, 测量执行计划的编译耗时和每个节点的执行耗时
+
+    $ python -m benchmarks.resolverCost --iterations 2000
+"""
+import sys
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+from core.propertyResolver import PropertyResolver
+from core.locatorCache import locator_cache
+
+# 参与测量的页面函数及其覆盖参数
+FLOWS = {
+    'refinance_my_home': {'refinance_my_home': None},
+    'choose_loan_officer': {'choose_loan_officer': None},
+}
+
+
+class Locator:
+    """模拟的Locator, 任何方法调用都立即返回自身"""
+
+    # playwright中以属性形式访问的locator, 如 locator.first
+    _PROPERTIES = frozenset({'first', 'last'})
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self._PROPERTIES:
+            return self
+        return self._call
+
+    def _call(self, *args: Any, **kwargs: Any) -> "Locator":
+        return self
+
+
+class Page:
+    """模拟的Page, 构建locator和执行操作都返回新的模拟Locator"""
+
+    main_frame = object()
+
+    def on(self, event: str, handler: Callable[..., Any]):
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args, **kwargs: Locator()
+
+
+def _per_call_us(action: Callable[[], Any], iterations: int) -> float:
+    begin = time.perf_counter()
+    for _ in range(iterations):
+        action()
+    return round((time.perf_counter() - begin) / iterations * 1_000_000, 3)
+
+
+def measure(iterations: int = 2000) -> Dict[str, Any]:
+    """
+    Returns:
+        Dict: 每个流程的 compile_cold_us(清空计划缓存后编译), compile_warm_us(命中缓存),
+            plan_cold_us / plan_warm_us(整个计划在新page/同一page上执行, 后者命中locator缓存),
+            以及每个节点的 nodes_cold_us / nodes_warm_us
+    """
+    from pages.application.preApplication import pre_application
+    func = pre_application.__wrapped__
+    results: Dict[str, Any] = {}
+    for name, kwargs in FLOWS.items():
+        def compile_cold():
+            PropertyResolver.clear_cache()
+            PropertyResolver.compile(func, **kwargs)
+
+        plan = PropertyResolver.compile(func, **kwargs)
+        page = Page()
+        result = {
+            'nodes': len(plan),
+            'compile_cold_us': _per_call_us(compile_cold, max(1, iterations // 10)),
+            'compile_warm_us': _per_call_us(lambda: PropertyResolver.compile(func, **kwargs), iterations),
+            'plan_cold_us': _per_call_us(lambda: PropertyResolver.execute(Page(), plan), iterations),
+            'plan_warm_us': _per_call_us(lambda: PropertyResolver.execute(page, plan), iterations),
+            'nodes_cold_us': {},
+            'nodes_warm_us': {},
+        }
+        for step in plan:
+            result['nodes_cold_us'][step.node] = _per_call_us(lambda: PropertyResolver.execute(Page(), (step,)),
+                                                              iterations)
+            result['nodes_warm_us'][step.node] = _per_call_us(lambda: PropertyResolver.execute(page, (step,)),
+                                                              iterations)
+        results[name] = result
+    locator_cache.clear()
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='测量属性解析器的解释开销')
+    parser.add_argument('--iterations', type=int, default=2000, help='每项测量的重复次数')
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.iterations), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
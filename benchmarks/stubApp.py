@@ -0,0 +1,33 @@
+"""
+预申请页面的本地静态副本, 只保留pre_application中各个locator依赖的结构, 用于在不访问真实环境的情况下测量完整流程
+"""
+from urllib.parse import urlsplit
+from common.stubServer import StubServer
+from common.readConfig import get_system_config
+
+# 标签之间不能有空白, 否则 has_text 的正则无法整体匹配问题文本
+PREAPP_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>preapp stub</title></head>
+<body>
+<div class="purpose"><div class="purpose-item" onclick="mark(this)">Refinance my home</div></div>
+<div class="check-group"><div class="check-group-box-l"><span class="circle" onclick="mark(this)"></span></div></div>
+<div class="question"><p>Do you currently have a loan officer?</p><span onclick="mark(this)">Yes</span><span onclick="mark(this)">No</span><p>Please select your loan officer</p></div>
+<ul class="officers"><li onclick="mark(this)">Yingjie Yu(yingjie@zeitro.com)</li></ul>
+<button type="button" onclick="mark(this)">Next step</button>
+<input type="email" placeholder="Enter your email address">
+<button type="button" onclick="mark(this)">Continue</button>
+<script>
+function mark(element) { element.setAttribute('data-clicked', String(Date.now())); }
+</script>
+</body>
+</html>
+"""
+
+
+def serve_preapp(env: str = 'bench', system: str = 'application') -> StubServer:
+    """按config.yml中该环境的url_settings启动桩服务, 返回未启动的StubServer"""
+    url_settings = get_system_config(system, env)['url_settings']
+    address = urlsplit(url_settings['url'])
+    path = urlsplit(url_settings.get('path', '/')).path
+    return StubServer(pages={path: PREAPP_HTML}, host=address.hostname, port=address.port)
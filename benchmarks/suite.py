@@ -0,0 +1,110 @@
+"""
+基准测试套件: 依次运行导入耗时、解析器解释开销和浏览器开销的基准, 结果写入JSON并与基线对比
+
+    $ python -m benchmarks.suite --output benchmarks/results/latest.json
+    $ python -m benchmarks.suite --baseline benchmarks/results/baseline.json --tolerance 0.2
+
+与基线对比时, 所有以 _us/_ms 结尾的指标(max_ms除外)都按越小越好处理, 超出基线tolerance比例即视为退化并以非0状态码退出
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Any, Dict, Iterator, List, Tuple
+from benchmarks import importTime, resolverCost
+
+project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _revision() -> str | None:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_path,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def metrics(report: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, float]]:
+    """展开嵌套的结果, 依次返回可用于对比的(指标路径, 值)"""
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from metrics(value, path)
+        elif isinstance(value, (int, float)) and key.endswith(('_us', '_ms')) and not key.startswith('max'):
+            yield path, float(value)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Returns:
+        List[Dict]: 超出基线tolerance比例的指标, 包含 metric、baseline、current、ratio
+    """
+    previous = dict(metrics(baseline.get('results', {})))
+    regressions = []
+    for path, value in metrics(current.get('results', {})):
+        base = previous.get(path)
+        if not base:
+            continue
+        ratio = value / base
+        if ratio > 1 + tolerance:
+            regressions.append({'metric': path, 'baseline': base, 'current': value, 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='运行基准测试套件并与基线对比')
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'results', 'latest.json'),
+                        help='结果JSON的写入路径')
+    parser.add_argument('--baseline', default=None, help='用于对比的基线结果JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许超出基线的比例')
+    parser.add_argument('--iterations', type=int, default=2000, help='解析器基准每项测量的重复次数')
+    parser.add_argument('--runs', type=int, default=10, help='浏览器基准每项测量的重复次数')
+    parser.add_argument('--profile', default='ci-fast', help='浏览器启动配置, 见config.yml的launch_profiles')
+    parser.add_argument('--skip-browser', action='store_true', help='不运行需要浏览器的基准')
+    args = parser.parse_args(argv)
+
+    import_costs, _ = importTime.measure(importTime.TARGET_MODULES, 3)
+    results: Dict[str, Any] = {
+        'import': {'modules_ms': import_costs, 'total_ms': round(sum(import_costs.values()), 3)},
+        'resolver': resolverCost.measure(args.iterations),
+    }
+    if not args.skip_browser:
+        from benchmarks import browserCost
+        results['browser'] = browserCost.measure(args.runs, args.profile)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': _revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'profile': args.profile,
+        },
+        'results': results,
+    }
+    output = os.path.join(project_path, args.output) if not os.path.isabs(args.output) else args.output
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"基准结果已写入 {output}")
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    regressions = compare(report, baseline, args.tolerance)
+    for item in regressions:
+        print(f"{item['metric']}: {item['baseline']} -> {item['current']} (x{item['ratio']})", file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} 项指标超出基线 {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    print("所有指标均在基线范围内")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import json
+import pytest
+from types import SimpleNamespace
+from collections import OrderedDict
+from common.durationScheduler import DEFAULT_DURATION, DurationHistory, DurationScheduling
+
+
+class FakeNode:
+    """只记录分配到的用例下标的worker"""
+
+    def __init__(self, name: str):
+        self.gateway = SimpleNamespace(id=name)
+        self.sent = []
+
+    def send_runtest_some(self, indexes):
+        self.sent.append(indexes)
+
+
+def write_history(path, durations) -> str:
+    path.write_text(json.dumps(durations), encoding='utf-8')
+    return str(path)
+
+
+def make_scheduler(history: DurationHistory, nodes, units):
+    """不启动xdist worker, 直接构造调度器, units为 类 -> 用例名列表"""
+    scheduler = DurationScheduling.__new__(DurationScheduling)
+    scheduler.log = lambda *args: None
+    scheduler.workqueue = OrderedDict(
+        (scope, OrderedDict((f"{scope}::{name}", False) for name in names)) for scope, names in units.items())
+    collection = [nodeid for work_unit in scheduler.workqueue.values() for nodeid in work_unit]
+    scheduler.assigned_work = {node: {} for node in nodes}
+    scheduler.registered_collections = {node: collection for node in nodes}
+    scheduler._history = history
+    scheduler._plan = {}
+    return scheduler, collection
+
+
+@pytest.mark.hermetic
+class TestDurationHistory:
+
+    def test_default_is_median_of_known_durations(self, tmp_path):
+        history = DurationHistory(write_history(tmp_path / 'durations.json', {'a': 1.0, 'b': 3.0, 'c': 10.0}))
+
+        assert history.estimate('a') == 1.0
+        assert history.estimate('unknown') == 3.0
+        assert DurationHistory(str(tmp_path / 'missing.json')).estimate('unknown') == DEFAULT_DURATION
+        (tmp_path / 'broken.json').write_text('{', encoding='utf-8')
+        assert DurationHistory(str(tmp_path / 'broken.json')).estimate('unknown') == DEFAULT_DURATION
+
+    def test_save_smooths_accumulated_duration(self, tmp_path):
+        filepath = write_history(tmp_path / 'durations.json', {'a': 2.0, 'b': 7.0})
+        history = DurationHistory(filepath)
+        # setup/call/teardown三个阶段的耗时累加为一次运行的耗时
+        for duration in (0.5, 3.0, 0.5):
+            history.record('a', duration)
+        history.record('new', 5.0)
+
+        history.save()
+
+        # SMOOTHING=0.5: 0.5 * 4.0 + 0.5 * 2.0, 新用例直接使用本次耗时, 未运行的用例保持不变
+        assert json.loads((tmp_path / 'durations.json').read_text(encoding='utf-8')) == \
+               {'a': 3.0, 'b': 7.0, 'new': 5.0}
+        assert not (tmp_path / 'durations.json.tmp').exists()
+
+
+@pytest.mark.hermetic
+class TestDurationScheduling:
+    # 入队顺序与估计耗时无关, 确认分配顺序来自计划而不是队列顺序
+    UNITS = {'t.py::TestSmall': ['test_1'],
+             't.py::TestLong': ['test_1', 'test_2'],
+             't.py::TestMiddle': ['test_1'],
+             't.py::TestShort': ['test_1']}
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        # 各单元的估计耗时: TestLong 8, TestMiddle 4, TestShort 没有历史记录, 使用中位数3, TestSmall 1
+        return DurationHistory(write_history(tmp_path / 'durations.json', {
+            't.py::TestLong::test_1': 5.0, 't.py::TestLong::test_2': 3.0,
+            't.py::TestMiddle::test_1': 4.0, 't.py::TestSmall::test_1': 1.0, 'other': 0.5}))
+
+    def test_build_plan_is_longest_processing_time_first(self, history):
+        first, second = FakeNode('gw0'), FakeNode('gw1')
+        scheduler, _collection = make_scheduler(history, [first, second], self.UNITS)
+
+        assert scheduler._unit_duration('t.py::TestLong') == 8.0
+        assert scheduler._unit_duration('t.py::TestShort') == 3.0
+        # 8 -> gw0; 4 -> gw1; 3 -> gw1(7); 1 -> gw1(8)
+        assert scheduler._build_plan() == {
+            first: ['t.py::TestLong'],
+            second: ['t.py::TestMiddle', 't.py::TestShort', 't.py::TestSmall']}
+
+    def test_idle_worker_steals_longest_remaining_unit(self, history):
+        first, second = FakeNode('gw0'), FakeNode('gw1')
+        scheduler, collection = make_scheduler(history, [first, second], self.UNITS)
+
+        def assign(node):
+            scheduler._assign_work_unit(node)
+            return [collection[index] for index in node.sent[-1]]
+
+        assert assign(first) == ['t.py::TestLong::test_1', 't.py::TestLong::test_2']
+        assert assign(second) == ['t.py::TestMiddle::test_1']
+        # gw0的计划已经执行完, 从gw1的剩余计划中取走估计耗时最长的单元
+        assert assign(first) == ['t.py::TestShort::test_1']
+        # gw1跳过已被取走的单元
+        assert assign(second) == ['t.py::TestSmall::test_1']
+        assert not scheduler.workqueue
+        assert scheduler.assigned_work[first].keys() == {'t.py::TestLong', 't.py::TestShort'}
@@ -0,0 +1,113 @@
+import os
+import json
+import pickle
+import pytest
+import common.readConfig as read_config
+from common.readConfig import ConfigRegistry
+
+
+class CountingParser:
+    """按json解析配置文件并记录解析次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+
+@pytest.mark.hermetic
+class TestConfigRegistry:
+
+    @pytest.fixture(autouse=True)
+    def isolated(self, tmp_path, monkeypatch):
+        # 快照和内存缓存都是进程级的, 每个用例使用单独的快照文件和空缓存
+        monkeypatch.setattr(read_config, 'snapshot_path', str(tmp_path / 'cache' / 'snapshot.pickle'))
+        monkeypatch.setattr(read_config, 'CACHE_PATH', str(tmp_path / 'cache'))
+        monkeypatch.setattr(ConfigRegistry, '_entries', {})
+        monkeypatch.setattr(ConfigRegistry, '_snapshot', None)
+
+    @pytest.fixture
+    def config(self, tmp_path):
+        path = tmp_path / 'config.json'
+        path.write_text(json.dumps({'wait': {'timeout': 1000}, 'hosts': ['a', 'b']}), encoding='utf-8')
+        return path
+
+    @staticmethod
+    def new_process():
+        """模拟另一个进程: 内存缓存为空, 快照需要重新读取"""
+        ConfigRegistry.clear()
+
+    def test_result_is_read_only(self, config):
+        loaded = ConfigRegistry.load(str(config), CountingParser())
+
+        assert loaded['wait']['timeout'] == 1000
+        assert loaded['hosts'] == ('a', 'b')
+        with pytest.raises(TypeError):
+            loaded['wait']['timeout'] = 0
+        with pytest.raises(TypeError):
+            loaded['new'] = 1
+
+    def test_unchanged_file_is_parsed_once(self, config):
+        parser = CountingParser()
+
+        first = ConfigRegistry.load(str(config), parser)
+
+        assert ConfigRegistry.load(str(config), parser) is first
+        assert parser.calls == 1
+
+    @pytest.mark.parametrize('change', ['mtime', 'size', 'inode'])
+    def test_changed_signature_invalidates_cache(self, config, change):
+        parser = CountingParser()
+        ConfigRegistry.load(str(config), parser)
+        stat = config.stat()
+        if change == 'mtime':
+            os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        elif change == 'size':
+            config.write_text(json.dumps({'wait': {'timeout': 20000}, 'hosts': []}), encoding='utf-8')
+            os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        else:
+            # 编辑器保存时常见的写临时文件再替换, 内容、大小和修改时间都不变, 只有inode变化
+            replacement = config.with_suffix('.tmp')
+            replacement.write_bytes(config.read_bytes())
+            os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(replacement, config)
+            assert config.stat().st_ino != stat.st_ino
+
+        ConfigRegistry.load(str(config), parser)
+
+        assert parser.calls == 2
+
+    def test_snapshot_is_reused_by_other_processes(self, config):
+        ConfigRegistry.load(str(config), CountingParser())
+        self.new_process()
+        parser = CountingParser()
+
+        loaded = ConfigRegistry.load(str(config), parser)
+
+        assert parser.calls == 0
+        assert loaded['wait']['timeout'] == 1000
+
+    def test_stale_snapshot_is_rebuilt(self, config):
+        ConfigRegistry.load(str(config), CountingParser())
+        config.write_text(json.dumps({'wait': {'timeout': 20000}}), encoding='utf-8')
+        self.new_process()
+        parser = CountingParser()
+
+        loaded = ConfigRegistry.load(str(config), parser)
+
+        assert parser.calls == 1
+        assert loaded['wait']['timeout'] == 20000
+        with open(read_config.snapshot_path, 'rb') as file:
+            signature, raw = pickle.load(file)[str(config)]
+        assert signature == ConfigRegistry._signature(str(config))
+        assert raw == {'wait': {'timeout': 20000}}
+
+    def test_launch_profile_names_follow_config(self, tmp_path):
+        config = tmp_path / 'config.yml'
+        config.write_text('launch_profiles:\n  ci-fast: {headless: true}\n  nightly: {headless: true}\n',
+                          encoding='utf-8')
+
+        assert read_config.get_launch_profile_names(str(config)) == ('ci-fast', 'nightly')
@@ -0,0 +1,208 @@
+import re
+import time
+import asyncio
+import pytest
+import core.assertionEngine as engine
+from core.assertionEngine import POLL_INTERVALS, Check, compile_assertions, verify
+
+
+class Recorder:
+    """记录expect调用的假expect"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, target):
+        recorder = self
+
+        class Assertions:
+            def __getattr__(self, method):
+                def assertion(*args, **kwargs):
+                    recorder.calls.append((target, method, args, kwargs))
+                return assertion
+        return Assertions()
+
+
+class FakeTarget:
+    def __init__(self, selector: str, form_field: bool):
+        self.selector = selector
+        self.form_field = form_field
+        self.first = self
+
+    def evaluate(self, _script):
+        return self.form_field
+
+
+class FakeLocator:
+    """evaluate_all按断言类型返回结果, results中没有的断言视为未通过"""
+
+    def __init__(self, results):
+        self.results = results
+        self.payloads = []
+
+    def evaluate_all(self, _script, payload):
+        self.payloads.append(payload)
+        return [self.results.get(kind, [False, None, kind]) for kind, _selector, _expected in payload]
+
+    def locator(self, selector):
+        return FakeTarget(selector, form_field=selector.startswith('input'))
+
+
+class FakePage:
+    def evaluate(self, _script, _payload):
+        raise AssertionError("locator断言不应在page上执行")
+
+
+@pytest.fixture
+def expect(monkeypatch):
+    import playwright.sync_api
+    recorder = Recorder()
+    monkeypatch.setattr(playwright.sync_api, 'expect', recorder)
+    return recorder
+
+
+@pytest.mark.hermetic
+class TestCompileAssertions:
+
+    def test_compile_checks(self):
+        checks = compile_assertions({
+            'visible': True,
+            'text': {'expected': re.compile('loan', re.I), 'timeout': 100},
+            'attribute': {'name': 'aria-label', 'value': 'Next'},
+            'url': re.compile('/preapp'),
+            'fields': {'#email': 'a@b.com', 'text=Email': 'x', '#agree': True},
+            'timeout': 300,
+        }, True, 'page.get_by_text(Next)')
+
+        assert [(check.kind, check.selector, check.timeout, check.in_page) for check in checks] == [
+            ('visible', None, 300, True),
+            ('text', None, 100, True),
+            ('attribute', None, 300, True),
+            ('url', None, 300, True),
+            ('field', '#email', 300, True),
+            ('field', 'text=Email', 300, False),
+            ('field', '#agree', 300, False)]
+        assert checks[2].expected == ('aria-label', 'Next')
+
+    def test_checked_and_enabled_go_to_expect(self):
+        checks = compile_assertions({'checked': True, 'enabled': False, 'value': 'a'}, True, 'page.locator(#agree)')
+
+        assert {check.kind: check.in_page for check in checks} == {'checked': False, 'enabled': False, 'value': True}
+
+    @pytest.mark.parametrize('spec, has_locator, message', [
+        (['visible'], True, 'assert必须是映射'),
+        ({'visible': True}, False, '需要locator'),
+        ({'unknown': 1}, True, '未知的断言'),
+        ({'attribute': 'aria-label'}, True, 'attribute断言需要'),
+        ({'fields': ['#email']}, True, 'fields必须是'),
+    ])
+    def test_invalid_spec(self, spec, has_locator, message):
+        with pytest.raises(ValueError, match=message):
+            compile_assertions(spec, has_locator, 'page')
+
+    def test_payload_serializes_patterns(self):
+        poller = engine._Poller(compile_assertions(
+            {'text': re.compile('a.b', re.I | re.S), 'attribute': {'name': 'role', 'value': 'button'}}, True, 'l'))
+
+        assert poller.payload() == [['text', None, {'pattern': 'a.b', 'flags': 'is'}],
+                                    ['attribute', None, ['role', 'button']]]
+
+
+@pytest.mark.hermetic
+class TestPoller:
+
+    @staticmethod
+    def poller(*timeouts):
+        return engine._Poller(tuple(Check('text', None, str(index), timeout, True, str(index))
+                                    for index, timeout in enumerate(timeouts)))
+
+    def test_passed_checks_are_removed(self):
+        poller = self.poller(5000, 5000)
+
+        assert poller.feed([[True, 'a', 'text'], [False, 'b', 'text']]) == POLL_INTERVALS[0]
+        assert [check.expected for check in poller.pending] == ['1']
+        assert poller.feed([[False, 'b', 'text']]) == POLL_INTERVALS[1]
+        assert poller.feed([[True, '1', 'text']]) is None
+        assert poller.fallback == []
+
+    def test_delay_never_passes_nearest_timeout(self):
+        poller = self.poller(50, 5000)
+
+        delay = poller.feed([[False, None, 'text'], [False, None, 'text']])
+
+        assert 0 <= delay <= 0.05
+
+    def test_timeout_and_error_fall_back(self):
+        poller = self.poller(1000, 1000, 60000)
+        poller.start = time.monotonic() - 2
+
+        # evaluate失败(如页面正在跳转)时本轮视为全部未通过
+        assert poller.feed(None) is not None
+        assert [(check.expected, mode) for check, mode in poller.fallback] == [('0', None), ('1', None)]
+        assert poller.feed([[False, 'boom', 'error']]) is None
+        assert poller.fallback[-1][1] == 'error'
+        assert poller.remaining(poller.fallback[0][0]) == 1.0
+
+
+@pytest.mark.hermetic
+class TestVerify:
+
+    def test_batched_checks_do_not_call_expect(self, expect):
+        locator = FakeLocator({'text': [True, 'Yes', 'text'], 'field': [True, 'a', 'value']})
+        checks = compile_assertions({'text': 'Yes', 'fields': {'#email': 'a'}}, True, 'l')
+
+        verify(FakePage(), locator, checks)
+
+        assert len(locator.payloads) == 1
+        assert expect.calls == []
+
+    def test_expect_only_checks_skip_evaluate(self, expect):
+        locator = FakeLocator({'text': [True, 'Yes', 'text']})
+        checks = compile_assertions({'text': 'Yes', 'checked': True, 'enabled': True,
+                                     'fields': {'#agree': False}}, True, 'l')
+
+        verify(FakePage(), locator, checks)
+
+        assert [kind for kind, _selector, _expected in locator.payloads[0]] == ['text']
+        calls = [(method, args, kwargs.get('checked', kwargs.get('enabled'))) for _target, method, args, kwargs
+                 in expect.calls]
+        assert calls == [('to_be_checked', (), True), ('to_be_enabled', (), True), ('to_be_checked', (), False)]
+        assert expect.calls[2][0].selector == '#agree'
+
+    def test_failed_and_non_css_checks_fall_back(self, expect):
+        locator = FakeLocator({'error': None})
+        checks = compile_assertions({'value': {'expected': 'x', 'timeout': 1},
+                                     'fields': {'input >> nth=0': 'a', 'text=Summary': 'b'}}, True, 'l')
+
+        verify(FakePage(), locator, checks)
+
+        assert [(method, args) for _target, method, args, _kwargs in expect.calls] == [
+            ('to_be_attached', ()), ('to_have_value', ('a',)),
+            ('to_be_attached', ()), ('to_have_text', ('b',)),
+            ('to_have_value', ('x',))]
+
+    def test_async_path(self, monkeypatch):
+        import playwright.async_api
+        calls = []
+
+        class AsyncAssertions:
+            def __init__(self, target):
+                self.target = target
+
+            async def to_be_checked(self, **kwargs):
+                calls.append(('to_be_checked', kwargs['checked']))
+
+        class AsyncLocator:
+            async def evaluate_all(self, _script, payload):
+                return [[True, None, kind] for kind, _selector, _expected in payload]
+
+        class AsyncPage:
+            async def evaluate(self, _script, _payload):
+                raise AssertionError
+
+        monkeypatch.setattr(playwright.async_api, 'expect', AsyncAssertions)
+        checks = compile_assertions({'visible': True, 'checked': False}, True, 'l')
+
+        asyncio.run(verify(AsyncPage(), AsyncLocator(), checks))
+
+        assert calls == [('to_be_checked', False)]
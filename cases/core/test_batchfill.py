@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from core.batchFill import LOCATOR_SCRIPT, PAGE_SCRIPT, batch_fill, split_fields
+
+
+class FakeField:
+    """记录回退操作的字段locator, kind为页面内判断出的字段类型"""
+
+    def __init__(self, selector: str, kind: str, calls: list):
+        self.selector = selector
+        self.kind = kind
+        self.calls = calls
+
+    def evaluate(self, _script):
+        return self.kind
+
+    def __getattr__(self, method):
+        return lambda *args: self.calls.append((self.selector, method, args))
+
+
+class Page:
+    """类名与playwright的Page相同, batch_fill据此选择脚本"""
+
+    def __init__(self, failed=(), kinds=None):
+        self.failed = list(failed)
+        self.kinds = kinds or {}
+        self.evaluated = []
+        self.calls = []
+
+    def evaluate(self, script, fields):
+        self.evaluated.append((script, fields))
+        return self.failed
+
+    def locator(self, selector):
+        return FakeField(selector, self.kinds.get(selector, 'input'), self.calls)
+
+
+class Locator(Page):
+    pass
+
+
+@pytest.mark.hermetic
+class TestBatchFill:
+
+    def test_split_fields(self):
+        css, fallback = split_fields({'#email': 'a', 'css=input[name=x]': 'b', 'text=Married': True,
+                                      '//input[@id="y"]': 'c', 'form >> #z': 'd', 'select[name=state]': 'CA'})
+
+        assert css == [('#email', 'a'), ('input[name=x]', 'b'), ('select[name=state]', 'CA')]
+        assert [selector for selector, _value in fallback] == ['text=Married', '//input[@id="y"]', 'form >> #z']
+
+    def test_css_fields_use_one_evaluate(self):
+        page = Page()
+
+        assert batch_fill(page, {'#email': 'a', '#agree': True}) == []
+        assert page.evaluated == [(PAGE_SCRIPT, [('#email', 'a'), ('#agree', True)])]
+        assert page.calls == []
+
+        locator = Locator()
+        batch_fill(locator, {'#email': 'a'})
+        assert locator.evaluated[0][0] == LOCATOR_SCRIPT
+
+    def test_failed_and_non_css_fields_fall_back(self):
+        page = Page(failed=[1], kinds={'#state': 'select', 'role=combobox': 'select'})
+
+        fallback = batch_fill(page, {'#email': 'a', '#state': 'CA', 'text=Married': True, 'role=combobox': 'TX',
+                                     'text=Age': 30, 'text=Opt out': False})
+
+        assert fallback == ['text=Married', 'role=combobox', 'text=Age', 'text=Opt out', '#state']
+        assert page.evaluated == [(PAGE_SCRIPT, [('#email', 'a'), ('#state', 'CA')])]
+        assert page.calls == [('text=Married', 'set_checked', (True,)),
+                              ('role=combobox', 'select_option', ('TX',)),
+                              ('text=Age', 'fill', ('30',)),
+                              ('text=Opt out', 'set_checked', (False,)),
+                              ('#state', 'select_option', ('CA',))]
+
+    def test_unchecking_radio_raises(self):
+        page = Page(failed=[0], kinds={'#married_no': 'radio'})
+
+        with pytest.raises(ValueError, match='#married_no'):
+            batch_fill(page, {'#married_no': False})
+
+    def test_async_fallback(self):
+        calls = []
+
+        class AsyncField:
+            def __init__(self, selector):
+                self.selector = selector
+
+            async def evaluate(self, _script):
+                return 'select'
+
+            async def select_option(self, value):
+                calls.append((self.selector, 'select_option', value))
+
+        class Page:
+            async def evaluate(self, _script, _fields):
+                return [0]
+
+            def locator(self, selector):
+                return AsyncField(selector)
+
+        assert asyncio.run(batch_fill(Page(), {'#state': 'CA'})) == ['#state']
+        assert calls == [('#state', 'select_option', 'CA')]
@@ -0,0 +1,100 @@
+import os
+import gzip
+import json
+import time
+import pytest
+from core.logArchive import INDEX_SUFFIX, LogArchive, archive_file, get_codec, read_errors
+
+TRACEBACK = ('Traceback (most recent call last):\n'
+             '  File "flow.py", line 3, in <module>\n'
+             'ZeroDivisionError: division by zero\n')
+
+
+def record(level: str, message: str, line: int = 1) -> str:
+    return f"2026-01-01 00:00:00,000 flow.py::flow::run[{line}] {level}: {message}\n"
+
+
+def write_log(path, text: str) -> str:
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.hermetic
+class TestLogArchive:
+
+    def test_round_trip_across_blocks(self, tmp_path):
+        lines = []
+        for index in range(40):
+            lines.append(record('INFO', f"step {index} " + 'x' * 30))
+            if index % 9 == 0:
+                lines.append(record('ERROR', f"boom {index}") + TRACEBACK)
+        text = ''.join(lines)
+        source = write_log(tmp_path / 'case.log', text)
+
+        index = archive_file(source, get_codec('gzip'), block_size=256, test='test_case')
+
+        assert not os.path.exists(source)
+        assert gzip.decompress((tmp_path / 'case.log.gz').read_bytes()).decode() == text
+        assert len(index['blocks']) > 1
+        assert index['levels'] == {'INFO': 40, 'ERROR': 5}
+        with open(source + '.gz' + INDEX_SUFFIX, encoding='utf-8') as file:
+            assert json.load(file)['test'] == 'test_case'
+        errors = list(read_errors(source + '.gz' + INDEX_SUFFIX))
+        assert [text.splitlines()[line - 1] for line, _record in errors] == \
+               [record('ERROR', f"boom {index}").rstrip('\n') for index in range(0, 40, 9)]
+        for _line, error in errors:
+            assert error.endswith(TRACEBACK.rstrip('\n'))
+            assert 'INFO' not in error
+
+    def test_record_larger_than_block_stays_whole(self, tmp_path):
+        # 每条记录都超过块大小, 块在每个记录开头切分, traceback不会被切到下一个块
+        text = record('INFO', 'a' * 80) + record('CRITICAL', 'fatal') + TRACEBACK * 3 + record('INFO', 'after')
+        source = write_log(tmp_path / 'case.log', text)
+
+        index = archive_file(source, get_codec('gzip'), block_size=16)
+
+        assert len(index['blocks']) == 3
+        assert index['errors'] == [{'line': 2, 'offset': len(record('INFO', 'a' * 80)), 'block': 1}]
+        (_line, error), = read_errors(source + '.gz' + INDEX_SUFFIX)
+        assert error == (record('CRITICAL', 'fatal') + TRACEBACK * 3).rstrip('\n')
+
+    def test_enforce_removes_oldest_first(self, tmp_path):
+        now = time.time()
+        archives = []
+        for number in range(4):
+            source = write_log(tmp_path / f"case{number}.log", record('INFO', os.urandom(200).hex()))
+            archive_file(source, get_codec('gzip'))
+            archives.append(source + '.gz')
+            # 文件名顺序与修改时间顺序相反, 确认按修改时间删除
+            os.utime(archives[-1], (now - 100 * (4 - number), now - 100 * (4 - number)))
+        size = os.path.getsize(archives[0]) + os.path.getsize(archives[0] + INDEX_SUFFIX)
+
+        archive = LogArchive(str(tmp_path), compression='gzip', max_total_mb=size * 2.5 / 1024 / 1024,
+                             max_age_days=None)
+        try:
+            removed = archive.enforce()
+        finally:
+            archive.close()
+
+        assert removed == archives[:2]
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            name for path in archives[2:] for name in (os.path.basename(path), os.path.basename(path) + INDEX_SUFFIX))
+
+    def test_enforce_counts_archives_from_other_processes(self, tmp_path):
+        archive = LogArchive(str(tmp_path), compression='gzip', max_total_mb=None, max_age_days=1)
+        try:
+            archive.submit(write_log(tmp_path / 'first.log', record('INFO', 'first')))
+            deadline = time.time() + 10
+            while not os.path.exists(tmp_path / ('first.log.gz' + INDEX_SUFFIX)) and time.time() < deadline:
+                time.sleep(0.01)
+            # 本实例扫描过目录之后, 由其它worker生成的过期归档
+            source = write_log(tmp_path / 'other.log', record('INFO', 'other worker'))
+            archive_file(source, get_codec('gzip'))
+            expired = time.time() - 2 * 86400
+            os.utime(source + '.gz', (expired, expired))
+            archive.submit(write_log(tmp_path / 'second.log', record('INFO', 'second')))
+        finally:
+            archive.close()
+
+        assert sorted(os.listdir(tmp_path)) == ['first.log.gz', 'first.log.gz' + INDEX_SUFFIX,
+                                                'second.log.gz', 'second.log.gz' + INDEX_SUFFIX]
@@ -0,0 +1,144 @@
+import sys
+import logging
+import threading
+import subprocess
+import contextvars
+import pytest
+from core.path import project_path
+from core.loggerManager import ContextRouter, LazyLogger, LoggerManager, _context_key, context_key, process_key
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.mark.hermetic
+class TestContextRouter:
+
+    @pytest.fixture
+    def registry(self):
+        return {}
+
+    @pytest.fixture
+    def logger(self, registry, request):
+        """挂着路由handler和一个父级handler的独立logger, 不影响共享的main logger"""
+        parent = logging.getLogger(f"router_test_{request.node.name}")
+        parent.setLevel(logging.DEBUG)
+        propagated = ListHandler()
+        parent.addHandler(propagated)
+        logger = parent.getChild('case')
+        logger.addHandler(ContextRouter(registry))
+        logger.propagated = propagated
+        yield logger
+        logger.handlers.clear()
+        parent.handlers.clear()
+
+    @staticmethod
+    def target(tmp_path, name):
+        handler = logging.FileHandler(tmp_path / f"{name}.log", encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+    def test_threads_write_to_their_own_files(self, logger, registry, tmp_path):
+        barrier = threading.Barrier(2)
+        handlers = {}
+
+        def run_case(name):
+            handlers[name] = self.target(tmp_path, name)
+            registry[context_key()] = {'handlers': (handlers[name],), 'active': True}
+            # 两个用例都注册完成后再同时写日志
+            barrier.wait()
+            for index in range(20):
+                logger.info(f"{name} {index}")
+
+        threads = [threading.Thread(target=run_case, args=(name,), name=name) for name in ('case_a', 'case_b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for handler in handlers.values():
+            handler.close()
+
+        assert set(registry) == {f"{process_key()}:case_a", f"{process_key()}:case_b"}
+        for name in ('case_a', 'case_b'):
+            lines = (tmp_path / f"{name}.log").read_text(encoding='utf-8').splitlines()
+            assert lines == [f"{name} {index}" for index in range(20)]
+
+    def test_contextvar_key_overrides_thread(self, logger, registry):
+        bound, default = ListHandler(), ListHandler()
+        registry['task-1'] = {'handlers': (bound,), 'active': True}
+        registry[context_key()] = {'handlers': (default,), 'active': True}
+
+        def in_task():
+            _context_key.set('task-1')
+            logger.info('from task')
+        contextvars.copy_context().run(in_task)
+        logger.info('from thread')
+
+        assert bound.messages == ['from task']
+        assert default.messages == ['from thread']
+
+    def test_xdist_worker_key(self, logger, registry, monkeypatch):
+        monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw3')
+        worker, thread_keys = ListHandler(), []
+        registry['gw3'] = {'handlers': (worker,), 'active': True}
+
+        def in_thread():
+            thread_keys.append(context_key())
+            # 没有注册的工作线程回退到worker的注册
+            logger.info('from worker thread')
+        thread = threading.Thread(target=in_thread, name='helper')
+        thread.start()
+        thread.join()
+
+        assert context_key() == 'gw3'
+        assert thread_keys == ['gw3:helper']
+        assert worker.messages == ['from worker thread']
+
+    def test_inactive_context_falls_back_to_process(self, logger, registry):
+        process, stale = ListHandler(), ListHandler()
+        registry[process_key()] = {'handlers': (process,), 'active': True}
+        registry['task-1'] = {'handlers': (stale,), 'active': False}
+
+        def in_task():
+            _context_key.set('task-1')
+            logger.info('after unregister started')
+        contextvars.copy_context().run(in_task)
+
+        assert process.messages == ['after unregister started']
+        assert stale.messages == []
+
+    def test_no_target_only_propagates(self, logger, registry, monkeypatch):
+        last_resort = ListHandler()
+        monkeypatch.setattr(logging, 'lastResort', last_resort)
+        registry[process_key()] = {'handlers': (ListHandler(),), 'active': False}
+
+        logger.warning('nobody registered')
+
+        assert last_resort.messages == []
+        assert logger.propagated.messages == ['nobody registered']
+
+
+@pytest.mark.hermetic
+class TestLazyLogger:
+
+    def test_importing_page_modules_has_no_logging_side_effects(self):
+        # 当前进程的LoggerManager已被fixture创建, 在新进程中导入页面模块
+        script = ("import logging, pages.application.preApplication\n"
+                  "from core.loggerManager import SingletonMeta\n"
+                  "print(len(logging.getLogger('main').handlers), len(SingletonMeta._instances))")
+        output = subprocess.run([sys.executable, '-c', script], cwd=project_path, capture_output=True, text=True,
+                                check=True).stdout
+
+        assert output.split() == ['0', '0']
+
+    def test_logger_is_created_on_first_use(self):
+        logger = LazyLogger()
+
+        assert logger.name == LoggerManager().default_logger_name
+        assert logger.handlers == [LoggerManager()._router]
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from types import SimpleNamespace
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, headers=None, status: int = 200):
+        self.status = status
+        self.headers = headers or {}
+        self._body = body
+
+    def body(self):
+        return self._body
+
+
+class FakeRoute:
+    """记录fulfill参数, fetch返回预设响应的路由"""
+
+    def __init__(self, url: str, response: FakeResponse | None = None, method: str = 'GET'):
+        self.request = SimpleNamespace(url=url, method=method, resource_type='script')
+        self.response = response
+        self.fetched = 0
+        self.fulfilled = None
+
+    def fetch(self):
+        self.fetched += 1
+        return self.response
+
+    def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    def fallback(self):
+        self.fulfilled = 'fallback'
+
+
+@pytest.mark.hermetic
+class TestNetworkProfileCache:
+
+    @pytest.fixture
+    def profile_class(self, monkeypatch):
+        # networkProfile在模块级导入playwright, 在用例中导入, 收集用例时不加载
+        from core.networkProfile import NetworkProfile
+        monkeypatch.setattr(NetworkProfile, '_response_cache', OrderedDict())
+        monkeypatch.setattr(NetworkProfile, '_cache_bytes', 0)
+        return NetworkProfile
+
+    @staticmethod
+    def request(profile, url, body=b'js', headers=None):
+        route = FakeRoute(url, FakeResponse(body, headers))
+        profile._handle_cache(route)
+        return route
+
+    def test_encoding_headers_are_not_replayed(self, profile_class):
+        profile = profile_class({'cache_url_globs': ['**/*.js']})
+        headers = {'Content-Type': 'text/javascript', 'Content-Encoding': 'gzip', 'content-length': '20',
+                   'Transfer-Encoding': 'chunked'}
+
+        first = self.request(profile, 'https://a/app.js', b'decoded body', headers)
+        second = self.request(profile, 'https://a/app.js')
+
+        assert first.fulfilled['headers'] == {'Content-Type': 'text/javascript'}
+        assert second.fetched == 0
+        assert second.fulfilled == {'status': 200, 'headers': {'Content-Type': 'text/javascript'},
+                                    'body': b'decoded body'}
+
+    def test_cache_is_keyed_by_system_and_environment(self, profile_class):
+        settings = {'cache_url_globs': ['**/*.js']}
+        self.request(profile_class(settings, 'application', 'prod'), 'https://a/app.js', b'prod')
+
+        assert self.request(profile_class(settings, 'application', 'test'), 'https://a/app.js').fetched == 1
+        assert self.request(profile_class(settings, 'loans', 'prod'), 'https://a/app.js').fetched == 1
+        assert self.request(profile_class(settings, 'application', 'prod'), 'https://a/app.js').fetched == 0
+
+    def test_least_recently_used_is_evicted(self, profile_class):
+        profile = profile_class({'cache_url_globs': ['**/*.js'], 'cache_max_mb': 25 / 1024 / 1024})
+        self.request(profile, 'https://a/1.js', b'x' * 10)
+        self.request(profile, 'https://a/2.js', b'x' * 10)
+        # 命中后1.js变为最近使用, 再写入时淘汰2.js
+        assert self.request(profile, 'https://a/1.js').fetched == 0
+        self.request(profile, 'https://a/3.js', b'x' * 10)
+        # 超过上限的响应直接返回, 不进入缓存
+        self.request(profile, 'https://a/big.js', b'x' * 30)
+
+        assert [key[2] for key in profile_class._response_cache] == ['https://a/1.js', 'https://a/3.js']
+        assert profile_class._cache_bytes == 20
+
+    def test_only_successful_get_is_cached(self, profile_class):
+        profile = profile_class({'cache_url_globs': ['**/*.js']})
+        post = FakeRoute('https://a/app.js', method='POST')
+        profile._handle_cache(post)
+        missing = FakeRoute('https://a/missing.js', FakeResponse(b'', status=404))
+        profile._handle_cache(missing)
+
+        assert post.fulfilled == 'fallback'
+        assert missing.fulfilled['body'] == b''
+        assert not profile_class._response_cache
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import pytest
+import core.pageRegistry as page_registry_module
+from core.pageRegistry import PageRegistry
+
+HEADER = "class P:\n    base = staticmethod(lambda func: func)\n\n\n"
+
+
+def page_function(name: str, decorator: str = '@P.base', value: str = 'None') -> str:
+    return f"{decorator}\ndef {name}():\n    page = {{'properties': {{'open': {{}}}}}}\n    return {value}\n\n\n"
+
+
+@pytest.mark.hermetic
+class TestPageRegistry:
+
+    @pytest.fixture
+    def package(self, tmp_path):
+        # 包名每次不同, 避免与其它用例加载的模块在sys.modules中冲突
+        package = tmp_path / f"pages_{tmp_path.name}"
+        (package / 'loans').mkdir(parents=True)
+        (package / '__init__.py').write_text('')
+        (package / 'loans' / '__init__.py').write_text('')
+        (package / 'loans' / '1003_view.py').write_text(HEADER + page_function('view_loan', value="'1003'"))
+        (package / 'home.py').write_text(HEADER + page_function('open_home') + page_function('helper', '@other.base'))
+        yield package
+        for name in [name for name in sys.modules if name.startswith(package.name)]:
+            del sys.modules[name]
+
+    @pytest.fixture
+    def scans(self, monkeypatch):
+        """记录重新用ast解析的文件"""
+        scanned = []
+        scan_source = page_registry_module.scan_source
+
+        def counting_scan(source, module, path):
+            scanned.append(module)
+            return scan_source(source, module, path)
+        monkeypatch.setattr(page_registry_module, 'scan_source', counting_scan)
+        return scanned
+
+    def test_unchanged_files_reuse_index(self, package, tmp_path, scans):
+        index_path = str(tmp_path / 'index.json')
+        entries = PageRegistry(str(package), index_path).refresh()
+
+        assert sorted(scans) == [f"{package.name}.home", f"{package.name}.loans.1003_view"]
+        assert set(entries) == {f"{package.name}.home:open_home", f"{package.name}.home:helper",
+                                f"{package.name}.loans.1003_view:view_loan"}
+        scans.clear()
+        assert PageRegistry(str(package), index_path).refresh() == entries
+        assert scans == []
+
+    def test_mtime_change_falls_back_to_hash(self, package, tmp_path, scans):
+        index_path = str(tmp_path / 'index.json')
+        PageRegistry(str(package), index_path).refresh()
+        home = package / 'home.py'
+        mtime_ns = home.stat().st_mtime_ns + 10 ** 9
+        os.utime(home, ns=(mtime_ns, mtime_ns))
+        scans.clear()
+
+        PageRegistry(str(package), index_path).refresh()
+
+        # 内容未变化, 只更新索引中的修改时间
+        assert scans == []
+        with open(index_path, encoding='utf-8') as file:
+            assert json.load(file)['files']['home.py']['mtime_ns'] == mtime_ns
+
+        home.write_text(HEADER + page_function('open_home') + page_function('open_about'))
+        entries = PageRegistry(str(package), index_path).refresh()
+        assert scans == [f"{package.name}.home"]
+        assert f"{package.name}.home:open_about" in entries
+
+    def test_load_module_by_path(self, package, tmp_path):
+        registry = PageRegistry(str(package), str(tmp_path / 'index.json'))
+
+        view_loan = registry.get('view_loan')
+
+        assert view_loan() == '1003'
+        assert sys.modules[f"{package.name}.loans.1003_view"].view_loan is view_loan
+        assert f"{package.name}.home" not in sys.modules
+
+    def test_resolve_ambiguous_and_missing(self, package, tmp_path):
+        (package / 'loans' / 'home.py').write_text(HEADER + page_function('open_home'))
+        registry = PageRegistry(str(package), str(tmp_path / 'index.json'))
+
+        with pytest.raises(LookupError, match='不唯一'):
+            registry.resolve('open_home')
+        assert registry.resolve(f"{package.name}.loans.home:open_home").module == f"{package.name}.loans.home"
+        # 未被P.base/PropertyResolver.base/base装饰的函数不能直接执行
+        with pytest.raises(LookupError, match='不存在'):
+            registry.resolve('helper')
+        assert not registry.entries()[f"{package.name}.home:helper"].decorated
@@ -0,0 +1,153 @@
+import pytest
+from concurrent.futures import Future
+from core.propertyResolver import IsolatedEventsError, PropertyResolver
+
+
+def search_page(**kwargs):
+    page = {
+        'properties': {
+            'search': {
+                'loc': {'get_by_text': 'Search'},
+                'op': {'click': ''},
+                'next': {
+                    'loc': {'get_by_role': {'role': 'textbox', 'name': 'Keyword'}},
+                    'op': {'fill': 'loan'},
+                },
+            },
+            'submit': {
+                'loc': {'get_by_text': 'Submit'},
+                'op': {'click': ''},
+            },
+        }
+    }
+    return {'page': page}
+
+
+def events_page(**kwargs):
+    page = {
+        'properties': {
+            'first': {'loc': {'get_by_text': 'First'}, 'op': {'click': ''}},
+            'second': {'loc': {'get_by_text': 'Second'}, 'op': {'click': ''}},
+            'rates': {'isolated': True, 'loc': {'get_by_text': 'Rates'}, 'op': {'inner_text': ''}},
+        }
+    }
+    return {'page': page}
+
+
+class FakeManager:
+    """同步执行isolated事件的WebManager"""
+
+    def __init__(self):
+        self.page = object()
+
+    def get_page(self):
+        return self.page
+
+    def submit_isolated(self, fn):
+        future = Future()
+        try:
+            future.set_result(fn('isolated page'))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def methods(calls):
+    return [call.method for call in calls]
+
+
+@pytest.mark.hermetic
+class TestPlanCompilation:
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        PropertyResolver.clear_cache()
+        yield
+        PropertyResolver.clear_cache()
+
+    def test_compile_flattens_events(self):
+        plan = PropertyResolver.compile(search_page, search={}, submit={})
+
+        assert [(step.event, step.node) for step in plan] == [
+            ('search', 'search_page::search'),
+            ('search', 'search_page::search::next_operation'),
+            ('submit', 'search_page::submit')]
+        assert methods(plan[1].locators) == ['get_by_role']
+        assert dict(plan[1].locators[0].params) == {'role': 'textbox', 'name': 'Keyword'}
+        assert plan[1].log_str == 'page.get_by_role(role=textbox, name=Keyword)'
+        # 未请求的事件不编译
+        assert [step.event for step in PropertyResolver.compile(search_page, submit={})] == ['submit']
+
+    def test_same_kwargs_reuse_plan(self):
+        first = PropertyResolver.compile(search_page, search={'op': {'click': ''}})
+
+        assert PropertyResolver.compile(search_page, search={'op': {'click': ''}}) is first
+        assert PropertyResolver.compile(search_page, search={'op': {'dblclick': ''}}) is not first
+
+    def test_reordered_loc_override_compiles_separate_plan(self):
+        # loc中键的顺序就是locator链的顺序
+        text_first = PropertyResolver.compile(search_page, submit={'loc': {'get_by_text': 'Submit', 'nth': 0}})
+        nth_first = PropertyResolver.compile(search_page, submit={'loc': {'nth': 0, 'get_by_text': 'Submit'}})
+
+        assert methods(text_first[0].locators) == ['get_by_text', 'nth']
+        assert methods(nth_first[0].locators) == ['nth', 'get_by_text']
+
+    def test_container_types_do_not_collide(self):
+        as_list = PropertyResolver.compile(search_page, submit={'op': {'click': ''}, 'tags': ['a', 'b']})
+        as_tuple = PropertyResolver.compile(search_page, submit={'op': {'click': ''}, 'tags': ('a', 'b')})
+        as_dict = PropertyResolver.compile(search_page, submit={'op': {'click': ''}, 'tags': {'a': 'b'}})
+
+        assert len({id(as_list), id(as_tuple), id(as_dict)}) == 3
+
+    def test_unhashable_override_is_not_cached(self):
+        first = PropertyResolver.compile(search_page, submit={'op': {'click': ''}, 'tags': {'a', 'b'}})
+        second = PropertyResolver.compile(search_page, submit={'op': {'click': ''}, 'tags': {'a', 'b'}})
+
+        assert first == second
+        assert first is not second
+        assert methods(first[0].operations) == ['click']
+
+
+@pytest.mark.hermetic
+class TestPageFunctionEvents:
+
+    @pytest.fixture
+    def executed(self, monkeypatch):
+        """替换WebManager和步骤执行, failing中的事件抛出异常, 其余返回最后一个节点"""
+        import core.webManger
+        monkeypatch.setattr(core.webManger, 'WebManager', FakeManager)
+        executed = {'failing': {}, 'events': []}
+
+        def execute(cls, page, plan):
+            event = plan[0].event
+            executed['events'].append(event)
+            if event in executed['failing']:
+                raise executed['failing'][event]
+            return plan[-1].node
+        monkeypatch.setattr(PropertyResolver, 'execute', classmethod(execute))
+        PropertyResolver.clear_cache()
+        yield executed
+        PropertyResolver.clear_cache()
+
+    def test_returns_results_with_and_without_isolated_events(self, executed):
+        page_function = PropertyResolver.base(events_page)
+
+        assert page_function(first={}, second={}) == {'first': 'events_page::first', 'second': 'events_page::second'}
+        assert page_function(first={}, rates={}) == {'first': 'events_page::first', 'rates': 'events_page::rates'}
+
+    def test_sequential_failure_is_raised_unchanged(self, executed):
+        executed['failing'] = {'first': TimeoutError('First'), 'rates': RuntimeError('Rates')}
+
+        with pytest.raises(TimeoutError, match='First'):
+            PropertyResolver.base(events_page)(first={}, second={}, rates={})
+        # 顺序事件失败后不再执行后续的顺序事件, isolated事件仍执行完
+        assert executed['events'] == ['rates', 'first']
+
+    def test_isolated_failures_are_collected(self, executed):
+        error = RuntimeError('Rates')
+        executed['failing'] = {'rates': error}
+
+        with pytest.raises(IsolatedEventsError) as raised:
+            PropertyResolver.base(events_page)(first={}, rates={})
+        assert raised.value.failures == {'rates': error}
+        assert executed['events'] == ['rates', 'first']
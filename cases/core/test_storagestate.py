@@ -0,0 +1,37 @@
+import os
+import time
+import pytest
+
+
+@pytest.mark.hermetic
+class TestStorageStateCache:
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        from core.storageState import StorageStateCache
+        return StorageStateCache(ttl=60, root=str(tmp_path))
+
+    @staticmethod
+    def write(path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"cookies": [], "origins": []}')
+
+    def test_systems_do_not_share_login(self, cache):
+        self.write(cache.path('application', 'prod', 'a@b.com'))
+
+        assert cache.get('application', 'prod', 'a@b.com') is not None
+        assert cache.get('loans', 'prod', 'a@b.com') is None
+        assert cache.path('loans', 'prod', 'a@b.com') != cache.path('application', 'prod', 'a@b.com')
+
+        cache.invalidate('loans', 'prod', 'a@b.com')
+        assert cache.get('application', 'prod', 'a@b.com') is not None
+
+    def test_expired_state_is_removed(self, cache):
+        path = cache.path('application', 'prod', 'a/b')
+        self.write(path)
+        expired = time.time() - 120
+        os.utime(path, (expired, expired))
+
+        assert cache.get('application', 'prod', 'a/b') is None
+        assert not os.path.exists(path)
@@ -0,0 +1,35 @@
+import pytest
+from common.stubServer import StubServer
+
+STUB_PAGES = {
+    '/index.html': '<html><head><title>har stub</title><script src="/app.js"></script></head>'
+                   '<body><p id="content">loading</p></body></html>',
+    '/app.js': 'document.addEventListener("DOMContentLoaded", () => '
+               '{ document.getElementById("content").textContent = "recorded"; });',
+}
+
+
+@pytest.mark.hermetic
+class TestHarArchive:
+
+    def test_record_then_replay(self, tmp_path, setup_environment):
+        # 延迟导入, 收集阶段不加载playwright
+        from core.networkProfile import HarArchive
+        har_path = str(tmp_path / 'stub.har')
+        pool = setup_environment.get_pool()
+
+        with StubServer(pages=STUB_PAGES) as stub:
+            url = f"{stub.url}/index.html"
+            with pool.lease() as context:
+                HarArchive(har_path, 'record').apply(context)
+                page = context.new_page()
+                page.goto(url)
+                assert page.text_content('#content') == 'recorded'
+
+        # 桩服务已停止, 页面只能由HAR提供
+        with pool.lease() as context:
+            HarArchive(har_path, 'replay').apply(context)
+            page = context.new_page()
+            page.goto(url)
+            assert page.title() == 'har stub'
+            assert page.text_content('#content') == 'recorded'
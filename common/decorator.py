@@ -1,8 +1,5 @@
-import sys
 import inspect
-import functools
-import importlib
-from pathlib import Path
+from core.pageRegistry import PageRegistry
 
 
 class Decorator:
@@ -10,23 +7,17 @@ class Decorator:
 
     @classmethod
     def decorate_module_functions(cls, module, decorator):
-        for name, obj in inspect.getmembers(module):
-            if inspect.isfunction(obj):
+        for name, obj in vars(module).copy().items():
+            # 只装饰本模块定义的函数, 已经是页面函数的不重复装饰
+            if inspect.isfunction(obj) and obj.__module__ == module.__name__ \
+                    and not getattr(obj, 'is_page_function', False):
                 setattr(module, name, decorator(obj))
-            elif inspect.ismodule(obj) and obj.__name__.startswith('pages'):
-                decorate_module_functions(obj, decorator)
+            elif inspect.ismodule(obj) and obj.__name__.startswith(module.__name__ + '.'):
+                cls.decorate_module_functions(obj, decorator)
 
     @classmethod
     def import_and_decorate_modules(cls, package_dir, decorator):
-        package_path = Path(package_dir).resolve()
-        for path in package_path.rglob('*.py'):
-            if path.name == "__init__.py":
-                continue
-            relative_path = path.relative_to(package_path.parent)
-            module_name = '.'.join(relative_path.with_suffix('').parts)
-            if module_name not in sys.modules:
-                module = importlib.import_module(module_name)
-                cls.decorate_module_functions(module, decorator)
-            else:
-                module = sys.modules[module_name]
-                cls.decorate_module_functions(module, decorator)
+        """按页面注册表的索引只导入定义了页面函数的模块, 并装饰其中的函数"""
+        registry = PageRegistry(package_dir)
+        for module_name in dict.fromkeys(entry.module for entry in registry.entries().values()):
+            cls.decorate_module_functions(registry.load_module(module_name), decorator)
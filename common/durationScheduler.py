@@ -0,0 +1,152 @@
+"""
+按历史耗时调度用例的pytest插件
+
+- 每次运行记录每条用例(setup + call + teardown)的耗时到本地历史文件
+- 使用pytest-xdist运行时, 按历史耗时以最长处理时间优先(LPT)的方式把用例分组装箱到各个worker
+- 同一个类中的用例作为一个整体分配给同一个worker, 保持类内的执行顺序
+"""
+import os
+import json
+import statistics
+import pytest
+from typing import Dict, List
+from core.path import CACHE_PATH
+
+try:
+    from xdist.scheduler import LoadScopeScheduling
+except ImportError:
+    LoadScopeScheduling = None
+
+DEFAULT_HISTORY_FILE = os.path.join(CACHE_PATH, 'durations.json')
+# 新耗时在历史平均值中的权重, 平滑单次波动
+SMOOTHING = 0.5
+# 没有任何历史数据时, 每条用例的估计耗时(秒)
+DEFAULT_DURATION = 1.0
+
+
+class DurationHistory:
+    """用例耗时历史记录"""
+
+    def __init__(self, filepath: str = DEFAULT_HISTORY_FILE):
+        self.filepath = filepath
+        self.durations: Dict[str, float] = self._load()
+        self._measured: Dict[str, float] = {}
+        known = list(self.durations.values())
+        self._default = statistics.median(known) if known else DEFAULT_DURATION
+
+    def _load(self) -> Dict[str, float]:
+        if not os.path.exists(self.filepath):
+            return {}
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as file:
+                return {key: float(value) for key, value in json.load(file).items()}
+        except (ValueError, OSError):
+            return {}
+
+    def estimate(self, nodeid: str) -> float:
+        """返回用例的估计耗时, 没有历史记录时使用已知用例耗时的中位数"""
+        return self.durations.get(nodeid, self._default)
+
+    def record(self, nodeid: str, duration: float):
+        self._measured[nodeid] = self._measured.get(nodeid, 0.0) + duration
+
+    def save(self):
+        if not self._measured:
+            return
+        for nodeid, duration in self._measured.items():
+            previous = self.durations.get(nodeid)
+            self.durations[nodeid] = duration if previous is None else \
+                SMOOTHING * duration + (1 - SMOOTHING) * previous
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.durations, file, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.filepath)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--schedule',
+        action="store",
+        default='duration',
+        choices=['duration', 'xdist'],
+        help='xdist调度方式, duration: 按历史耗时装箱分配, xdist: 使用xdist自带的调度'
+    )
+    parser.addoption(
+        '--durationFile',
+        action="store",
+        default=DEFAULT_HISTORY_FILE,
+        help='用例耗时历史文件路径'
+    )
+
+
+class DurationRecorder:
+    """记录本次运行中每条用例的耗时, 会话结束时写回历史文件"""
+
+    def __init__(self, history: DurationHistory):
+        self.history = history
+
+    def pytest_runtest_logreport(self, report):
+        self.history.record(report.nodeid, report.duration)
+
+    def pytest_sessionfinish(self):
+        self.history.save()
+
+
+def pytest_configure(config):
+    history = DurationHistory(config.getoption('--durationFile'))
+    config.stash[history_key] = history
+    # xdist模式下worker的报告会转发给主进程, 只在主进程中记录
+    if not hasattr(config, 'workerinput'):
+        config.pluginmanager.register(DurationRecorder(history), 'duration_recorder')
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption('--schedule') != 'duration' or DurationScheduling is None:
+        return None
+    return DurationScheduling(config, log)
+
+
+if LoadScopeScheduling is not None:
+    class DurationScheduling(LoadScopeScheduling):
+        """
+        以类(或模块)为单位, 按历史耗时LPT装箱的调度器
+
+        首次分配工作时为每个worker规划好要执行的单元, worker提前跑完自己的计划后,
+        从剩余工作中取走估计耗时最长的单元, 以修正估计误差
+        """
+
+        def __init__(self, config, log=None):
+            super().__init__(config, log)
+            self._history: DurationHistory = config.stash[history_key]
+            self._plan: Dict = {}
+
+        def _unit_duration(self, scope: str) -> float:
+            return sum(self._history.estimate(nodeid) for nodeid in self.workqueue[scope])
+
+        def _build_plan(self) -> Dict:
+            loads = {node: 0.0 for node in self.nodes}
+            plan: Dict = {node: [] for node in self.nodes}
+            durations = {scope: self._unit_duration(scope) for scope in self.workqueue}
+            for scope in sorted(durations, key=durations.get, reverse=True):
+                node = min(loads, key=loads.get)
+                plan[node].append(scope)
+                loads[node] += durations[scope]
+            self.log("duration plan:", {node.gateway.id: round(load, 2) for node, load in loads.items()})
+            return plan
+
+        def _assign_work_unit(self, node):
+            if not self._plan:
+                self._plan = self._build_plan()
+            queue: List[str] = self._plan.get(node, [])
+            while queue and queue[0] not in self.workqueue:
+                queue.pop(0)
+            scope = queue.pop(0) if queue else max(self.workqueue, key=self._unit_duration)
+            self.workqueue.move_to_end(scope, last=False)
+            super()._assign_work_unit(node)
+else:
+    DurationScheduling = None
+
+
+history_key = pytest.StashKey[DurationHistory]()
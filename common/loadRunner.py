@@ -0,0 +1,179 @@
+"""
+页面流程的压测/拨测入口, 不依赖pytest, 直接复用pages下的@P.base页面函数
+
+    $ python -m common.loadRunner pre_application --event refinance_my_home --runs 50 --concurrency 4 --env test
+    $ python -m common.loadRunner pages.application.preApplication:pre_application \\
+          --kwargs '{"refinance_my_home": null}' --runs 10 --output logs/load/report.json
+
+每个工作线程持有自己的浏览器池, 每次运行租用一个全新的context并打开首页, 输出整体吞吐量、错误率,
+以及每次流程和每个页面节点(span)的 p50/p95/p99 耗时
+"""
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+from common.readConfig import get_default_options
+
+
+class RunResult(NamedTuple):
+    """一次流程运行的结果"""
+    open_time: float  # 租用context并打开首页的耗时(秒)
+    flow_time: float  # 执行页面函数的耗时(秒)
+    error: str | None  # 失败时的异常类型名
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """最近秩法计算百分位, ordered需已排序"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], errors: int = 0) -> Dict[str, Any]:
+    """把耗时样本(秒)汇总为毫秒统计"""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def resolve_page_function(target: str) -> Callable[..., Any]:
+    """
+    按 "模块名:函数名" 或唯一的函数名查找@P.base页面函数, 只导入其所在的模块
+    Raises:
+        LookupError: 不存在或函数名不唯一
+    """
+    from core.pageRegistry import page_registry
+    return page_registry.get(target)
+
+
+class LoadRunner:
+    """在固定数量的工作线程中并发、重复运行同一个页面函数并收集耗时"""
+
+    def __init__(self, manager: Any, func: Callable[..., Any], kwargs: Dict[str, Any], concurrency: int = 4):
+        self._manager = manager
+        self._func = func
+        self._kwargs = kwargs
+        self._concurrency = concurrency
+
+    def _run_once(self) -> RunResult:
+        begin = time.perf_counter()
+        open_time = flow_time = 0.0
+        try:
+            with self._manager.lease_page():
+                opened = time.perf_counter()
+                open_time = opened - begin
+                self._func(**self._kwargs)
+                flow_time = time.perf_counter() - opened
+        except Exception as e:
+            return RunResult(open_time, flow_time, type(e).__name__)
+        return RunResult(open_time, flow_time, None)
+
+    def run(self, runs: int) -> Dict[str, Any]:
+        """
+        运行runs次, 同时运行的数量不超过concurrency
+        Returns:
+            Dict: 吞吐量、错误率、流程和节点的耗时统计
+        """
+        from core.isolatedWorkers import IsolatedWorkers
+        from core.spanCollector import collector
+        collector.clear()
+        collector.enabled = True
+        workers = IsolatedWorkers(self._concurrency, on_exit=self._manager.close_pool, name="load")
+        begin = time.perf_counter()
+        try:
+            futures: List[Future] = [workers.submit(self._run_once) for _ in range(runs)]
+            results: List[RunResult] = [future.result() for future in futures]
+        finally:
+            wall = time.perf_counter() - begin
+            workers.close()
+        return self.report(results, wall, collector.spans())
+
+    def report(self, results: List[RunResult], wall: float, spans: List[Any]) -> Dict[str, Any]:
+        errors = Counter(result.error for result in results if result.error is not None)
+        succeeded = [result for result in results if result.error is None]
+        steps: Dict[str, List[float]] = defaultdict(list)
+        step_errors: Dict[str, int] = Counter()
+        for span in spans:
+            if span.kind != 'hop':
+                continue
+            steps[span.path].append(span.duration)
+            if span.outcome != 'ok':
+                step_errors[span.path] += 1
+        return {
+            'runs': len(results),
+            'concurrency': self._concurrency,
+            'wall_s': round(wall, 3),
+            'throughput_rps': round(len(succeeded) / wall, 3) if wall else 0.0,
+            'error_rate': round(sum(errors.values()) / len(results), 4) if results else 0.0,
+            'errors': dict(errors),
+            'open': summarize([result.open_time for result in results if result.open_time]),
+            'flow': summarize([result.flow_time for result in succeeded], sum(errors.values())),
+            'steps': {path: summarize(samples, step_errors[path]) for path, samples in steps.items()},
+        }
+
+
+def main(argv: List[str] | None = None) -> int:
+    defaults = get_default_options()
+    parser = argparse.ArgumentParser(description='并发重复运行页面函数, 输出吞吐量、错误率和耗时分位数')
+    parser.add_argument('target', help='页面函数, "模块名:函数名" 或唯一的函数名, 如 pre_application')
+    parser.add_argument('--event', action='append', default=[], help='需要执行的property, 可重复指定')
+    parser.add_argument('--kwargs', default=None, help='页面函数的覆盖参数(JSON), 与--event合并')
+    parser.add_argument('--runs', type=int, default=10, help='总运行次数')
+    parser.add_argument('--concurrency', type=int, default=4, help='同时运行的数量, 即工作线程数')
+    parser.add_argument('--env', default=defaults['env'], choices=['prod', 'test', 'local', 'bench'])
+    parser.add_argument('--browser', default=defaults['browser'], choices=['chrome', 'firefox', 'webkit'])
+    parser.add_argument('--profile', default=defaults['profile'], help='浏览器启动配置, 见config.yml的launch_profiles')
+    parser.add_argument('--network', default=defaults['network'], choices=['record', 'replay', 'live'])
+    parser.add_argument('--system', default='application', choices=['application', 'loans'])
+    parser.add_argument('--user', default=defaults['user'], help='复用该用户缓存的登录态')
+    parser.add_argument('--max-error-rate', type=float, default=None, help='错误率超过该值时以非0状态码退出, 用于拨测告警')
+    parser.add_argument('--output', default=None, help='把报告以JSON写入该文件')
+    parser.add_argument('--logLevel', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.logLevel, format='[%(asctime)s] [%(threadName)s] %(levelname)s: %(message)s')
+    kwargs = {event: None for event in args.event}
+    if args.kwargs:
+        kwargs.update(json.loads(args.kwargs))
+    if not kwargs:
+        parser.error('至少需要通过 --event 或 --kwargs 指定一个property')
+    func = resolve_page_function(args.target)
+
+    from core.webManger import WebManager
+    manager = WebManager(env=args.env, browser_type=args.browser, pool_size=1, network_mode=args.network,
+                         system=args.system, user=args.user, profile=args.profile)
+    try:
+        report = LoadRunner(manager, func, kwargs, args.concurrency).run(args.runs)
+    finally:
+        manager.close()
+    report = {'target': args.target, 'kwargs': kwargs, 'env': args.env, 'profile': args.profile,
+              'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'), **report}
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    if args.max_error_rate is not None and report['error_rate'] > args.max_error_rate:
+        print(f"错误率 {report['error_rate']:.2%} 超过阈值 {args.max_error_rate:.2%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,30 +1,141 @@
 import os
-import yaml
-import argparse
-from core.path import CONFIG_PATH
-from typing import Dict, Callable
+import types
+import pickle
+import threading
+from core.path import CONFIG_PATH, CACHE_PATH
+from typing import Any, Dict, Callable, Mapping, Tuple
 from configparser import ConfigParser
 
 yml_config_path = os.path.join(CONFIG_PATH, 'config.yml')
 method_mapping = os.path.join(CONFIG_PATH, 'method_mapping.ini')
+snapshot_path = os.path.join(CACHE_PATH, 'config_snapshot.pickle')
+
+# pytest命令行参数的内置默认值, 可在config.yml的default_options中覆盖
+DEFAULT_OPTIONS = {
+    'env': 'prod',
+    'logLevel': 'INFO',
+    'browser': 'chrome',
+    'asyncLog': False,
+    'stdoutTrace': False,
+    'spans': None,
+    'network': 'live',
+    'system': 'application',
+    'user': None,
+    'poolSize': None,
+    'profile': 'ci-fast',
+    'artifacts': 'trace',
+    'skipPageValidation': False,
+}
+
+
+class ConfigRegistry:
+    """
+    配置文件注册表, 每个文件只解析一次, 返回冻结(只读)的结果
+
+    - 通过 (mtime, inode, size) 判断文件是否变化, 变化后重新解析
+    - 解析结果同时写入 .cache/config_snapshot.pickle, 其他进程(如xdist worker)签名一致时直接读取快照, 跳过解析
+    """
+
+    _entries: Dict[str, Tuple[Tuple[int, int, int], Any]] = {}
+    _snapshot: Dict[str, Tuple[Tuple[int, int, int], Any]] | None = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    @classmethod
+    def freeze(cls, value: Any) -> Any:
+        """把dict转换为只读映射, list转换为tuple"""
+        if isinstance(value, dict):
+            return types.MappingProxyType({key: cls.freeze(item) for key, item in value.items()})
+        if isinstance(value, list):
+            return tuple(cls.freeze(item) for item in value)
+        return value
+
+    @classmethod
+    def _load_snapshot(cls) -> Dict[str, Tuple[Tuple[int, int, int], Any]]:
+        if cls._snapshot is None:
+            try:
+                with open(snapshot_path, 'rb') as file:
+                    cls._snapshot = pickle.load(file)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                cls._snapshot = {}
+        return cls._snapshot
+
+    @classmethod
+    def _save_snapshot(cls, path: str, signature: Tuple[int, int, int], raw: Any):
+        snapshot = cls._load_snapshot()
+        snapshot[path] = (signature, raw)
+        try:
+            os.makedirs(CACHE_PATH, exist_ok=True)
+            tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(snapshot, file)
+            os.replace(tmp_path, snapshot_path)
+        except OSError:
+            pass  # 快照只用于加速, 写入失败不影响读取配置
+
+    @classmethod
+    def load(cls, path: str, parser: Callable[[str], Any]) -> Any:
+        """
+        读取配置文件
+        Args:
+            path: 配置文件路径
+            parser: 把文件解析为dict等原始数据的函数
+
+        Returns:
+            Any: 冻结后的配置
+        """
+        path = os.path.abspath(path)
+        signature = cls._signature(path)
+        entry = cls._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with cls._lock:
+            entry = cls._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            cached = cls._load_snapshot().get(path)
+            if cached is not None and cached[0] == signature:
+                raw = cached[1]
+            else:
+                raw = parser(path)
+                cls._save_snapshot(path, signature, raw)
+            frozen = cls.freeze(raw)
+            cls._entries[path] = (signature, frozen)
+            return frozen
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._snapshot = None
+
+
+def _parse_yaml(file_path: str) -> Dict[str, Any]:
+    import yaml  # 只有快照失效时才需要解析yaml
+    with open(file_path, 'r') as file:
+        return yaml.safe_load(file)
+
+
+def _parse_ini(file_path: str) -> Dict[str, Dict[str, str]]:
+    parser = ConfigParser()
+    parser.optionxform = lambda option: option  # 不转换大小写
+    parser.read(file_path, encoding='utf-8')
+    return {section: dict(parser.items(section)) for section in parser.sections()}
 
 
 def config_reader(section_name: str, filename: str = method_mapping) -> Callable[
-    [Callable[[Dict[str, str]], Dict[str, str]]], Callable[[], Dict[str, str]]]:
-    def decorator(func: Callable[[Dict[str, str]], Dict[str, str]]) -> Callable[[], Dict[str, str]]:
-        def wrapper() -> Dict[str, str]:
-            parser = ConfigParser()
-            parser.optionxform = lambda option: option  # 不转换大小写
-            parser.read(filename, encoding='utf-8')
-            config = {}
-            if parser.has_section(section_name):
-                params = parser.items(section_name)
-                for param in params:
-                    config[param[0]] = param[1]
-            else:
+    [Callable[[Mapping[str, str]], Mapping[str, str]]], Callable[[], Mapping[str, str]]]:
+    def decorator(func: Callable[[Mapping[str, str]], Mapping[str, str]]) -> Callable[[], Mapping[str, str]]:
+        def wrapper() -> Mapping[str, str]:
+            sections = ConfigRegistry.load(filename, _parse_ini)
+            if section_name not in sections:
                 raise KeyError(f'Section {section_name} not found in {filename}')
 
-            return func(config)
+            return func(sections[section_name])
 
         return wrapper
 
@@ -32,19 +143,23 @@ def config_reader(section_name: str, filename: str = method_mapping) -> Callable
 
 
 @config_reader('mapping')
-def get_mapping(config: Dict[str, str]) -> Dict[str, str]:
+def get_mapping(config: Mapping[str, str]) -> Mapping[str, str]:
     return config
 
 
 @config_reader('page_locator_method_mapping')
-def get_page_locator_method_mapping(config: Dict[str, str]) -> Dict[str, str]:
+def get_page_locator_method_mapping(config: Mapping[str, str]) -> Mapping[str, str]:
     return config
 
 
-def _load_config(file_path=yml_config_path):
-    with open(file_path, 'r') as file:
-        config = yaml.safe_load(file)
-    return config
+def _load_config(file_path=yml_config_path) -> Mapping[str, Any]:
+    return ConfigRegistry.load(file_path, _parse_yaml)
+
+
+def preload_configs():
+    """解析所有配置文件并写入快照, 在xdist主进程中调用后, worker启动时可直接读取快照"""
+    _load_config(yml_config_path)
+    ConfigRegistry.load(method_mapping, _parse_ini)
 
 
 def get_application_config(environment, config_path=yml_config_path):
@@ -57,13 +172,65 @@ def get_loans_config(environment, config_path=yml_config_path):
     return config['loans'][environment]
 
 
-def parse_args():
-    parser = argparse.ArgumentParser(description='Process environment.')
-    parser.add_argument('--env', default='prod', type=str, required=False,
-                        choices=['prod', 'test', 'local'],
-                        help='选择执行的环境，说明：prod: com, test: us, local: 本地环境，./config/config.yml中可修改')
-    parser.add_argument('--logLevel', default='INFO', type=str, required=False,
-                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], help='设置控制台日志打印等级')
-    parser.add_argument('--browser', default='chrome', type=str, required=False,
-                        choices=['chrome', 'firefox', 'webkit'], help='设置测试所选择的浏览器')
-    return parser.parse_args()
+def get_system_config(system, environment, config_path=yml_config_path):
+    config = _load_config(config_path)
+    return config[system][environment]
+
+
+def get_pool_config(config_path=yml_config_path):
+    config = _load_config(config_path)
+    return config.get('pool_settings', {})
+
+
+def get_storage_state_config(config_path=yml_config_path):
+    config = _load_config(config_path)
+    return config.get('storage_state_settings', {})
+
+
+def get_wait_config(config_path=yml_config_path):
+    config = _load_config(config_path)
+    return config.get('wait_settings', {})
+
+
+def get_network_profile(name, config_path=yml_config_path):
+    config = _load_config(config_path)
+    profiles = config.get('network_profiles') or {}
+    if name is None:
+        return {}
+    if name not in profiles:
+        raise KeyError(f'network profile {name} not found in {config_path}')
+    return {'name': name, **(profiles[name] or {})}
+
+
+def get_failure_artifacts_config(config_path=yml_config_path):
+    config = _load_config(config_path)
+    return config.get('failure_artifacts', {})
+
+
+def get_log_archive_config(config_path=yml_config_path):
+    config = _load_config(config_path)
+    return config.get('log_archive', {})
+
+
+def get_launch_profile(name, config_path=yml_config_path):
+    config = _load_config(config_path)
+    profiles = config.get('launch_profiles') or {}
+    if name not in profiles:
+        raise KeyError(f'launch profile {name} not found in {config_path}')
+    return {'name': name, **(profiles[name] or {})}
+
+
+def get_launch_profile_names(config_path=yml_config_path) -> Tuple[str, ...]:
+    """config.yml的launch_profiles中所有启动配置的名称, 作为 --profile 的可选值"""
+    config = _load_config(config_path)
+    return tuple(config.get('launch_profiles') or {})
+
+
+def get_default_options(config_path=yml_config_path) -> Dict[str, Any]:
+    """
+    获取pytest命令行参数的默认值, 未在config.yml中配置的参数使用内置默认值
+    Returns:
+        Dict[str, Any]: 参数名到默认值的映射
+    """
+    config = _load_config(config_path)
+    return {**DEFAULT_OPTIONS, **(config.get('default_options') or {})}
@@ -0,0 +1,81 @@
+import os
+import mimetypes
+import threading
+from functools import partial
+from typing import Dict, Tuple
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(SimpleHTTPRequestHandler):
+    """优先返回内存中注册的页面, 未注册的路径按静态目录处理"""
+
+    def __init__(self, *args, pages: Dict[str, Tuple[bytes, str]], **kwargs):
+        self._pages = pages
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path in self._pages:
+            body, content_type = self._pages[path]
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    本地HTTP桩服务, 在后台线程中运行, 用于在不访问真实环境的情况下验证浏览器相关功能
+
+    用法::
+
+        with StubServer(pages={'/index.html': '<title>stub</title>'}) as stub:
+            page.goto(f"{stub.url}/index.html")
+    """
+
+    def __init__(self, pages: Dict[str, str | bytes] | None = None, directory: str | None = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            pages: 路径到页面内容的映射, Content-Type按扩展名推断, 默认text/html
+            directory: 静态文件目录, 默认当前工作目录
+            host: 监听地址
+            port: 监听端口, 0表示随机分配
+        """
+        registered = {}
+        for path, content in (pages or {}).items():
+            body = content.encode('utf-8') if isinstance(content, str) else content
+            content_type = mimetypes.guess_type(path)[0] or 'text/html'
+            registered[path] = (body, f"{content_type}; charset=utf-8")
+        handler = partial(_StubHandler, pages=registered, directory=directory or os.getcwd())
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,41 +1,123 @@
+import os
 import pytest
 import logging
-from time import sleep
-from common.decorator import Decorator
-from core.propertyResolver import PropertyResolver as p
-from core.webManger import WebManager
-from core.loggerManager import logger_init, logger_end
+from common.readConfig import get_default_options, get_launch_profile_names, preload_configs
 
-from common.readConfig import parse_args, get_application_config
+# playwright、属性解析器和浏览器管理器在fixture中按需导入, 保证 --collect-only 和xdist worker启动时不加载它们
+pytest_plugins = ['common.durationScheduler']
 
 
 def pytest_addoption(parser):
-    args = parse_args()
+    args = get_default_options()
     parser.addoption(
         "--env",
         action="store",
-        default=args.env,
+        default=args['env'],
         choices=['prod', 'test', 'local'],
         help='选择执行的环境，说明：prod: com, test: us, local: 本地环境，./config/config.yml中可修改'
     )
     parser.addoption(
         "--logLevel",
         action="store",
-        default=args.logLevel,
+        default=args['logLevel'],
         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
         help='设置控制台日志打印等级'
     )
     parser.addoption(
         '--browser',
         action="store",
-        default=args.browser,
+        default=args['browser'],
         choices=['chrome', 'firefox', 'webkit'],
         help='设置测试所选择的浏览器'
     )
+    parser.addoption(
+        '--asyncLog',
+        action="store_true",
+        default=args['asyncLog'],
+        help='通过QueueHandler在后台线程中格式化并写日志, 减少日志I/O对浏览器操作线程的阻塞'
+    )
+    parser.addoption(
+        '--stdoutTrace',
+        action="store_true",
+        default=args['stdoutTrace'],
+        help='在标准输出中打印locator链的构建过程'
+    )
+    parser.addoption(
+        '--spans',
+        action="store",
+        default=args['spans'],
+        help='记录每个页面节点的耗时span, 会话结束时导出spans.jsonl和spans.collapsed到该目录'
+    )
+    parser.addoption(
+        '--network',
+        action="store",
+        default=args['network'],
+        choices=['record', 'replay', 'live'],
+        help='网络模式, record: 录制HAR到./har, replay: 从HAR回放且不访问网络, live: 真实网络'
+    )
+    parser.addoption(
+        '--system',
+        action="store",
+        default=args['system'],
+        choices=['application', 'loans'],
+        help='被测系统, 决定首页地址和HAR文件目录(./har/<系统>/<环境>.har), 详见./config/config.yml'
+    )
+    parser.addoption(
+        '--user',
+        action="store",
+        default=args['user'],
+        help='登录用户, 指定后新建的context会复用该用户缓存的登录态(.cache/storage_state)'
+    )
+    parser.addoption(
+        '--profile',
+        action="store",
+        default=args['profile'],
+        choices=get_launch_profile_names(),
+        help='浏览器启动配置, 可选值为./config/config.yml中launch_profiles的名称, 内置 ci-fast: 无头+固定视口, '
+             'debug: 有头+慢动作+trace, record: 录制视频和trace'
+    )
+    parser.addoption(
+        '--artifacts',
+        action="store",
+        default=args['artifacts'],
+        choices=['off', 'screenshot', 'trace'],
+        help='失败现场, screenshot: 失败时保存截图和DOM, trace: 另外为每个用例录制trace分块, 只在失败时落盘'
+    )
+    parser.addoption(
+        '--skipPageValidation',
+        action="store_true",
+        default=args['skipPageValidation'],
+        help='跳过收集阶段对pages下页面描述的校验和预编译'
+    )
+    parser.addoption(
+        '--poolSize',
+        action="store",
+        type=int,
+        default=args['poolSize'],
+        help='浏览器池大小, 大于0时每个用例从池中租用独立的context, 默认读取./config/config.yml'
+    )
+
+
+@pytest.fixture(scope='session')
+def log_archive():
+    from core.loggerManager import LoggerManager
+    from common.readConfig import get_log_archive_config
+    settings = get_log_archive_config()
+    if not settings.get('enabled', True):
+        yield None
+        return
+    from core.logArchive import LogArchive
+    manager = LoggerManager()
+    manager.archive = LogArchive.from_settings(settings)
+    yield manager.archive
+    archive, manager.archive = manager.archive, None
+    archive.close()
 
 
-@pytest.fixture(scope='class', autouse=True)
-def setup_logger(request):
+@pytest.fixture(autouse=True)
+def setup_logger(request, log_archive):
+    """每个用例注册单独的日志文件和UI截图目录, 日志按当前线程/任务路由, 并发执行的用例互不干扰"""
+    from core.loggerManager import logger_init, logger_end
     log_level = request.config.getoption("--logLevel")
     log_level_mapping = {
         'INFO': logging.INFO,
@@ -45,37 +127,142 @@ def setup_logger(request):
         'CRITICAL': logging.CRITICAL
     }
 
-    logger_init(case_filepath=request.fspath.strpath, default_level=log_level_mapping[log_level])
+    logger_init(case_filepath=request.fspath.strpath, default_level=log_level_mapping[log_level],
+                async_mode=request.config.getoption("--asyncLog"), case_name=request.node.name)
     yield
     logger_end()
 
 
-@pytest.fixture(scope='session', autouse=True)
+@pytest.fixture(scope='session')
 def setup_environment(request):
+    """创建浏览器管理器, 默认page在第一次get_page时才打开首页, hermetic用例不会触发导航"""
+    from core.propertyResolver import PropertyResolver as p
+    from core.spanCollector import collector as span_collector
+    from core.webManger import WebManager
+    p.trace_stdout = request.config.getoption("--stdoutTrace")
+    spans_dir = request.config.getoption("--spans")
+    span_collector.enabled = spans_dir is not None
     environment = request.config.getoption("--env")
     browser = request.config.getoption("--browser")
-    page = WebManager(env=environment, browser_type=browser).get_page()
+    pool_size = request.config.getoption("--poolSize")
+    network_mode = request.config.getoption("--network")
+    system = request.config.getoption("--system")
+    user = request.config.getoption("--user")
+    profile = request.config.getoption("--profile")
+    manager = WebManager(env=environment, browser_type=browser, pool_size=pool_size, network_mode=network_mode,
+                         system=system, user=user, profile=profile)
+    yield manager
+    manager.settle()
+    manager.close()
+    export_spans(spans_dir)
+
+
+def export_spans(spans_dir):
+    if spans_dir is None:
+        return
+    from core.spanCollector import collector as span_collector
+    span_collector.export_jsonl(os.path.join(spans_dir, 'spans.jsonl'))
+    span_collector.export_collapsed(os.path.join(spans_dir, 'spans.collapsed'))
+
+
+def is_hermetic(request) -> bool:
+    return request.node.get_closest_marker('hermetic') is not None
+
+
+@pytest.fixture(autouse=True)
+def setup_page(request):
+    # hermetic用例自行管理context和网络, 需要浏览器管理器时显式依赖setup_environment
+    if is_hermetic(request):
+        yield None
+        return
+    manager = request.getfixturevalue('setup_environment')
+    if not manager.pool_enabled:
+        yield
+        return
+    with manager.lease_page() as page:
+        yield page
+
+
+@pytest.fixture(scope='session')
+def failure_artifacts(request, setup_environment):
+    from core.failureArtifacts import FailureArtifacts
+    from core.webManger import WebManager
+    from common.readConfig import get_failure_artifacts_config
+    mode = request.config.getoption("--artifacts")
+    if mode == 'trace' and WebManager().launch_profile.trace:
+        mode = 'screenshot'  # 启动配置已经录制完整trace, 不再分块
+    artifacts = FailureArtifacts(mode, get_failure_artifacts_config())
+    yield artifacts
+    artifacts.close()
+
+
+@pytest.fixture(autouse=True)
+def capture_failure(request, setup_logger, setup_page):
+    if is_hermetic(request):
+        yield
+        return
+    failure_artifacts = request.getfixturevalue('failure_artifacts')
+    if not failure_artifacts.enabled:
+        yield
+        return
+    from core.webManger import WebManager
+    from core.loggerManager import get_ui_screenshot_dir
+    page = WebManager().get_page()
+    failure_artifacts.begin(page, request.node.nodeid)
     yield
-    sleep(2)
-    page.close()
+    reports = request.node.stash.get(phase_reports_key, {})
+    failed = reports.get('call') is not None and reports['call'].failed
+    directory = get_ui_screenshot_dir()
+    error = reports['call'].longreprtext if failed else None
+    failure_artifacts.end(page, failed, directory, error)
 
 
-def pytest_collection_modifyitems(session: "Session", config: "Config", items: list["Item"]):
-    appoint_classes = {"TestPreApplication": [],
-                       }
+phase_reports_key = pytest.StashKey[dict]()
 
-    for item in items:
-        for cls_name in appoint_classes:
-            if item.parent.name == cls_name:
-                appoint_classes[cls_name].append(item)
-    items.clear()
-    for cases in appoint_classes.values():
-        items.extend(cases)
 
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    item.stash.setdefault(phase_reports_key, {})[report.when] = report
+
+
+def pytest_collection_modifyitems(session: "Session", config: "Config", items: list["Item"]):
+    # 保留收集到的全部用例及其顺序, 用例的选择交给 -k/-m, 分配交给按耗时调度的xdist调度器
     for item in items:
         item.name = item.name.encode("utf-8").decode("unicode_escape")
         item._nodeid = item.nodeid.encode("utf-8").decode("unicode_escape")
 
 
+def pytest_sessionstart(session):
+    config = session.config
+    # 校验需要playwright的方法签名: 只在主进程中执行一次, xdist worker和 --collect-only 不加载playwright
+    if hasattr(config, 'workerinput') or config.option.collectonly or config.getoption("--skipPageValidation"):
+        return
+    # xdist主进程不执行用例, 预编译的执行计划无法传给worker
+    validate_page_descriptions(config, precompile=not getattr(config.option, 'numprocesses', None))
+
+
+def validate_page_descriptions(config, precompile=True):
+    """在启动浏览器之前校验所有页面描述, 存在error时终止本次运行"""
+    from core.pageValidator import validate_pages
+    issues = validate_pages(precompile=precompile)
+    reporter = config.pluginmanager.get_plugin('terminalreporter')
+    if reporter is not None:
+        for issue in issues:
+            if issue.severity != 'error':
+                reporter.write_line(str(issue), yellow=True)
+    errors = [str(issue) for issue in issues if issue.severity == 'error']
+    if errors:
+        raise pytest.UsageError("页面描述校验失败:\n" + "\n".join(errors))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "hermetic: 用例自行管理context和网络, 不打开默认首页, 也不采集失败现场")
+    # xdist主进程预先解析配置并写入快照, worker直接复用
+    if not hasattr(config, 'workerinput'):
+        preload_configs()
+
+
 # def pytest_configure(config):
 #     Decorator.import_and_decorate_modules('pages', p.base)
@@ -0,0 +1,306 @@
+import re
+import time
+import asyncio
+import inspect
+from typing import Any, Dict, List, NamedTuple, Tuple
+from .batchFill import is_css_selector
+from .loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+# 与playwright expect相同的轮询间隔(秒), 最后一个间隔重复使用
+POLL_INTERVALS = (0.1, 0.25, 0.5, 1.0)
+DEFAULT_TIMEOUT = 5000
+
+# 作用在locator上的断言, 值为(expect方法, 期望值对应的参数名), 参数名为None时期望值按位置传入
+LOCATOR_CHECKS: Dict[str, Tuple[str, str | None]] = {
+    'visible': ('to_be_visible', 'visible'),
+    'text': ('to_have_text', None),
+    'contains_text': ('to_contain_text', None),
+    'value': ('to_have_value', None),
+    'count': ('to_have_count', None),
+    'checked': ('to_be_checked', 'checked'),
+    'enabled': ('to_be_enabled', 'enabled'),
+    'attribute': ('to_have_attribute', None),
+}
+# 作用在page上的断言
+PAGE_CHECKS: Dict[str, Tuple[str, str | None]] = {
+    'url': ('to_have_url', None),
+    'title': ('to_have_title', None),
+}
+
+# 一次evaluate中计算所有断言, 返回每个断言的 [是否通过, 实际值, 模式], 模式为error时表示无法在页面内判断
+_CHECK_FUNCTION = """(elements, checks) => {
+    const normalize = s => (s || '').replace(/\\s+/g, ' ').trim();
+    const match = (actual, expected, partial) => {
+        if (actual === null || actual === undefined) return false;
+        if (expected !== null && typeof expected === 'object') {
+            return new RegExp(expected.pattern, expected.flags).test(actual);
+        }
+        return partial ? actual.includes(expected) : actual === expected;
+    };
+    const visible = el => {
+        if (!el || !el.isConnected || getComputedStyle(el).visibility === 'hidden') return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    // page范围的断言elements为null, fields在整个document中查找
+    const root = elements === null ? document : (elements.length === 1 ? elements[0] : null);
+    elements = elements || [];
+    const single = elements.length === 1 ? elements[0] : null;
+    return checks.map(([kind, selector, expected]) => {
+        try {
+            switch (kind) {
+                case 'count': return [elements.length === expected, elements.length, kind];
+                case 'url': return [match(location.href, expected), location.href, kind];
+                case 'title': return [match(document.title, expected), document.title, kind];
+            }
+            if (kind === 'field') {
+                const target = root && root.querySelector(selector);
+                if (!target) return [false, null, 'missing'];
+                if (['INPUT', 'TEXTAREA', 'SELECT'].includes(target.tagName)) {
+                    return [match(target.value, expected), target.value, 'value'];
+                }
+                const text = normalize(target.textContent);
+                return [match(text, expected), text, 'text'];
+            }
+            if (kind === 'visible') return [visible(single) === expected, single ? visible(single) : null, kind];
+            if (!single) return [false, null, kind];
+            switch (kind) {
+                case 'text': return [match(normalize(single.textContent), expected), normalize(single.textContent), kind];
+                case 'contains_text': return [match(normalize(single.textContent), expected, true), normalize(single.textContent), kind];
+                case 'value': return [match(single.value, expected), single.value, kind];
+                case 'attribute': return [match(single.getAttribute(expected[0]), expected[1]), single.getAttribute(expected[0]), kind];
+            }
+            return [false, null, 'error'];
+        } catch (e) {
+            return [false, String(e), 'error'];
+        }
+    });
+}"""
+LOCATOR_SCRIPT = _CHECK_FUNCTION
+PAGE_SCRIPT = f"checks => ({_CHECK_FUNCTION})(null, checks)"
+# checked/enabled在playwright中还要考虑aria-checked、aria-disabled和禁用的fieldset等, 只交给expect判断,
+# 保证批量断言与expect的结果一致
+EXPECT_ONLY_CHECKS = frozenset({'checked', 'enabled'})
+# 回退时按目标元素判断field断言比较value还是文本, 与页面内断言的规则一致
+_IS_FORM_FIELD = "element => ['INPUT', 'TEXTAREA', 'SELECT'].includes(element.tagName)"
+
+
+class Check(NamedTuple):
+    """编译后的单个断言"""
+    kind: str  # LOCATOR_CHECKS/PAGE_CHECKS中的断言类型, 或 field
+    selector: str | None  # field断言的选择器
+    expected: Any  # 期望值, attribute为(属性名, 值)
+    timeout: float  # 超时时间(毫秒)
+    in_page: bool  # 能否在页面内批量判断
+    log_str: str
+
+
+def _flags(pattern: re.Pattern) -> str:
+    return ''.join(flag for bit, flag in ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+                   if pattern.flags & bit)
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, re.Pattern):
+        return {'pattern': value.pattern, 'flags': _flags(value)}
+    if isinstance(value, tuple):
+        return [_serialize(item) for item in value]
+    return value
+
+
+def _unpack(value: Any, timeout: float) -> Tuple[Any, float]:
+    """断言值可以写成 {'expected': ..., 'timeout': ...} 以单独指定超时"""
+    if isinstance(value, dict) and 'expected' in value:
+        return value['expected'], value.get('timeout', timeout)
+    return value, timeout
+
+
+def compile_assertions(spec: Any, has_locator: bool, log_msg: str,
+                       default_timeout: float = DEFAULT_TIMEOUT) -> Tuple[Check, ...]:
+    """
+    解析节点的assert指令
+        'assert': {
+            'visible': True, 'text': 'Yes', 'contains_text': re.compile('loan'), 'value': 'a@b.com', 'count': 2,
+            'checked': True, 'enabled': True, 'attribute': {'name': 'aria-checked', 'value': 'true'},
+            'url': re.compile('/preapp'), 'title': 'Zeitro',
+            'fields': {'#email': 'a@b.com', '#agree': True, '#phone': {'expected': '123', 'timeout': 2000}},
+            'timeout': 5000,
+        }
+    locator断言作用在节点的locator上, url/title作用在page上, fields在locator(没有locator时为整个页面)内按选择器检查值或文本,
+    期望值为bool的field检查是否选中; 每个断言可以写成 {'expected': 值, 'timeout': 毫秒} 单独指定超时
+    checked/enabled和bool类型的field不在页面内批量判断, 直接使用playwright expect
+    Raises:
+        ValueError: 断言无法解析
+    """
+    if spec is None:
+        return ()
+    if not isinstance(spec, dict):
+        raise ValueError(f"assert必须是映射, 实际为 {type(spec).__name__}")
+    timeout = spec.get('timeout', default_timeout)
+    checks = []
+    for kind, value in spec.items():
+        if kind == 'timeout':
+            continue
+        if kind == 'fields':
+            if not isinstance(value, dict):
+                raise ValueError("fields必须是选择器到期望值的映射")
+            for selector, item in value.items():
+                expected, field_timeout = _unpack(item, timeout)
+                in_page = is_css_selector(selector) and not isinstance(expected, bool)
+                checks.append(Check('field', selector, expected, field_timeout, in_page,
+                                    f"{log_msg}.locator({selector}) == {expected!r}"))
+            continue
+        expected, check_timeout = _unpack(value, timeout)
+        if kind in PAGE_CHECKS:
+            owner = 'page'
+        elif kind in LOCATOR_CHECKS:
+            if not has_locator:
+                raise ValueError(f"{kind} 断言需要locator")
+            owner = log_msg
+        else:
+            raise ValueError(f"未知的断言 {kind}, 可选 {sorted([*LOCATOR_CHECKS, *PAGE_CHECKS, 'fields'])}")
+        if kind == 'attribute':
+            if not isinstance(expected, dict) or 'name' not in expected:
+                raise ValueError("attribute断言需要 {'name': 属性名, 'value': 期望值}")
+            expected = (expected['name'], expected.get('value'))
+        checks.append(Check(kind, None, expected, check_timeout, kind not in EXPECT_ONLY_CHECKS,
+                            f"expect({owner}).{kind} == {expected!r}"))
+    return tuple(checks)
+
+
+class _Poller:
+    """
+    与I/O无关的轮询状态: 每轮把仍未通过的页面内断言交给一次evaluate, 通过的移除,
+    超时或无法在页面内判断的转入fallback, 由playwright expect给出准确的失败信息
+    """
+
+    def __init__(self, checks: Tuple[Check, ...]):
+        self.start = time.monotonic()
+        self.pending: List[Check] = [check for check in checks if check.in_page]
+        self.fallback: List[Tuple[Check, str | None]] = [(check, None) for check in checks if not check.in_page]
+        self._round = 0
+
+    def payload(self) -> List[list]:
+        return [[check.kind, check.selector, _serialize(check.expected)] for check in self.pending]
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.start) * 1000
+
+    def feed(self, results: List[list] | None) -> float | None:
+        """
+        处理一轮evaluate的结果, results为None表示本轮evaluate失败(如页面正在跳转)
+        Returns:
+            float | None: 下一轮前需要等待的秒数, None表示轮询结束
+        """
+        elapsed = self.elapsed_ms()
+        still_pending = []
+        for index, check in enumerate(self.pending):
+            passed, _actual, mode = results[index] if results is not None else (False, None, None)
+            if passed:
+                continue
+            if mode == 'error' or elapsed >= check.timeout:
+                self.fallback.append((check, mode))
+            else:
+                still_pending.append(check)
+        self.pending = still_pending
+        if not self.pending:
+            return None
+        interval = POLL_INTERVALS[min(self._round, len(POLL_INTERVALS) - 1)]
+        self._round += 1
+        nearest = min(check.timeout for check in self.pending) - elapsed
+        return max(0.0, min(interval, nearest / 1000))
+
+    def remaining(self, check: Check) -> float:
+        # expect的timeout为0表示不限时, 已超时的断言至少给1ms以便立即给出失败信息
+        return max(1.0, check.timeout - self.elapsed_ms())
+
+
+def _expectation(expect: Any, page: Any, locator: Any, check: Check, mode: str | None, timeout: float) -> Any:
+    if check.kind == 'field':
+        target = locator.locator(check.selector)
+        if mode == 'missing':
+            return expect(target).to_be_attached(timeout=timeout)
+        if isinstance(check.expected, bool):
+            return expect(target).to_be_checked(checked=check.expected, timeout=timeout)
+        if mode == 'text':
+            return expect(target).to_have_text(check.expected, timeout=timeout)
+        return expect(target).to_have_value(check.expected, timeout=timeout)
+    if check.kind in PAGE_CHECKS:
+        method, keyword = PAGE_CHECKS[check.kind]
+        assertions = expect(page)
+    else:
+        method, keyword = LOCATOR_CHECKS[check.kind]
+        assertions = expect(locator)
+    if keyword is not None:
+        return getattr(assertions, method)(**{keyword: check.expected}, timeout=timeout)
+    if check.kind == 'attribute':
+        return getattr(assertions, method)(*check.expected, timeout=timeout)
+    return getattr(assertions, method)(check.expected, timeout=timeout)
+
+
+def _needs_field_mode(check: Check, mode: str | None) -> bool:
+    """没有在页面内判断过的field断言(非CSS选择器或evaluate出错)需要先确定比较value还是文本"""
+    return check.kind == 'field' and not isinstance(check.expected, bool) and mode not in ('text', 'value', 'missing')
+
+
+def verify(page: Any, locator: Any, checks: Tuple[Check, ...]) -> Any:
+    """
+    在一次evaluate中轮询节点的所有断言, 直到全部通过或超时, 未通过的断言交给playwright expect给出准确的失败信息
+    Args:
+        page: 当前page
+        locator: 节点的locator, 没有locator时与page相同; async_api的对象返回协程
+
+    Raises:
+        AssertionError: 断言失败
+    """
+    if inspect.iscoroutinefunction(page.evaluate):
+        return _verify_async(page, locator, checks)
+    from playwright.sync_api import expect, Error
+    poller = _Poller(checks)
+    while poller.pending:
+        try:
+            if locator is page:
+                results = page.evaluate(PAGE_SCRIPT, poller.payload())
+            else:
+                results = locator.evaluate_all(LOCATOR_SCRIPT, poller.payload())
+        except Error as e:
+            logger.debug("断言evaluate失败, 继续轮询: %r", e)
+            results = None
+        delay = poller.feed(results)
+        if delay is None:
+            break
+        time.sleep(delay)
+    for check, mode in poller.fallback:
+        logger.debug("断言回退为expect: %s", check.log_str)
+        if _needs_field_mode(check, mode):
+            target = locator.locator(check.selector).first
+            expect(target).to_be_attached(timeout=poller.remaining(check))
+            mode = 'value' if target.evaluate(_IS_FORM_FIELD) else 'text'
+        _expectation(expect, page, locator, check, mode, poller.remaining(check))
+
+
+async def _verify_async(page: Any, locator: Any, checks: Tuple[Check, ...]):
+    from playwright.async_api import expect, Error
+    poller = _Poller(checks)
+    while poller.pending:
+        try:
+            if locator is page:
+                results = await page.evaluate(PAGE_SCRIPT, poller.payload())
+            else:
+                results = await locator.evaluate_all(LOCATOR_SCRIPT, poller.payload())
+        except Error as e:
+            logger.debug("断言evaluate失败, 继续轮询: %r", e)
+            results = None
+        delay = poller.feed(results)
+        if delay is None:
+            break
+        await asyncio.sleep(delay)
+    for check, mode in poller.fallback:
+        logger.debug("断言回退为expect: %s", check.log_str)
+        if _needs_field_mode(check, mode):
+            target = locator.locator(check.selector).first
+            await expect(target).to_be_attached(timeout=poller.remaining(check))
+            mode = 'value' if await target.evaluate(_IS_FORM_FIELD) else 'text'
+        await _expectation(expect, page, locator, check, mode, poller.remaining(check))
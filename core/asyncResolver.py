@@ -0,0 +1,221 @@
+import asyncio
+import inspect
+import functools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+from .loggerManager import LazyLogger
+from .propertyResolver import PropertyResolver, Step
+from .spanCollector import collector
+from .assertionEngine import verify
+from .locatorCache import locator_cache
+from .networkProfile import NetworkProfile, HarArchive
+from .waiter import RetryPolicy, retry_async
+from .launchProfile import LaunchProfile
+from common.readConfig import get_system_config, get_network_profile, get_wait_config, get_launch_profile
+from playwright.async_api import async_playwright, Playwright, Browser, BrowserType, Page, Error as PlaywrightError
+
+logger = LazyLogger()
+
+# 当前协程所使用的page, 每个asyncio任务拥有独立的上下文副本
+_current_page: ContextVar[Page | None] = ContextVar("async_current_page", default=None)
+
+
+class AsyncWebManager:
+    """
+    基于playwright.async_api的浏览器管理器
+
+    与WebManager不同, 它不是单例: 实例绑定在创建它的事件循环上, 一个浏览器可同时租出多个隔离的page
+
+    用法::
+
+        async with AsyncWebManager(env='test') as manager:
+            async with manager.lease_page():
+                await aio(pre_application)(refinance_my_home=None)
+    """
+
+    def __init__(self, env='prod', browser_type='chrome', headless=None, network_mode='live', system='application',
+                 profile='ci-fast'):
+        self._env = env
+        self._browser_type = browser_type
+        self._config = get_system_config(system, self._env)
+        self._proxy_settings = self._config['proxy_settings']
+        self._url_settings = self._config['url_settings']
+        self._network_profile = NetworkProfile(get_network_profile(self._config.get('network_profile')),
+                                               system, self._env)
+        self._har = HarArchive.for_environment(system, self._env, network_mode)
+        self._wait_settings = get_wait_config()
+        self._retry_policy = RetryPolicy.from_settings(self._wait_settings.get('retry'))
+        self._launch_profile = LaunchProfile(get_launch_profile(profile))
+        if headless is not None:
+            self._launch_profile.headless = headless
+        self._options = self._launch_profile.launch_options(browser_type)
+        if self._proxy_settings['enable_proxy']:
+            self._options['proxy'] = {
+                'server': f'{self._proxy_settings["host"]}:{self._proxy_settings["port"]}'
+            }
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+
+    async def __aenter__(self) -> "AsyncWebManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _select_browser(self, playwright: Playwright) -> BrowserType:
+        if self._browser_type == 'firefox':
+            return playwright.firefox
+        if self._browser_type == 'webkit':
+            return playwright.webkit
+        return playwright.chromium
+
+    async def start(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._select_browser(self._playwright).launch(**self._options)
+
+    async def _open(self, page: Page) -> Page:
+        url = f"{self._url_settings['url']}{self._url_settings.get('path', '')}"
+        await retry_async(lambda: page.goto(url, timeout=self._wait_settings.get('goto_timeout', 20000),
+                                            wait_until=self._wait_settings.get('wait_until', 'load')),
+                          self._retry_policy, retry_on=(PlaywrightError,), description=f"打开网页 {url}")
+        return page
+
+    @asynccontextmanager
+    async def lease_page(self, **context_options: Any) -> AsyncIterator[Page]:
+        """
+        创建一个隔离的context并打开首页, 期间当前任务中的page函数都作用在该page上
+        Yields:
+            Page: 已打开首页的page
+        """
+        context = await self._browser.new_context(**{**self._launch_profile.context_options(), **context_options})
+        token = None
+        try:
+            await self._launch_profile.start_tracing_async(context)
+            await self._network_profile.apply_async(context)
+            await self._har.apply_async(context)
+            page = await self._open(await context.new_page())
+            token = _current_page.set(page)
+            yield page
+        finally:
+            try:
+                if token is not None:
+                    _current_page.reset(token)
+                    await self._launch_profile.stop_tracing_async(context)
+            finally:
+                # 保存trace失败时也要关闭context, 否则context会一直占用浏览器资源
+                await context.close()
+
+    async def close(self):
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class AsyncPropertyResolver:
+    """properties参数解析器的asyncio版本, 复用PropertyResolver编译出的执行计划"""
+
+    @classmethod
+    async def __execute(cls, step: Step) -> Any:
+        page = _current_page.get()
+        if page is None:
+            raise RuntimeError("当前任务没有可用的page, 请在AsyncWebManager.lease_page()中执行")
+        locator = locator_cache.get(page, step.spec) if step.locators else None
+        if locator is None:
+            locator = page
+            for call in step.locators:
+                with collector.span(step.node, 'locator', call.method):
+                    locator = PropertyResolver._invoke(locator, call)
+                    if inspect.isawaitable(locator):
+                        locator = await locator
+            if step.locators and isinstance(locator, Page):
+                logger.error(f"locator为None，检查页面元素: {step.log_str}是否存在")
+                assert False
+            if step.locators:
+                locator_cache.put(page, step.spec, locator)
+        if not step.operations and not step.waits and not step.assertions:
+            logger.error(f"不存在操作对象Locator 或者 Page，无法执行操作: {step.log_str}")
+            return None
+        result = None
+        for call in step.operations:
+            with collector.span(step.node, 'operation', call.method):
+                result = PropertyResolver._invoke(locator, call)
+                if inspect.isawaitable(result):
+                    result = await result
+        for target, call in step.waits:
+            with collector.span(step.node, 'wait', call.method):
+                await PropertyResolver._invoke(page if target == 'page' else locator, call)
+        if step.assertions:
+            with collector.span(step.node, 'assert', str(len(step.assertions))):
+                await verify(page, locator, step.assertions)
+        return result
+
+    @classmethod
+    async def run_steps(cls, steps: Tuple[Step, ...] | List[Step]) -> Any:
+        result = None
+        for step in steps:
+            logger.debug("处理节点: %s", step.node)
+            with collector.span(step.node, 'hop', step.log_str):
+                result = await cls.__execute(step)
+        return result
+
+    @classmethod
+    def base(cls, func: Callable[..., Dict[str, Any]]) -> Callable[..., Any]:
+        """把页面函数装饰为协程, 在当前任务租用的page上顺序执行所有事件"""
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            plan = PropertyResolver.compile(func, **kwargs)
+            logger.info("开始处理事件: %s", func.__name__)
+            await cls.run_steps(plan)
+
+        return wrapper
+
+    @classmethod
+    async def run_concurrently(cls, manager: AsyncWebManager, func: Callable[..., Dict[str, Any]],
+                               concurrency: int = 4, **kwargs: Any) -> Dict[str, Any]:
+        """
+        把页面函数中相互独立的顶层事件分别放到独立的page上并发执行
+        Args:
+            manager: 提供page的AsyncWebManager
+            func: 页面函数, 可以是@P.base装饰后的函数
+            concurrency: 同时执行的事件数量上限
+            **kwargs: 需要执行的property及其覆盖参数
+
+        Returns:
+            Dict[str, Any]: 事件名到执行结果的映射, 执行失败的事件对应其异常
+        """
+        func = getattr(func, '__wrapped__', func)
+        plan = PropertyResolver.compile(func, **kwargs)
+        events: Dict[str, List[Step]] = {}
+        for step in plan:
+            events.setdefault(step.event, []).append(step)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_event(steps: List[Step]) -> Any:
+            async with semaphore:
+                async with manager.lease_page():
+                    return await cls.run_steps(steps)
+
+        results = await asyncio.gather(*(run_event(steps) for steps in events.values()), return_exceptions=True)
+        for event, result in zip(events, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{func.__name__}::{event} 执行失败: {result!r}")
+        return dict(zip(events, results))
+
+
+def aio(page_function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    获取@P.base页面函数的async版本
+    Args:
+        page_function: @PropertyResolver.base装饰后的页面函数
+
+    Returns:
+        Callable: 在当前任务租用的page上执行的协程函数
+    """
+    return AsyncPropertyResolver.base(getattr(page_function, '__wrapped__', page_function))
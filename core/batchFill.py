@@ -0,0 +1,165 @@
+import re
+import inspect
+from typing import Any, List, Mapping, Tuple
+from .loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+# page描述中批量填写表单的操作名, 如 'op': {'batch': {'#email': 'a@b.com', '#agree': True}}
+BATCH_METHOD = 'batch'
+
+# 在一次evaluate中按顺序填写所有字段, 通过原生value setter赋值(React等框架才能感知变化)并派发input/change事件,
+# 返回无法在页面内处理的字段下标, 由调用方逐个回退到playwright的fill/select_option/set_checked
+_FILL_FUNCTION = """(root, fields) => {
+    const failed = [];
+    const setters = new Map([
+        ['INPUT', Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set],
+        ['TEXTAREA', Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set],
+        ['SELECT', Object.getOwnPropertyDescriptor(HTMLSelectElement.prototype, 'value').set],
+    ]);
+    fields.forEach(([selector, value], index) => {
+        let element = null;
+        try {
+            element = root.querySelector(selector);
+        } catch (e) {
+            failed.push(index);
+            return;
+        }
+        if (!element || element.disabled || element.readOnly || !setters.has(element.tagName)) {
+            failed.push(index);
+            return;
+        }
+        if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
+            // 单选框不能取消选中, 交给回退逻辑报错
+            if (typeof value !== 'boolean' || (element.type === 'radio' && !value)) {
+                failed.push(index);
+            } else if (element.checked !== value) {
+                element.click();
+            }
+            return;
+        }
+        if (typeof value === 'boolean' || element.type === 'file') {
+            failed.push(index);
+            return;
+        }
+        let text = String(value);
+        if (element.tagName === 'SELECT') {
+            const option = Array.from(element.options).find(o => o.value === text)
+                || Array.from(element.options).find(o => o.textContent.trim() === text);
+            if (!option) {
+                failed.push(index);
+                return;
+            }
+            text = option.value;
+        }
+        element.focus();
+        setters.get(element.tagName).call(element, text);
+        element.dispatchEvent(new Event('input', {bubbles: true}));
+        element.dispatchEvent(new Event('change', {bubbles: true}));
+        element.blur();
+    });
+    return failed;
+}"""
+LOCATOR_SCRIPT = _FILL_FUNCTION
+PAGE_SCRIPT = f"fields => ({_FILL_FUNCTION})(document, fields)"
+
+# playwright自定义的选择器引擎(text=、xpath=、role=...)、xpath和 >> 链式选择器无法交给querySelector处理
+_ENGINE_PREFIX = re.compile(r'^[\w-]+=')
+
+
+def is_css_selector(selector: str) -> bool:
+    """选择器能否直接交给页面内的querySelector"""
+    return not (_ENGINE_PREFIX.match(selector) or selector.startswith(('/', '..', '(')) or '>>' in selector)
+
+
+def split_fields(fields: Mapping[str, Any]) -> Tuple[List[Tuple[str, Any]], List[Tuple[str, Any]]]:
+    """
+    把批量填写的字段分为可在页面内直接处理的CSS字段和需要逐个回退的字段
+    Returns:
+        Tuple: (css字段列表, 回退字段列表), 元素均为(选择器, 值)
+    """
+    css_fields, fallback = [], []
+    for selector, value in fields.items():
+        if selector.startswith('css='):
+            css_fields.append((selector[4:], value))
+        elif is_css_selector(selector):
+            css_fields.append((selector, value))
+        else:
+            fallback.append((selector, value))
+    return css_fields, fallback
+
+
+def _is_page(obj: Any) -> bool:
+    return type(obj).__name__ == 'Page'
+
+
+# 回退时判断字段类型: select需要select_option, 单选框不能取消选中
+_FIELD_KIND = "element => element.tagName === 'SELECT' ? 'select' : (element.type === 'radio' ? 'radio' : 'input')"
+
+
+def _radio_unchecked_error(selector: str) -> ValueError:
+    return ValueError(f"单选框 {selector} 不能取消选中, 请选中同组的另一个选项")
+
+
+def _fallback_call(obj: Any, selector: str, value: Any) -> Any:
+    locator = obj.locator(selector)
+    if value is True:
+        return locator.set_checked(True)
+    kind = locator.evaluate(_FIELD_KIND)
+    if value is False:
+        if kind == 'radio':
+            raise _radio_unchecked_error(selector)
+        return locator.set_checked(False)
+    if kind == 'select':
+        return locator.select_option(str(value))
+    return locator.fill(str(value))
+
+
+async def _fallback_call_async(obj: Any, selector: str, value: Any) -> Any:
+    locator = obj.locator(selector)
+    if value is True:
+        return await locator.set_checked(True)
+    kind = await locator.evaluate(_FIELD_KIND)
+    if value is False:
+        if kind == 'radio':
+            raise _radio_unchecked_error(selector)
+        return await locator.set_checked(False)
+    if kind == 'select':
+        return await locator.select_option(str(value))
+    return await locator.fill(str(value))
+
+
+def batch_fill(obj: Any, fields: Mapping[str, Any]) -> Any:
+    """
+    在Page或Locator范围内批量填写表单, 大部分字段只需一次浏览器往返
+    Args:
+        obj: Page或Locator, 为Locator时只在该元素内查找字段; async_api的对象返回协程
+        fields: 选择器到值的映射, 布尔值用于勾选框和单选框, 单选框只能为True
+
+    Returns:
+        List[str]: 回退到逐个操作的字段选择器
+
+    Raises:
+        ValueError: 单选框的值为False
+    """
+    if inspect.iscoroutinefunction(obj.evaluate):
+        return _batch_fill_async(obj, fields)
+    css_fields, fallback = split_fields(fields)
+    if css_fields:
+        failed = obj.evaluate(PAGE_SCRIPT if _is_page(obj) else LOCATOR_SCRIPT, css_fields)
+        fallback.extend(css_fields[index] for index in failed)
+    for selector, value in fallback:
+        logger.debug("批量填写回退为逐个操作: %s", selector)
+        _fallback_call(obj, selector, value)
+    return [selector for selector, _ in fallback]
+
+
+async def _batch_fill_async(obj: Any, fields: Mapping[str, Any]) -> List[str]:
+    css_fields, fallback = split_fields(fields)
+    if css_fields:
+        failed = await obj.evaluate(PAGE_SCRIPT if _is_page(obj) else LOCATOR_SCRIPT, css_fields)
+        fallback.extend(css_fields[index] for index in failed)
+    for selector, value in fallback:
+        logger.debug("批量填写回退为逐个操作: %s", selector)
+        await _fallback_call_async(obj, selector, value)
+    return [selector for selector, _ in fallback]
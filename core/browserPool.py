@@ -0,0 +1,105 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+from playwright.sync_api import sync_playwright, Playwright, Browser, BrowserType, BrowserContext
+
+
+class PooledBrowser:
+    """池中的一个浏览器实例及其使用统计"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.uses = 0  # 已经租出的context次数
+        self.leased = 0  # 当前未归还的context数量
+        self.alive = True
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, _browser: Browser):
+        self.alive = False
+
+    def is_healthy(self) -> bool:
+        """浏览器进程仍然连接, 即视为健康"""
+        return self.alive and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    浏览器池, 预热N个浏览器, 每次租出一个全新的隔离BrowserContext
+
+    playwright的sync_api不是线程安全的, 池及其浏览器只能在创建它的线程中使用,
+    多线程并发时每个线程需要持有自己的池, 参见 WebManager.get_pool
+    """
+
+    def __init__(self, select_browser: Callable[[Playwright], BrowserType], launch_options: Dict[str, Any],
+                 size: int = 2, max_uses: int = 50, context_options: Dict[str, Any] | None = None,
+                 playwright: Playwright | None = None):
+        """
+        Args:
+            select_browser: 根据playwright实例返回要启动的BrowserType
+            launch_options: 启动浏览器的参数
+            size: 池中常驻的浏览器数量
+            max_uses: 单个浏览器租出context的次数上限, 达到后关闭并重新启动
+            context_options: 创建context时使用的参数
+            playwright: 当前线程已启动的playwright实例, 同一线程只能启动一个sync playwright,
+                为None时由池自行启动并在close时停止
+        """
+        self._select_browser = select_browser
+        self._launch_options = launch_options
+        self._context_options = context_options or {}
+        self._size = max(1, size)
+        self._max_uses = max_uses
+        self._owner = threading.get_ident()
+        self._own_playwright = playwright is None
+        self._playwright: Playwright = playwright or sync_playwright().start()
+        self._browsers: List[PooledBrowser] = [self._launch() for _ in range(self._size)]
+
+    def _launch(self) -> PooledBrowser:
+        browser_type = self._select_browser(self._playwright)
+        return PooledBrowser(browser_type.launch(**self._launch_options))
+
+    def _recycle(self, index: int) -> PooledBrowser:
+        """关闭旧的浏览器并在原位置启动新的浏览器"""
+        old = self._browsers[index]
+        if old.browser.is_connected():
+            old.browser.close()
+        self._browsers[index] = self._launch()
+        return self._browsers[index]
+
+    def _acquire(self) -> PooledBrowser:
+        for index, pooled in enumerate(self._browsers):
+            if not pooled.is_healthy() or (pooled.uses >= self._max_uses and pooled.leased == 0):
+                self._recycle(index)
+        # 优先选择当前租出最少、使用次数最少的浏览器
+        return min(self._browsers, key=lambda item: (not item.is_healthy(), item.leased, item.uses))
+
+    @contextmanager
+    def lease(self, **context_options: Any) -> Iterator[BrowserContext]:
+        """
+        租出一个新的BrowserContext, 退出时自动关闭
+        Args:
+            **context_options: 覆盖默认的context参数
+
+        Yields:
+            BrowserContext: 隔离的浏览器上下文
+        """
+        if threading.get_ident() != self._owner:
+            raise RuntimeError("BrowserPool只能在创建它的线程中使用")
+        pooled = self._acquire()
+        context = pooled.browser.new_context(**{**self._context_options, **context_options})
+        pooled.uses += 1
+        pooled.leased += 1
+        try:
+            yield context
+        finally:
+            pooled.leased -= 1
+            if pooled.is_healthy():
+                context.close()
+
+    def close(self):
+        """关闭池中所有浏览器并停止playwright"""
+        for pooled in self._browsers:
+            if pooled.browser.is_connected():
+                pooled.browser.close()
+        self._browsers.clear()
+        if self._own_playwright:
+            self._playwright.stop()
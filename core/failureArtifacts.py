@@ -0,0 +1,189 @@
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import threading
+import weakref
+from typing import Any, Callable, Dict, List
+from core.path import LOG_PATH
+from .loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class ArtifactWriter:
+    """在后台线程中依次执行写文件、压缩和清理任务, close时等待队列中的任务全部完成"""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            func, args = task
+            try:
+                func(*args)
+            except Exception as e:
+                logger.warning(f"写入失败现场文件出错: {e!r}")
+
+    def submit(self, func: Callable[..., Any], *args: Any):
+        self._queue.put((func, args))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _write_artifacts(directory: str, screenshot: bytes | None, dom: str | None, manifest: Dict[str, Any]):
+    os.makedirs(directory, exist_ok=True)
+    if screenshot is not None:
+        with open(os.path.join(directory, 'screenshot.png'), 'wb') as file:
+            file.write(screenshot)
+        manifest['files'].append('screenshot.png')
+    if dom is not None:
+        with gzip.open(os.path.join(directory, 'dom.html.gz'), 'wt', encoding='utf-8') as file:
+            file.write(dom)
+        manifest['files'].append('dom.html.gz')
+    with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+
+def prune(root: str = LOG_PATH, max_age_days: float | None = 7, max_count: int | None = 50) -> List[str]:
+    """
+    按保留策略删除旧的失败现场目录(包含manifest.json的目录)
+    Args:
+        root: 查找的根目录
+        max_age_days: 超过该天数的目录被删除, None表示不限
+        max_count: 只保留最新的N个目录, None表示不限
+
+    Returns:
+        List[str]: 被删除的目录
+    """
+    found = []
+    for directory, _dirs, files in os.walk(root):
+        if MANIFEST_NAME in files:
+            found.append((os.path.getmtime(os.path.join(directory, MANIFEST_NAME)), directory))
+    found.sort(reverse=True)
+    expired_before = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    removed = []
+    for index, (mtime, directory) in enumerate(found):
+        if (max_count is not None and index >= max_count) or (expired_before is not None and mtime < expired_before):
+            shutil.rmtree(directory, ignore_errors=True)
+            removed.append(directory)
+    return removed
+
+
+class FailureArtifacts:
+    """
+    失败现场采集, 只有失败的用例才落盘
+
+    - off: 不采集
+    - screenshot: 失败时保存截图和DOM
+    - trace: 在此基础上为每个用例录制一个trace分块(tracing.start_chunk), 用例通过时直接丢弃,
+      失败时才把分块写入trace.zip; context只启动一次tracing, 内存中始终只保留当前用例的分块
+
+    截图和DOM在调用线程中从浏览器取回(sync_api只能在所属线程中调用), 写文件、gzip压缩和过期清理都在后台线程中完成
+    """
+
+    def __init__(self, mode: str = 'trace', settings: Dict[str, Any] | None = None):
+        settings = settings or {}
+        self.mode = mode
+        self.snapshots: bool = settings.get('snapshots', True)
+        self.screenshots: bool = settings.get('screenshots', False)
+        self.attach_allure: bool = settings.get('attach_allure', True)
+        retention = settings.get('retention') or {}
+        self.max_age_days = retention.get('max_age_days', 7)
+        self.max_count = retention.get('max_count', 50)
+        self._writer: ArtifactWriter | None = None
+        # 由本模块启动tracing的context
+        self._tracing: weakref.WeakSet = weakref.WeakSet()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def _get_writer(self) -> ArtifactWriter:
+        if self._writer is None:
+            self._writer = ArtifactWriter()
+        return self._writer
+
+    def begin(self, page: Any, title: str):
+        """用例开始时调用, trace模式下为该用例开启新的trace分块"""
+        if self.mode != 'trace':
+            return
+        context = page.context
+        if context not in self._tracing:
+            context.tracing.start(screenshots=self.screenshots, snapshots=self.snapshots)
+            self._tracing.add(context)
+        context.tracing.start_chunk(title=title)
+
+    def end(self, page: Any, failed: bool, directory: str, error: str | None = None) -> str | None:
+        """
+        用例结束时调用, 失败时采集现场
+        Args:
+            page: 用例使用的page
+            failed: 用例是否失败
+            directory: 现场文件的保存目录
+            error: 失败信息, 写入manifest.json
+
+        Returns:
+            str | None: 现场文件目录, 未采集时返回None
+        """
+        if not self.enabled:
+            return None
+        context = page.context
+        chunked = self.mode == 'trace' and context in self._tracing
+        if not failed:
+            if chunked:
+                context.tracing.stop_chunk()
+            return None
+
+        manifest = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'url': None, 'error': error, 'files': []}
+        screenshot = dom = None
+        try:
+            manifest['url'] = page.url
+            screenshot = page.screenshot()
+            dom = page.content()
+        except Exception as e:
+            logger.warning(f"采集失败截图或DOM出错: {e!r}")
+        if chunked:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                context.tracing.stop_chunk(path=os.path.join(directory, 'trace.zip'))
+                manifest['files'].append('trace.zip')
+            except Exception as e:
+                logger.warning(f"保存trace出错: {e!r}")
+        if self.attach_allure:
+            self._attach(directory, screenshot, dom, manifest['files'])
+        self._get_writer().submit(_write_artifacts, directory, screenshot, dom, manifest)
+        return directory
+
+    @staticmethod
+    def _attach(directory: str, screenshot: bytes | None, dom: str | None, files: List[str]):
+        try:
+            import allure  # allure-pytest为可选依赖
+        except ImportError:
+            return
+        if screenshot is not None:
+            allure.attach(screenshot, name='screenshot', attachment_type=allure.attachment_type.PNG)
+        if dom is not None:
+            allure.attach(dom, name='dom', attachment_type=allure.attachment_type.HTML)
+        if 'trace.zip' in files:
+            allure.attach.file(os.path.join(directory, 'trace.zip'), name='trace', extension='zip')
+
+    def close(self, root: str = LOG_PATH):
+        """在后台线程中按保留策略清理旧的现场目录, 并等待所有写入完成"""
+        if not self.enabled:
+            return
+        writer = self._get_writer()
+        writer.submit(prune, root, self.max_age_days, self.max_count)
+        writer.close()
+        self._writer = None
@@ -0,0 +1,59 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List
+from .loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+
+class IsolatedWorkers:
+    """
+    固定数量的常驻工作线程, 用于并发执行相互独立的事件
+
+    playwright的sync_api是线程独占的, 每个工作线程在第一次执行任务时创建自己的浏览器池并一直复用,
+    close时在各自的线程中执行on_exit(关闭本线程的浏览器池)后退出
+    """
+
+    def __init__(self, size: int = 4, on_exit: Callable[[], Any] | None = None, name: str = "isolated"):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._on_exit = on_exit
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._run, name=f"{name}-{index}", daemon=True) for index in range(max(1, size))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                task = self._queue.get()
+                if task is None:
+                    return
+                func, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(func())
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            if self._on_exit is not None:
+                try:
+                    self._on_exit()
+                except Exception as e:
+                    logger.warning(f"工作线程退出时清理失败: {e!r}")
+
+    def submit(self, func: Callable[[], Any]) -> Future:
+        """提交任务, 由任意一个空闲的工作线程执行"""
+        future: Future = Future()
+        self._queue.put((func, future))
+        return future
+
+    def close(self):
+        """等待已提交的任务完成, 然后停止所有工作线程"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
@@ -0,0 +1,78 @@
+import os
+import time
+import itertools
+from typing import Any, Dict, List
+from core.path import VIDEO_PATH, TRACE_PATH
+
+
+class LaunchProfile:
+    """
+    浏览器启动配置, 对应config.yml中launch_profiles的一项
+
+    - headless: 是否无头运行
+    - viewport: 固定视口 {width, height}, 为空时不限制视口(headful时配合--start-maximized最大化窗口)
+    - args: chromium启动参数, firefox和webkit忽略
+    - slow_mo: 每个操作之间的延迟(毫秒), 调试时使用
+    - record_video: 是否录制视频到 ./videos
+    - trace: 是否为每个context录制trace到 ./logs/traces
+    """
+
+    _sequence = itertools.count()
+
+    def __init__(self, settings: Dict[str, Any] | None = None):
+        settings = settings or {}
+        self.name: str = settings.get('name', 'default')
+        self.headless: bool = settings.get('headless', True)
+        viewport = settings.get('viewport')
+        self.viewport: Dict[str, int] | None = dict(viewport) if viewport else None
+        self.args: List[str] = list(settings.get('args') or [])
+        self.slow_mo: int = settings.get('slow_mo', 0) or 0
+        self.record_video: bool = settings.get('record_video', False)
+        self.trace: bool = settings.get('trace', False)
+
+    def launch_options(self, browser_type: str = 'chrome') -> Dict[str, Any]:
+        """启动浏览器的参数, 不包含代理"""
+        options: Dict[str, Any] = {'headless': self.headless}
+        if self.args and browser_type == 'chrome':
+            options['args'] = list(self.args)
+        if self.slow_mo:
+            options['slow_mo'] = self.slow_mo
+        return options
+
+    def context_options(self) -> Dict[str, Any]:
+        """创建context的参数"""
+        options: Dict[str, Any] = {'viewport': dict(self.viewport)} if self.viewport else {'no_viewport': True}
+        if self.record_video:
+            options['record_video_dir'] = os.path.join(VIDEO_PATH, self.name)
+            if self.viewport:
+                options['record_video_size'] = dict(self.viewport)
+        return options
+
+    def start_tracing(self, context: Any):
+        if self.trace:
+            context.tracing.start(screenshots=True, snapshots=True, sources=True)
+
+    def _trace_path(self) -> str:
+        current = time.strftime('%Y%m%d_%H%M%S')
+        return os.path.join(TRACE_PATH, f"{self.name}_{current}_{os.getpid()}_{next(self._sequence)}.zip")
+
+    def stop_tracing(self, context: Any) -> str | None:
+        """停止trace并写入 ./logs/traces, 返回trace文件路径"""
+        if not self.trace:
+            return None
+        path = self._trace_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        context.tracing.stop(path=path)
+        return path
+
+    async def start_tracing_async(self, context: Any):
+        if self.trace:
+            await context.tracing.start(screenshots=True, snapshots=True, sources=True)
+
+    async def stop_tracing_async(self, context: Any) -> str | None:
+        if not self.trace:
+            return None
+        path = self._trace_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        await context.tracing.stop(path=path)
+        return path
@@ -0,0 +1,52 @@
+import weakref
+import threading
+from typing import Any, Dict, Hashable
+
+# 只缓存惰性的定位器对象, ElementHandle等绑定具体DOM节点的结果不缓存
+CACHEABLE_TYPES = frozenset({'Locator', 'FrameLocator'})
+
+
+class LocatorCache:
+    """
+    按page缓存构建好的Locator, key为编译时生成的规范化locator链(Step.spec)
+
+    page的主frame发生导航或有frame被移除时, 清空该page的缓存; page被回收时缓存随之释放
+    """
+
+    def __init__(self):
+        self._pages: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()  # isolated事件在多个线程中并发执行
+
+    def _entries(self, page: Any) -> Dict[Hashable, Any]:
+        entries = self._pages.get(page)
+        if entries is not None:
+            return entries
+        with self._lock:
+            entries = self._pages.get(page)
+            if entries is not None:
+                return entries
+            entries = {}
+            self._pages[page] = entries
+            page_ref = weakref.ref(page)
+
+            def on_navigated(frame):
+                current = page_ref()
+                if current is not None and frame == current.main_frame:
+                    entries.clear()
+
+            page.on("framenavigated", on_navigated)
+            page.on("framedetached", lambda _frame: entries.clear())
+        return entries
+
+    def get(self, page: Any, spec: Hashable) -> Any | None:
+        return self._entries(page).get(spec)
+
+    def put(self, page: Any, spec: Hashable, locator: Any):
+        if type(locator).__name__ in CACHEABLE_TYPES:
+            self._entries(page)[spec] = locator
+
+    def clear(self):
+        self._pages.clear()
+
+
+locator_cache = LocatorCache()
@@ -0,0 +1,303 @@
+"""
+日志归档: 在后台线程中压缩轮转出的和已结束的用例日志, 并按总大小和保留天数清理
+
+压缩文件由若干独立的gzip member(或zstd frame)组成, 可以直接用zcat/zstdcat查看;
+旁边的 .idx.json 记录用例名、各级别日志数量和每条ERROR/CRITICAL所在的块和偏移,
+定位失败时只需解压对应的块:
+
+    $ python -m core.logArchive logs/cases --test test_refinance
+"""
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import queue
+import argparse
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple
+from core.path import LOG_PATH
+from .loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+INDEX_SUFFIX = '.idx.json'
+ARCHIVE_ROOT = os.path.join(LOG_PATH, 'cases')
+# 与LoggerManager的文件日志格式对应: "... [行号] 级别: 消息", 不匹配的行(如traceback)属于上一条记录
+_RECORD = re.compile(rb'\[\d+\] (DEBUG|INFO|WARNING|ERROR|CRITICAL): ')
+_ERROR_LEVELS = frozenset({'ERROR', 'CRITICAL'})
+
+
+class Codec(NamedTuple):
+    """压缩格式"""
+    name: str
+    suffix: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def get_codec(name: str = 'auto', level: int = 6) -> Codec:
+    """
+    获取压缩格式, auto时安装了zstandard则使用zstd, 否则使用gzip
+    """
+    if name in ('auto', 'zstd'):
+        try:
+            import zstandard  # zstandard为可选依赖
+        except ImportError:
+            if name == 'zstd':
+                logger.warning("未安装zstandard, 日志归档改用gzip")
+        else:
+            compressor = zstandard.ZstdCompressor(level=level)
+            decompressor = zstandard.ZstdDecompressor()
+            return Codec('zstd', '.zst', compressor.compress, decompressor.decompress)
+    elif name != 'gzip':
+        raise ValueError(f"不支持的压缩格式 {name}, 可选 auto/gzip/zstd")
+    return Codec('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=level, mtime=0), gzip.decompress)
+
+
+def _record_level(line: bytes) -> str | None:
+    match = _RECORD.search(line, 0, 512)
+    return match.group(1).decode() if match else None
+
+
+def archive_file(path: str, codec: Codec, block_size: int = 256 * 1024, test: str | None = None) -> Dict[str, Any]:
+    """
+    把一个日志文件压缩为 path + codec.suffix 并写入索引, 完成后删除原文件
+
+    块只在记录开头处切分, 一条记录(包括它的traceback)总在同一个块中
+    Returns:
+        Dict: 索引内容
+    """
+    target = path + codec.suffix
+    levels: Counter = Counter()
+    errors: List[Dict[str, int]] = []
+    blocks: List[List[int]] = []  # [压缩文件中的偏移, 压缩后长度, 原文件中的偏移]
+    buffer: List[bytes] = []
+    buffered = offset = block_start = compressed = lines = 0
+
+    with open(path, 'rb') as source, open(target + '.tmp', 'wb') as output:
+        def flush():
+            nonlocal buffered, block_start, compressed
+            data = codec.compress(b''.join(buffer))
+            output.write(data)
+            blocks.append([compressed, len(data), block_start])
+            compressed += len(data)
+            block_start += buffered
+            buffer.clear()
+            buffered = 0
+
+        for line in source:
+            level = _record_level(line)
+            if level is not None:
+                if buffered >= block_size:
+                    flush()
+                levels[level] += 1
+                if level in _ERROR_LEVELS:
+                    errors.append({'line': lines + 1, 'offset': offset, 'block': len(blocks)})
+            buffer.append(line)
+            buffered += len(line)
+            offset += len(line)
+            lines += 1
+        if buffer:
+            flush()
+
+    index = {
+        'test': test,
+        'source': os.path.basename(path),
+        'archive': os.path.basename(target),
+        'compression': codec.name,
+        'size': offset,
+        'compressed_size': compressed,
+        'lines': lines,
+        'levels': dict(levels),
+        'errors': errors,
+        'blocks': blocks,
+        'created': time.time(),
+    }
+    with open(target + INDEX_SUFFIX + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(index, file, ensure_ascii=False)
+    os.replace(target + '.tmp', target)
+    os.replace(target + INDEX_SUFFIX + '.tmp', target + INDEX_SUFFIX)
+    os.remove(path)
+    return index
+
+
+def read_errors(index_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    按索引读取归档中的ERROR/CRITICAL记录, 只解压包含这些记录的块
+    Returns:
+        Iterator[Tuple[int, str]]: (行号, 包含traceback的记录文本)
+    """
+    with open(index_path, encoding='utf-8') as file:
+        index = json.load(file)
+    codec = get_codec(index['compression'])
+    archive_path = os.path.join(os.path.dirname(index_path), index['archive'])
+    cached_block, data = None, b''
+    with open(archive_path, 'rb') as archive:
+        for error in index['errors']:
+            position, length, block_start = index['blocks'][error['block']]
+            if cached_block != error['block']:
+                archive.seek(position)
+                data = codec.decompress(archive.read(length))
+                cached_block = error['block']
+            start = error['offset'] - block_start
+            end = data.find(b'\n', start) + 1 or len(data)
+            record = [data[start:end]]
+            # 之后不是记录开头的行属于这条记录(如traceback)
+            while end < len(data):
+                next_end = data.find(b'\n', end) + 1 or len(data)
+                if _record_level(data[end:next_end]) is not None:
+                    break
+                record.append(data[end:next_end])
+                end = next_end
+            yield error['line'], b''.join(record).decode('utf-8', errors='replace').rstrip('\n')
+
+
+class LogArchive:
+    """
+    在后台线程中压缩日志并执行保留策略
+
+    - rotator: 作为RotatingFileHandler.rotator, 轮转出的文件改名为不重复的分段后交给后台线程压缩
+    - submit: 日志注销后提交已结束的日志文件
+    每次压缩后重新扫描归档目录, 按 max_total_mb 和 max_age_days 删除最旧的归档,
+    pytest -n N 时各个worker看到的是同一份目录, 总大小预算对所有worker共同生效
+    """
+
+    def __init__(self, root: str = ARCHIVE_ROOT, compression: str = 'auto', level: int = 6,
+                 block_kb: int = 256, max_total_mb: float | None = 500, max_age_days: float | None = 14):
+        self.root = root
+        self.codec = get_codec(compression, level)
+        self.block_size = block_kb * 1024
+        self.max_total_bytes = max_total_mb * 1024 * 1024 if max_total_mb is not None else None
+        self.max_age_days = max_age_days
+        self._segment_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-archive", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], root: str = ARCHIVE_ROOT) -> 'LogArchive':
+        """按config.yml的log_archive配置创建"""
+        retention = settings.get('retention') or {}
+        return cls(root, settings.get('compression', 'auto'), settings.get('level', 6),
+                   settings.get('block_kb', 256), retention.get('max_total_mb', 500),
+                   retention.get('max_age_days', 14))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            path, test = task
+            try:
+                self._archive(path, test)
+            except Exception as e:
+                logger.warning(f"归档日志 {path} 失败: {e!r}")
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        """扫描归档目录, 返回 归档路径 -> (修改时间, 归档和索引的大小), 包括其它进程(xdist worker)生成的归档"""
+        inventory = {}
+        expired_before = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else None
+        for directory, _dirs, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                # 其它进程可能同时在压缩或删除, 文件随时可能消失
+                try:
+                    if name.endswith(('.gz', '.zst')) and os.path.exists(path + INDEX_SUFFIX):
+                        stat = os.stat(path)
+                        inventory[path] = (stat.st_mtime, stat.st_size + os.path.getsize(path + INDEX_SUFFIX))
+                    elif name.endswith('.log') and expired_before is not None:
+                        # 上次异常退出未归档的日志, 超过保留天数的直接删除
+                        if os.path.getmtime(path) < expired_before:
+                            os.remove(path)
+                except FileNotFoundError:
+                    continue
+        return inventory
+
+    def _archive(self, path: str, test: str | None):
+        if not os.path.exists(path):
+            return
+        archive_file(path, self.codec, self.block_size, test)
+        self.enforce()
+
+    def enforce(self) -> List[str]:
+        """
+        重新扫描归档目录并按保留策略删除归档及其索引,
+        先删除超过保留天数的, 再从最旧的开始删除直到总大小不超过预算
+        Returns:
+            List[str]: 被删除的归档
+        """
+        inventory = self._scan()
+        expired_before = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else None
+        total = sum(size for _mtime, size in inventory.values())
+        removed = []
+        for path, (mtime, size) in sorted(inventory.items(), key=lambda item: (item[1][0], item[0])):
+            expired = expired_before is not None and mtime < expired_before
+            if not expired and (self.max_total_bytes is None or total <= self.max_total_bytes):
+                break
+            for file in (path, path + INDEX_SUFFIX):
+                try:
+                    os.remove(file)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed.append(path)
+        return removed
+
+    def submit(self, path: str, test: str | None = None):
+        """提交已结束的日志文件, 在后台线程中压缩"""
+        self._queue.put((path, test))
+
+    def rotator(self, test: str | None = None) -> Callable[[str, str], None]:
+        """
+        返回RotatingFileHandler的rotator, 轮转时把当前文件改名为 <文件名>.<序号>.log 并提交压缩,
+        不再使用handler的 .1/.2 备份名, 备份数量由保留策略控制
+        """
+        def rotate(source: str, _dest: str):
+            base, ext = os.path.splitext(source)
+            with self._segment_lock:
+                number = 1
+                while any(os.path.exists(f"{base}.{number}{ext}{suffix}")
+                          for suffix in ('', self.codec.suffix, self.codec.suffix + '.tmp')):
+                    number += 1
+                segment = f"{base}.{number}{ext}"
+                os.rename(source, segment)
+            self.submit(segment, test)
+        return rotate
+
+    def close(self):
+        """等待队列中的日志全部压缩完成后停止后台线程"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='按索引列出归档日志中的ERROR/CRITICAL记录')
+    parser.add_argument('root', nargs='?', default=ARCHIVE_ROOT, help='归档所在目录')
+    parser.add_argument('--test', default=None, help='只列出用例名或文件名包含该字符串的归档')
+    parser.add_argument('--summary', action='store_true', help='只输出各归档的级别统计')
+    args = parser.parse_args(argv)
+
+    for directory, _dirs, files in os.walk(args.root):
+        for name in sorted(files):
+            if not name.endswith(INDEX_SUFFIX):
+                continue
+            index_path = os.path.join(directory, name)
+            with open(index_path, encoding='utf-8') as file:
+                index = json.load(file)
+            if args.test and args.test not in f"{index.get('test') or ''} {index['source']}":
+                continue
+            if not index['errors'] and not args.summary:
+                continue
+            print(f"{os.path.join(directory, index['archive'])} {index.get('test') or ''} {index['levels']}")
+            if args.summary:
+                continue
+            for line, record in read_errors(index_path):
+                print(f"  {line}: {record}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,12 @@
 import logging
 import logging.handlers
 import os
+import re
 import time
-import colorlog
+import queue
 import threading
-from typing import Tuple
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Tuple
 from logging import Logger
 from core.path import LOG_PATH
 
@@ -27,6 +29,98 @@ class SingletonMeta(type):
         return cls._instances[cls]
 
 
+class LazyMessage:
+    """
+    延迟生成的日志消息, 作为日志参数传入, 只有handler真正输出该记录时才调用func生成文本
+
+    用法::
+
+        logger.debug("当前properties属性为: %s", LazyMessage(json.dumps, events, indent=4))
+    """
+
+    __slots__ = ("_func", "_args", "_kwargs", "_text")
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._text: str | None = None
+
+    def __str__(self) -> str:
+        # 同一条记录可能被多个handler输出, 只序列化一次
+        if self._text is None:
+            self._text = str(self._func(*self._args, **self._kwargs))
+        return self._text
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    只负责把日志记录放入队列的handler
+
+    标准QueueHandler会在调用线程中先格式化消息, 这里只预先格式化异常信息(traceback不能延后处理),
+    消息的格式化和文件、终端I/O都交给QueueListener所在的后台线程
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# 当前任务/线程绑定的日志注册key, asyncio任务会复制创建时的上下文, 普通线程不继承, 未绑定时按线程计算
+_context_key: ContextVar[str | None] = ContextVar("logger_key", default=None)
+
+
+def process_key() -> str:
+    """当前进程的默认key, pytest-xdist的worker为gw0/gw1..., 否则为main"""
+    return os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+
+def context_key() -> str:
+    """
+    当前上下文的日志注册key, 依次取: contextvars绑定的key, 主线程为进程key, 其它线程为 "进程key:线程名"
+    """
+    key = _context_key.get()
+    if key is not None:
+        return key
+    thread = threading.current_thread()
+    if thread is threading.main_thread():
+        return process_key()
+    return f"{process_key()}:{thread.name}"
+
+
+class ContextRouter(logging.Handler):
+    """
+    安装在共享logger上的路由handler, 按当前上下文的key把日志记录交给对应注册的handler
+
+    各模块在导入时持有同一个logger, 并发执行的用例、线程或任务通过各自的注册把日志写到自己的文件;
+    当前上下文没有注册时(如未注册的工作线程), 写到进程key的注册中; 两者都没有时不处理,
+    记录照常向上传播给root logger的handler(如loadRunner中basicConfig配置的控制台输出), 避免重复打印
+    """
+
+    def __init__(self, registry: Dict[str, Dict[str, Any]]):
+        super().__init__(logging.DEBUG)
+        self._registry = registry
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # 不获取路由handler自身的锁, 否则所有线程的日志会在这里串行, 下游handler各自加锁
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record: logging.LogRecord):
+        info = self._registry.get(context_key())
+        if info is None or not info["active"]:
+            info = self._registry.get(process_key())
+            if info is None or not info["active"]:
+                return
+        for handler in info["handlers"]:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
 class LoggerManager(metaclass=SingletonMeta):
     """日志管理器类，实现了单例模式，确保在整个应用中只有一个日志管理器实例"""
 
@@ -34,15 +128,22 @@ class LoggerManager(metaclass=SingletonMeta):
         """初始化LoggerManager实例的属性"""
         self.logger_info = dict()
         self.user_handle = None
-        self.default_logger_name = "main"  # 因为pytest串行执行时,只有一个进程线程,脚本执行前后需要注册解注册日志,多线程执行时,线程间独立
+        self.default_logger_name = "main"  # 所有模块共享的logger, 日志按context_key()路由到各自注册的handler
+        self._lock = threading.Lock()
+        self.archive = None  # core.logArchive.LogArchive, 设置后轮转出的和注销的日志文件在后台压缩归档
+        self._router = ContextRouter(self.logger_info)
+        logger = logging.getLogger(self.default_logger_name)
+        logger.addHandler(self._router)
+        logger.setLevel(logging.DEBUG)
 
     @staticmethod
-    def get_log_filename(case_filepath: str) -> Tuple[str, str]:
+    def get_log_filename(case_filepath: str, case_name: str | None = None) -> Tuple[str, str]:
         """
         获取日志文件路径和UI截图目录路径
 
         Args:
             case_filepath (str): 用例文件的路径
+            case_name (str, optional): 用例名, 指定时每个用例使用单独的日志文件和UI截图目录
 
         Returns:
             Tuple[str, str]: 返回一个包含日志文件路径和UI截图目录路径的元组。
@@ -70,13 +171,15 @@ class LoggerManager(metaclass=SingletonMeta):
         for i in range(1, len(new_folder_list)):
             t_folder = os.path.join(t_folder, new_folder_list[i])
         logfile_dir: str = os.path.join(LOG_PATH, t_folder)
+        if case_name:
+            # 参数化用例名中的[]、/等字符不能出现在文件名中
+            py_filename = py_filename + "_" + re.sub(r'[^\w.-]+', '_', case_name).strip('_')
         logfile_name = py_filename + time_suffix + ".log"
         logfile_path = os.path.join(logfile_dir, logfile_name)
-        if not os.path.exists(os.path.dirname(logfile_path)):
-            os.makedirs(os.path.dirname(logfile_path))
+        os.makedirs(os.path.dirname(logfile_path), exist_ok=True)
         with open(logfile_path, 'w', encoding='utf-8'):
             pass
-        ui_dir = logfile_name.strip(".log")
+        ui_dir = logfile_name[:-len(".log")]
         ui_screenshot_dir = os.path.join(logfile_dir, ui_dir)
         return logfile_path, ui_screenshot_dir
 
@@ -89,11 +192,14 @@ class LoggerManager(metaclass=SingletonMeta):
             console (bool, optional): 是否输出到控制台，默认为True
             default_level (int, optional): 默认的日志级别，默认为DEBUG
             **kwargs: 其他可选参数
+                async_mode (bool): 为True时通过QueueHandler/QueueListener在后台线程中格式化并写日志
+                case_name (str): 用例名, 指定时每个用例使用单独的日志文件和UI截图目录
+                key (str): 注册的key, 指定时绑定到当前contextvars上下文(用于asyncio任务等), 默认为context_key()
 
         Returns:
-            Logger: 返回一个新创建的logger实例
+            Logger: 返回共享的logger实例, 当前上下文中的日志写到本次注册的handler
         """
-        filename, screenshot_dir = self.get_log_filename(case_filepath)
+        filename, screenshot_dir = self.get_log_filename(case_filepath, kwargs.get("case_name"))
 
         # 设置不同级别的日志在终端中显示的颜色
         log_colors_config = {
@@ -108,32 +214,43 @@ class LoggerManager(metaclass=SingletonMeta):
         if log_format is None:
             log_format = "%(asctime)s %(filename)s::%(module)s::%(funcName)s[%(lineno)d] %(levelname)s: %(message)s"
 
-        # 获取新的logger实例
-        logger_name = self.default_logger_name
-        logger = logging.getLogger(logger_name)
+        logger = logging.getLogger(self.default_logger_name)
+        key = kwargs.get("key")
+        token = None
+        if key is not None:
+            token = _context_key.set(key)
+        else:
+            key = context_key()
 
         """ 
-       logger_info[logger_name] = dict(), 其中的key分别表示
+       logger_info[key] = dict(), 其中的key分别表示
        timestamp: 表示创建的时间戳
        filepath: 表示日志存储的路径
        logger: 表示日志器
        thread: 表示所属的线程
        ui_dir: 表示UI截图信息所在的目录
+       handlers: 路由handler把日志交给的handler
+       active: 注销开始后为False, 路由handler不再写入
         """
-        self.logger_info[logger_name] = dict()
-        self.logger_info[logger_name]["timestamp"] = time.localtime()
-        self.logger_info[logger_name]["ui_dir"] = screenshot_dir
+        info = dict()
+        info["timestamp"] = time.localtime()
+        info["ui_dir"] = screenshot_dir
+        info["thread"] = threading.current_thread().name
+        info["case_name"] = kwargs.get("case_name")
+        info["token"] = token
 
         # 如果设置了file_size，则默认一个文件大小为10MB
         file_size_limit = kwargs.get("size_limit", 10 * 1024 * 1024)
         file_max = kwargs.get("file_max", 6)
         file_mode = kwargs.get("file_mode", "w")
 
+        async_mode = kwargs.get("async_mode", False)
         file_handler = None
         stream_handler = None
+        handlers = []
 
         if filename:
-            self.logger_info[logger_name]["filepath"] = os.path.dirname(filename)
+            info["filepath"] = os.path.dirname(filename)
             file_handler = logging.handlers.RotatingFileHandler(
                 filename=filename,
                 maxBytes=file_size_limit,
@@ -143,10 +260,13 @@ class LoggerManager(metaclass=SingletonMeta):
             )
             file_handler.setFormatter(logging.Formatter(fmt=log_format))
             file_handler.setLevel(logging.DEBUG)
+            if self.archive is not None:
+                file_handler.rotator = self.archive.rotator(kwargs.get("case_name"))
             self.user_handle = file_handler
-            logger.addHandler(self.user_handle)
+            handlers.append(file_handler)
 
         if console:
+            import colorlog  # 只有输出到终端时才需要
             stream_handler = logging.StreamHandler()
             console_formatter = colorlog.ColoredFormatter(
                 fmt='%(log_color)s[%(asctime)s] -> [%(levelname)s] : %(message)s',
@@ -154,28 +274,65 @@ class LoggerManager(metaclass=SingletonMeta):
             )
             stream_handler.setFormatter(console_formatter)
             stream_handler.setLevel(default_level)
-            logger.addHandler(stream_handler)
-
-        logger.setLevel(logging.DEBUG)  # 设置默认日志打印级别
-        self.logger_info[logger_name]["logger"] = logger
-        self.logger_info[logger_name]["file_handler"] = file_handler
-        self.logger_info[logger_name]["stream_handler"] = stream_handler
-
+            handlers.append(stream_handler)
+
+        queue_handler = None
+        listener = None
+        if async_mode:
+            # 调用线程只做入队, 格式化和I/O在监听线程中完成, logger_end时停止监听并写完队列中剩余的日志
+            log_queue = queue.SimpleQueue()
+            queue_handler = DeferredQueueHandler(log_queue)
+            listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            info["handlers"] = (queue_handler,)
+        else:
+            info["handlers"] = tuple(handlers)
+
+        info["logger"] = logger
+        info["file_handler"] = file_handler
+        info["stream_handler"] = stream_handler
+        info["queue_handler"] = queue_handler
+        info["listener"] = listener
+        info["active"] = True
+
+        with self._lock:
+            previous = self.logger_info.get(key)
+            self.logger_info[key] = info
+        if previous is not None:
+            # 同一个key重复注册时关闭旧的handler, 避免文件句柄泄漏
+            self._close(previous)
         return logger
 
-    def unregister(self, logger_name: str = "main"):
+    def _close(self, info: Dict[str, Any]):
+        info["active"] = False
+        if info["listener"] is not None:
+            info["listener"].stop()  # 等待后台线程写完队列中的日志
+        if info["file_handler"] is not None:
+            info["file_handler"].close()
+            if self.archive is not None:
+                self.archive.submit(info["file_handler"].baseFilename, info["case_name"])
+
+    def unregister(self, logger_name: str | None = None):
         """
-        注销指定的logger实例，并移除相关的句柄
+        注销指定key的注册，并关闭相关的句柄; 共享的logger和路由handler保持不变, 模块级持有的logger引用始终有效
         Args:
-            logger_name (str, optional): 要注销的logger名称，默认为"main"
+            logger_name (str, optional): 要注销的key，默认为当前上下文的context_key()
         """
-        if logger_name in logging.Logger.manager.loggerDict:
-            logging.Logger.manager.loggerDict.pop(logger_name)
-            logger = self.get_logger(logger_name="main")
-            # 把日志器的句柄移除, 如果不移除, 就会一直打印日志在之前的文件中
-            logger.removeHandler(self.logger_info[logger_name]["file_handler"])
-            logger.removeHandler(self.logger_info[logger_name]["stream_handler"])
-            self.logger_info.pop(logger_name)  # 删除用户的备份信息
+        key = logger_name if logger_name is not None else context_key()
+        with self._lock:
+            info = self.logger_info.pop(key, None)
+        if info is None:
+            return
+        if info["token"] is not None:
+            try:
+                _context_key.reset(info["token"])
+            except ValueError:
+                _context_key.set(None)  # 在其它上下文中注销时无法还原, 直接解除绑定
+        self._close(info)
+
+    def current_info(self) -> Dict[str, Any] | None:
+        """获取当前上下文的注册信息, 当前上下文没有注册时返回进程key的注册"""
+        return self.logger_info.get(context_key()) or self.logger_info.get(process_key())
 
     def get_logger(self, logger_name: str = "main") -> Logger:
         """
@@ -204,6 +361,27 @@ def logger_init(case_filepath: str, default_level: int = logging.INFO, console:
     return logger
 
 
+class LazyLogger:
+    """
+    模块级使用的logger代理, 第一次记录日志时才创建LoggerManager并安装路由handler,
+    导入模块(如pytest收集用例时导入页面模块)不产生副作用
+
+    用法::
+
+        logger = LazyLogger()
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self):
+        self._logger: Logger | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._logger is None:
+            self._logger = LoggerManager().get_logger()
+        return getattr(self._logger, name)
+
+
 def get_logger() -> Logger:
     """
         获取日志记录器实例的函数。
@@ -224,13 +402,14 @@ def logger_end():
 
 def get_ui_screenshot_dir() -> str:
     """
-    获取UI截图的保存目录路径
+    获取当前上下文注册的UI截图保存目录路径
     Returns:
         str: 返回UI截图的保存目录路径
     """
-    logger_mgt = LoggerManager()
-    logger_name = logger_mgt.default_logger_name
-    return logger_mgt.logger_info[logger_name]["ui_dir"]
+    info = LoggerManager().current_info()
+    if info is None:
+        raise LookupError(f"当前上下文 {context_key()} 没有注册日志")
+    return info["ui_dir"]
 
 
 def logger_unregister(logger):
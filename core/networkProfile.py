@@ -0,0 +1,183 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+from core.path import HAR_PATH
+from playwright.sync_api import BrowserContext, Route
+
+
+class NetworkProfile:
+    """
+    网络配置, 在context创建时通过context.route拦截请求
+
+    - block_resource_types: 直接中止的资源类型, 如 image, font, media
+    - block_url_globs: 直接中止的URL glob, 如 **/google-analytics.com/**
+    - cache_url_globs: 命中后缓存响应的静态资源URL glob, 同一进程内同一系统和环境的后续请求直接由缓存返回
+    - cache_max_mb: 缓存的响应体总大小上限, 超出后淘汰最久未使用的响应
+    """
+
+    # 静态资源缓存在进程内所有context之间共享, key为(系统, 环境, 请求URL), 按最近使用排序
+    _response_cache: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+    _cache_bytes = 0
+    _cache_lock = threading.Lock()
+    # 缓存的是已解码的响应体, 原响应的编码和长度头不再适用, 由playwright按新的响应体重新计算
+    _DROPPED_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding'})
+
+    def __init__(self, settings: Dict[str, Any] | None = None, system: str = 'application', env: str = 'prod'):
+        settings = settings or {}
+        self.name: str = settings.get('name', 'full')
+        self.system = system
+        self.env = env
+        self.block_resource_types = frozenset(settings.get('block_resource_types') or [])
+        self.block_url_globs: List[str] = list(settings.get('block_url_globs') or [])
+        self.cache_url_globs: List[str] = list(settings.get('cache_url_globs') or [])
+        self.cache_max_bytes = int(settings.get('cache_max_mb', 50) * 1024 * 1024)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.block_resource_types or self.block_url_globs or self.cache_url_globs)
+
+    def _cache_key(self, url: str) -> Tuple[str, str, str]:
+        return self.system, self.env, url
+
+    @classmethod
+    def _replay_headers(cls, headers: Dict[str, str]) -> Dict[str, str]:
+        return {name: value for name, value in headers.items() if name.lower() not in cls._DROPPED_HEADERS}
+
+    def _cached(self, route: Route) -> Dict[str, Any] | None:
+        if route.request.method != 'GET':
+            return None
+        key = self._cache_key(route.request.url)
+        with self._cache_lock:
+            cached = self._response_cache.get(key)
+            if cached is not None:
+                self._response_cache.move_to_end(key)
+            return cached
+
+    def _store(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        if not 200 <= status < 300 or len(body) > self.cache_max_bytes:
+            return
+        key = self._cache_key(url)
+        with self._cache_lock:
+            previous = self._response_cache.pop(key, None)
+            if previous is not None:
+                NetworkProfile._cache_bytes -= len(previous['body'])
+            self._response_cache[key] = {'status': status, 'headers': headers, 'body': body}
+            NetworkProfile._cache_bytes += len(body)
+            while NetworkProfile._cache_bytes > self.cache_max_bytes:
+                _key, evicted = self._response_cache.popitem(last=False)
+                NetworkProfile._cache_bytes -= len(evicted['body'])
+
+    def _handle_resource_type(self, route: Route):
+        if route.request.resource_type in self.block_resource_types:
+            route.abort()
+        else:
+            route.fallback()
+
+    def _handle_cache(self, route: Route):
+        cached = self._cached(route)
+        if cached is not None:
+            route.fulfill(**cached)
+            return
+        if route.request.method != 'GET':
+            route.fallback()
+            return
+        response = route.fetch()
+        body = response.body()
+        headers = self._replay_headers(response.headers)
+        self._store(route.request.url, response.status, headers, body)
+        route.fulfill(response=response, body=body, headers=headers)
+
+    async def _handle_resource_type_async(self, route):
+        if route.request.resource_type in self.block_resource_types:
+            await route.abort()
+        else:
+            await route.fallback()
+
+    async def _handle_cache_async(self, route):
+        cached = self._cached(route)
+        if cached is not None:
+            await route.fulfill(**cached)
+            return
+        if route.request.method != 'GET':
+            await route.fallback()
+            return
+        response = await route.fetch()
+        body = await response.body()
+        headers = self._replay_headers(response.headers)
+        self._store(route.request.url, response.status, headers, body)
+        await route.fulfill(response=response, body=body, headers=headers)
+
+    @staticmethod
+    async def _abort_async(route):
+        await route.abort()
+
+    def apply(self, context: BrowserContext):
+        """
+        在sync context上注册路由, 后注册的路由先匹配, 因此按 缓存 -> URL拦截 -> 资源类型拦截 的顺序注册
+        Args:
+            context: 新创建的BrowserContext
+        """
+        for glob in self.cache_url_globs:
+            context.route(glob, self._handle_cache)
+        for glob in self.block_url_globs:
+            context.route(glob, lambda route: route.abort())
+        if self.block_resource_types:
+            context.route("**/*", self._handle_resource_type)
+
+    async def apply_async(self, context):
+        """在async context上注册路由, 规则与apply一致"""
+        for glob in self.cache_url_globs:
+            await context.route(glob, self._handle_cache_async)
+        for glob in self.block_url_globs:
+            await context.route(glob, self._abort_async)
+        if self.block_resource_types:
+            await context.route("**/*", self._handle_resource_type_async)
+
+
+class HarArchive:
+    """
+    按系统和环境保存的HAR归档
+
+    - record: 正常访问网络, 并把流量写入HAR, 在context关闭时落盘
+    - replay: 只从HAR中返回响应, HAR中不存在的请求直接中止, 不访问网络
+    - live: 不做任何处理
+    """
+
+    MODES = ('record', 'replay', 'live')
+
+    def __init__(self, path: str, mode: str = 'live'):
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的network模式: {mode}, 可选: {self.MODES}")
+        self.path = path
+        self.mode = mode
+
+    @classmethod
+    def for_environment(cls, system: str, env: str, mode: str = 'live') -> "HarArchive":
+        """
+        获取指定系统和环境的HAR归档, 如 har/application/prod.har
+        Args:
+            system: config.yml中的系统名, application 或 loans
+            env: 环境名
+            mode: record, replay 或 live
+        """
+        return cls(os.path.join(HAR_PATH, system, f"{env}.har"), mode)
+
+    def _route_options(self) -> Dict[str, Any]:
+        if self.mode == 'record':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return {'update': True, 'update_content': 'embed', 'update_mode': 'full'}
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"HAR归档不存在: {self.path}, 请先使用 --network=record 录制")
+        return {'not_found': 'abort'}
+
+    def apply(self, context: BrowserContext):
+        """在sync context上启用录制或回放, 需要在其他路由之后注册, 保证HAR最先匹配"""
+        if self.mode == 'live':
+            return
+        context.route_from_har(self.path, **self._route_options())
+
+    async def apply_async(self, context):
+        if self.mode == 'live':
+            return
+        await context.route_from_har(self.path, **self._route_options())
@@ -0,0 +1,207 @@
+import os
+import ast
+import sys
+import json
+import types
+import hashlib
+import threading
+import importlib
+import importlib.util
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+from core.path import PAGES_PATH, CACHE_PATH
+
+INDEX_VERSION = 1
+
+
+class PageEntry(NamedTuple):
+    """索引中的一个页面函数"""
+    module: str  # 模块名, 如 pages.loans.1003_view
+    name: str  # 函数名
+    path: str  # 模块文件的绝对路径
+    line: int
+    decorated: bool  # 是否被@P.base装饰, 只有装饰过的函数可以直接执行
+    properties: Tuple[str, ...] | None  # page['properties']中的事件名, 不是字面量时为None
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.module}:{self.name}"
+
+
+_BASE_OWNERS = frozenset({'P', 'PropertyResolver'})
+
+
+def _is_base_decorator(node: ast.expr) -> bool:
+    # 只识别 @P.base / @PropertyResolver.base / @base, 其它对象的base属性(如 @pytest.base)不是页面函数
+    if isinstance(node, ast.Attribute):
+        return node.attr == 'base' and isinstance(node.value, ast.Name) and node.value.id in _BASE_OWNERS
+    return isinstance(node, ast.Name) and node.id == 'base'
+
+
+def _literal_properties(func: ast.FunctionDef) -> Tuple[bool, Tuple[str, ...] | None]:
+    """
+    查找函数体中的 page = {..., 'properties': {...}}
+    Returns:
+        (是否为页面函数, 事件名), properties不是字面量映射时事件名为None
+    """
+    for statement in func.body:
+        if not (isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Dict)
+                and any(isinstance(target, ast.Name) and target.id == 'page' for target in statement.targets)):
+            continue
+        for key, value in zip(statement.value.keys, statement.value.values):
+            if isinstance(key, ast.Constant) and key.value == 'properties':
+                if not isinstance(value, ast.Dict):
+                    return True, None
+                names = [item.value for item in value.keys if isinstance(item, ast.Constant)]
+                return True, tuple(names) if len(names) == len(value.keys) else None
+        return True, None
+    return False, None
+
+
+def scan_source(source: bytes, module: str, path: str) -> List[PageEntry]:
+    """不导入模块, 用ast找出模块顶层定义的页面函数"""
+    entries = []
+    for node in ast.parse(source, path).body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        decorated = any(_is_base_decorator(decorator) for decorator in node.decorator_list)
+        is_page, properties = _literal_properties(node)
+        if decorated or is_page:
+            entries.append(PageEntry(module, node.name, path, node.lineno, decorated, properties))
+    return entries
+
+
+class PageRegistry:
+    """
+    pages下页面函数的注册表
+
+    第一次查询时遍历pages目录, 按文件内容的sha1从磁盘索引(.cache/page_index_<目录摘要>.json)中复用未变化文件的解析结果,
+    只有变化的文件才重新用ast解析; 页面模块在第一次获取其中的函数时才导入,
+    文件名不是合法标识符(如 1003_view.py)的模块按路径加载
+    """
+
+    def __init__(self, package_dir: str = PAGES_PATH, index_path: str | None = None):
+        self.package_path = Path(package_dir).resolve()
+        # 每个目录使用单独的索引文件
+        root_digest = hashlib.sha1(str(self.package_path).encode()).hexdigest()[:8]
+        self.index_path = index_path or os.path.join(CACHE_PATH, f'page_index_{root_digest}.json')
+        self._entries: Dict[str, PageEntry] | None = None
+        self._lock = threading.RLock()
+
+    def _module_name(self, path: Path) -> str:
+        return '.'.join(path.relative_to(self.package_path.parent).with_suffix('').parts)
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if index.get('version') != INDEX_VERSION or index.get('root') != str(self.package_path):
+            return {}
+        return index.get('files', {})
+
+    def _write_index(self, files: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        # pytest-xdist的多个worker可能同时刷新索引, 先写临时文件再原子替换
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': INDEX_VERSION, 'root': str(self.package_path), 'files': files}, file,
+                      ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def refresh(self) -> Dict[str, PageEntry]:
+        """
+        重新遍历pages目录并更新索引, 内容没有变化的文件直接使用索引中的结果
+        Returns:
+            Dict[str, PageEntry]: "模块名:函数名" 到页面函数的映射
+        """
+        with self._lock:
+            cached = self._read_index()
+            files, entries, changed = {}, {}, False
+            for path in sorted(self.package_path.rglob('*.py')):
+                if path.name == '__init__.py':
+                    continue
+                relative = path.relative_to(self.package_path).as_posix()
+                stat = path.stat()
+                record = cached.get(relative)
+                if record is None or record['mtime_ns'] != stat.st_mtime_ns or record['size'] != stat.st_size:
+                    source = path.read_bytes()
+                    digest = hashlib.sha1(source).hexdigest()
+                    if record is None or record['hash'] != digest:
+                        functions = [entry._asdict() for entry in
+                                     scan_source(source, self._module_name(path), str(path))]
+                        record = {'hash': digest, 'functions': functions}
+                    record = {**record, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+                    changed = True
+                files[relative] = record
+                for item in record['functions']:
+                    properties = item['properties']
+                    entry = PageEntry(**{**item, 'properties': tuple(properties) if properties is not None else None})
+                    entries[entry.qualified_name] = entry
+            if changed or files.keys() != cached.keys():
+                self._write_index(files)
+            self._entries = entries
+            return entries
+
+    def entries(self) -> Dict[str, PageEntry]:
+        """所有页面函数, 包括没有被@P.base装饰的"""
+        if self._entries is None:
+            return self.refresh()
+        return self._entries
+
+    def page_functions(self) -> Dict[str, PageEntry]:
+        """被@P.base装饰、可以直接执行的页面函数"""
+        return {name: entry for name, entry in self.entries().items() if entry.decorated}
+
+    def resolve(self, target: str) -> PageEntry:
+        """
+        按 "模块名:函数名" 或唯一的函数名查找被@P.base装饰的页面函数
+        Raises:
+            LookupError: 不存在或函数名不唯一
+        """
+        functions = self.page_functions()
+        if target in functions:
+            return functions[target]
+        matched = [name for name, entry in functions.items() if entry.name == target]
+        if len(matched) != 1:
+            raise LookupError(f"页面函数 {target} {'不唯一: ' + ', '.join(matched) if matched else '不存在'}, "
+                              f"可选: {', '.join(functions)}")
+        return functions[matched[0]]
+
+    def find(self, event: str) -> List[PageEntry]:
+        """查找properties中包含该事件的页面函数"""
+        return [entry for entry in self.page_functions().values() if entry.properties and event in entry.properties]
+
+    def load_module(self, module_name: str) -> types.ModuleType:
+        """导入页面模块, 已导入时直接返回"""
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        with self._lock:
+            if module_name in sys.modules:
+                return sys.modules[module_name]
+            parts = module_name.split('.')
+            if all(part.isidentifier() for part in parts):
+                return importlib.import_module(module_name)
+            # 文件名不是合法标识符(如 1003_view.py)时按路径加载
+            path = self.package_path.parent.joinpath(*parts).with_suffix('.py')
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                sys.modules.pop(module_name, None)
+                raise
+            return module
+
+    def load(self, entry: PageEntry) -> Callable[..., Any]:
+        """导入页面函数所在的模块并返回该函数"""
+        return getattr(self.load_module(entry.module), entry.name)
+
+    def get(self, target: str) -> Callable[..., Any]:
+        """按名称获取被@P.base装饰的页面函数, 只导入其所在的模块"""
+        return self.load(self.resolve(target))
+
+
+page_registry = PageRegistry()
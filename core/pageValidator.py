@@ -0,0 +1,227 @@
+import re
+import typing
+import inspect
+import functools
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+from core.path import PAGES_PATH
+from core.batchFill import BATCH_METHOD
+from core.assertionEngine import compile_assertions
+from core.propertyResolver import PropertyResolver
+from core.pageRegistry import PageRegistry, page_registry
+from common.readConfig import get_mapping
+
+# page描述节点中允许出现的key
+NODE_KEYS = frozenset({'loc', 'locator', 'op', 'operation', 'next', 'next_operation', 'wait', 'assert'})
+WAIT_KEYS = frozenset({'load_state', 'url', 'state', 'timeout'})
+LOAD_STATES = frozenset({'load', 'domcontentloaded', 'networkidle'})
+LOCATOR_STATES = frozenset({'attached', 'detached', 'visible', 'hidden'})
+
+
+class Issue(NamedTuple):
+    """页面描述中的一个问题"""
+    path: str  # 节点路径, 如 pages.application.preApplication:pre_application::refinance_my_home::next_operation[loc.nth]
+    message: str
+    severity: str = 'error'  # error: 执行时必然失败; warning: 可以执行但行为可能不符合预期
+
+    def __str__(self) -> str:
+        return f"[{self.severity}] {self.path}: {self.message}"
+
+
+@functools.lru_cache(maxsize=None)
+def _playwright_types() -> Dict[str, type]:
+    from playwright.sync_api import Page, Locator, FrameLocator
+    return {'Page': Page, 'Locator': Locator, 'FrameLocator': FrameLocator}
+
+
+@functools.lru_cache(maxsize=None)
+def _member(owner: str, name: str) -> Tuple[bool, inspect.Signature | None, str | None] | None:
+    """
+    查找playwright类型上的成员
+    Returns:
+        (是否为属性, 方法签名, 返回类型名), 不存在时返回None
+    """
+    cls = _playwright_types()[owner]
+    try:
+        attr = inspect.getattr_static(cls, name)
+    except AttributeError:
+        return None
+    if name.startswith('_'):
+        return None
+    is_property = isinstance(attr, property)
+    func = attr.fget if is_property else attr
+    if not callable(func):
+        return None
+    try:
+        returns = typing.get_type_hints(func).get('return')
+    except Exception:
+        returns = None
+    return is_property, None if is_property else inspect.signature(func), getattr(returns, '__name__', None)
+
+
+def _bind(signature: inspect.Signature, params: Any) -> str | None:
+    """按解析器的调用约定检查参数, 返回错误信息"""
+    try:
+        if isinstance(params, str) and params.strip() == '':
+            signature.bind(None)
+        elif isinstance(params, dict):
+            signature.bind(None, **params)
+        else:
+            signature.bind(None, params.strip() if isinstance(params, str) else params)
+    except TypeError as e:
+        return str(e)
+    return None
+
+
+def _check_call(owner: str, method: str, params: Any, path: str, in_chain: bool,
+                issues: List[Issue]) -> str | None:
+    """
+    检查一次调用, 返回调用后的对象类型名
+    Args:
+        owner: 当前对象类型, Page/Locator/FrameLocator
+        in_chain: 是否处于locator链中, locator链中的每一步都必须返回Locator或FrameLocator
+    """
+    target = get_mapping().get(method.lower()) or method.lower()
+    member = _member(owner, target)
+    if member is None:
+        mapped = f"(映射为 {target})" if target != method.lower() else ""
+        issues.append(Issue(path, f"{owner} 没有方法 {method}{mapped}"))
+        return None
+    is_property, signature, returns = member
+    if params is None:
+        if not is_property:
+            if in_chain:
+                issues.append(Issue(path, f"{owner}.{target} 是方法, 参数为None时只会取到方法本身"))
+                return None
+            issues.append(Issue(path, f"{owner}.{target} 是方法, 参数为None时不会被调用, 需要调用时请使用''",
+                                'warning'))
+        return returns
+    if is_property:
+        issues.append(Issue(path, f"{owner}.{target} 是属性, 参数只能为None"))
+        return None
+    if not isinstance(params, (str, int, float, dict, re.Pattern)):
+        issues.append(Issue(path, f"不支持的参数类型 {type(params).__name__}"))
+        return None
+    error = _bind(signature, params)
+    if error:
+        issues.append(Issue(path, f"参数与playwright {owner}.{target} 的签名不匹配: {error}"))
+        return None
+    return returns
+
+
+def _check_batch(fields: Any, path: str, issues: List[Issue]):
+    if not isinstance(fields, dict) or not fields:
+        issues.append(Issue(path, "batch的参数必须是选择器到值的非空映射"))
+        return
+    for selector, value in fields.items():
+        if not isinstance(selector, str) or not isinstance(value, (str, int, float, bool)):
+            issues.append(Issue(path, f"batch字段 {selector!r} 的选择器必须是字符串, 值必须是字符串、数字或布尔值"))
+
+
+def _check_wait(wait: Any, has_locator: bool, path: str, issues: List[Issue]):
+    if isinstance(wait, str):
+        wait = {'load_state': wait}
+    if not isinstance(wait, dict):
+        issues.append(Issue(path, f"wait只能是加载状态字符串或映射, 实际为 {type(wait).__name__}"))
+        return
+    for key, value in wait.items():
+        if key not in WAIT_KEYS:
+            issues.append(Issue(path, f"无效的wait条件 {key}, 可选 {sorted(WAIT_KEYS)}"))
+        elif key == 'load_state' and value not in LOAD_STATES:
+            issues.append(Issue(path, f"无效的加载状态 {value}, 可选 {sorted(LOAD_STATES)}"))
+        elif key == 'state' and (not has_locator or value not in LOCATOR_STATES):
+            issues.append(Issue(path, f"state需要locator且取值为 {sorted(LOCATOR_STATES)}"))
+
+
+def validate_function(func: Callable[..., Dict[str, Any]], prefix: str = '') -> List[Issue]:
+    """
+    不启动浏览器, 按playwright的Page/Locator签名校验页面函数的properties树
+    Args:
+        func: 页面函数, 可以是@P.base装饰后的函数
+        prefix: 节点路径前缀, 一般为模块名
+
+    Returns:
+        List[Issue]: 发现的问题
+    """
+    func = getattr(func, '__wrapped__', func)
+    root = f"{prefix}:{func.__name__}" if prefix else func.__name__
+    issues: List[Issue] = []
+    try:
+        page = func()['page']
+        properties = page['properties']
+    except Exception as e:
+        return [Issue(root, f"无法获取page['properties']: {e!r}")]
+    if not isinstance(properties, dict):
+        return [Issue(root, "properties必须是映射")]
+
+    for event, details in properties.items():
+        node = f"{root}::{event}"
+        if isinstance(details, dict) and 'isolated' in details:
+            if not isinstance(details['isolated'], bool):
+                issues.append(Issue(node, "isolated只能是布尔值"))
+            details = {key: value for key, value in details.items() if key != 'isolated'}
+        while details is not None:
+            if not isinstance(details, dict):
+                issues.append(Issue(node, f"节点必须是映射, 实际为 {type(details).__name__}"))
+                break
+            for key in details.keys() - NODE_KEYS:
+                issues.append(Issue(node, f"未知的key {key}, 可选 {sorted(NODE_KEYS)}"))
+            locators = details.get('loc') or details.get('locator') or {}
+            operations = details.get('op') or details.get('operation') or {}
+            if not locators and not operations and 'wait' not in details and 'assert' not in details:
+                issues.append(Issue(node, "节点中不存在loc/op/wait/assert", 'warning'))
+
+            owner = 'Page'
+            for method, params in locators.items():
+                owner = _check_call(owner, method, params, f"{node}[loc.{method}]", True, issues)
+                if owner is None:
+                    break
+                if owner not in ('Locator', 'FrameLocator'):
+                    issues.append(Issue(f"{node}[loc.{method}]",
+                                        f"locator链中的 {method} 返回 {owner}, 不是Locator, 运行时会断言失败"))
+                    owner = None
+                    break
+            if owner is not None:
+                for method, params in operations.items():
+                    if method.lower() == BATCH_METHOD:
+                        _check_batch(params, f"{node}[op.{method}]", issues)
+                    else:
+                        _check_call(owner, method, params, f"{node}[op.{method}]", False, issues)
+            if 'wait' in details:
+                _check_wait(details['wait'], bool(locators), f"{node}[wait]", issues)
+            if 'assert' in details:
+                try:
+                    compile_assertions(details['assert'], bool(locators), node)
+                except ValueError as e:
+                    issues.append(Issue(f"{node}[assert]", str(e)))
+
+            details = details.get('next_operation') or details.get('next')
+            node = f"{node}::next_operation"
+    return issues
+
+
+def discover_page_functions(package_dir: str = PAGES_PATH) -> Dict[str, Callable[..., Any]]:
+    """
+    导入pages下包含@P.base页面函数的模块, 返回这些页面函数
+    Returns:
+        Dict[str, Callable]: "模块名:函数名" 到页面函数的映射
+    """
+    registry = page_registry if Path(package_dir).resolve() == page_registry.package_path else PageRegistry(package_dir)
+    return {name: registry.load(entry) for name, entry in registry.page_functions().items()}
+
+
+def validate_pages(package_dir: str = PAGES_PATH, precompile: bool = True) -> List[Issue]:
+    """
+    校验pages下所有页面函数, 没有error时按单个事件预编译执行计划
+    Returns:
+        List[Issue]: 所有页面函数中发现的问题
+    """
+    issues: List[Issue] = []
+    for qualified_name, func in discover_page_functions(package_dir).items():
+        found = validate_function(func, qualified_name.split(':')[0])
+        issues.extend(found)
+        if precompile and not any(issue.severity == 'error' for issue in found):
+            page_func = func.__wrapped__
+            for event in page_func()['page']['properties']:
+                PropertyResolver.compile(page_func, **{event: None})
+    return issues
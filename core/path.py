@@ -4,3 +4,7 @@ project_path = os.path.dirname(os.path.dirname(__file__))
 LOG_PATH = os.path.join(project_path, 'logs')
 CONFIG_PATH = os.path.join(project_path, 'config')
 VIDEO_PATH = os.path.join(project_path, 'videos')
+CACHE_PATH = os.path.join(project_path, '.cache')
+HAR_PATH = os.path.join(project_path, 'har')
+TRACE_PATH = os.path.join(LOG_PATH, 'traces')
+PAGES_PATH = os.path.join(project_path, 'pages')
@@ -1,24 +1,69 @@
 import re
 import json
+import types
 import functools
-from .webManger import WebManager
-from .loggerManager import LoggerManager
-from common.readConfig import get_mapping
-from playwright.sync_api import Locator, Page
-from typing import Any, Callable, Dict, Tuple
+from .loggerManager import LazyLogger, LazyMessage
+from .spanCollector import collector
+from .locatorCache import locator_cache
+from .batchFill import BATCH_METHOD, batch_fill
+from .assertionEngine import Check, compile_assertions, verify
+from common.readConfig import get_mapping, get_wait_config
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Tuple, TYPE_CHECKING
 
-mapping_dict = get_mapping()
-logger = LoggerManager().get_logger()
+if TYPE_CHECKING:
+    from playwright.sync_api import Locator, Page
+
+# playwright和WebManager在第一次执行页面函数时才导入, 导入页面模块(如pytest收集用例)时不加载浏览器相关依赖;
+# logger在第一次记录日志时才创建, 导入时不安装路由handler
+logger = LazyLogger()
+
+
+class Call(NamedTuple):
+    """预解析后的单次方法调用"""
+    method: str  # mapping_dict 映射后的目标方法名
+    params: Any  # __arguments_parse 解析后的参数, dict 参数以只读映射保存
+    log_str: str  # 预先拼接好的日志串, 如 page.get_by_text(Yes)
+
+
+class Step(NamedTuple):
+    """编译后的执行步骤, 对应page描述中的一个 loc/op 节点"""
+    event: str  # 所属的顶层事件名
+    node: str  # 节点路径, 如 func::event::next_operation
+    locators: Tuple[Call, ...]  # 依次执行的locator链, 为空时直接作用于page
+    operations: Tuple[Call, ...]  # 作用在locator上的操作
+    log_str: str  # locator链的完整日志串
+    spec: Hashable = None  # 规范化的locator链, 作为locator缓存的key
+    waits: Tuple[Tuple[str, Call], ...] = ()  # 操作完成后的等待条件, (作用对象 page/locator, 调用)
+    isolated: bool = False  # 所属事件声明了 isolated: true, 在独立的context中与其他事件并发执行
+    assertions: Tuple[Check, ...] = ()  # 等待完成后校验的断言
+
+
+class IsolatedEventsError(Exception):
+    """页面函数中有isolated事件执行失败, failures为事件名到异常的映射"""
+
+    def __init__(self, func_name: str, failures: Dict[str, BaseException]):
+        self.failures = failures
+        details = "; ".join(f"{event}: {error!r}" for event, error in failures.items())
+        super().__init__(f"{func_name} 中 {len(failures)} 个事件执行失败: {details}")
 
 
 class PropertyResolver:
     """properties参数解析器"""
 
+    # 是否在标准输出中打印locator链的构建过程, 调试时通过 --stdoutTrace 开启
+    trace_stdout: bool = False
+
+    # 执行计划缓存, key为(页面函数, 覆盖参数签名), value为编译后的步骤元组
+    __plans: Dict[Tuple[Callable, Hashable], Tuple[Step, ...]] = {}
+
     @classmethod
     def __custom_encoder(cls, obj):
         if isinstance(obj, re.Pattern):
             return {"__type__": "regex", "pattern": obj.pattern, "flags": obj.flags}
-        raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+        if isinstance(obj, types.MappingProxyType):
+            return dict(obj)
+        # 只用于调试日志, 覆盖参数中的其它对象(如set)按repr输出, 不影响编译
+        return repr(obj)
 
     @classmethod
     def __custom_decoder(cls, obj):
@@ -41,8 +86,8 @@ class PropertyResolver:
             else:
                 logger.warning(f"Property '{key}' 在{func.__name__}中不存在，将忽略该事件")
 
-        logger.debug(
-            f"当前properties属性为: {json.dumps(events, indent=4, ensure_ascii=False, default=cls.__custom_encoder)}")
+        logger.debug("当前properties属性为: %s",
+                     LazyMessage(json.dumps, events, indent=4, ensure_ascii=False, default=cls.__custom_encoder))
         return events
 
     @classmethod
@@ -53,85 +98,220 @@ class PropertyResolver:
         except KeyError:
             logger.info(f"Function {func.__name__} did not return a dictionary with a 'page' key.")
             raise KeyError(f"Function {func.__name__} did not return a dictionary with a 'page' key.")
-        logger.info(f"开始处理事件: {func.__name__}")
         return page_data
 
     @classmethod
-    def __operation_processor(cls, obj: Page | Locator, parsed_method: str, operation_events: Dict | None,
-                              log_msg: str) -> (
-            Tuple)[Any, str]:
+    def __freeze(cls, obj: Any) -> Hashable:
+        """
+        把覆盖参数转换为可哈希的签名, 无法转换时抛出TypeError
+        dict按插入顺序保留(loc中键的顺序就是locator链的顺序), 并带上类型标记, 内容相同的dict/list/tuple签名不同
+        """
+        if isinstance(obj, dict):
+            return dict, tuple((key, cls.__freeze(value)) for key, value in obj.items())
+        if isinstance(obj, (list, tuple)):
+            return type(obj), tuple(cls.__freeze(value) for value in obj)
+        hash(obj)
+        return obj
+
+    @classmethod
+    def __spec_value(cls, value: Any) -> Hashable:
+        """把locator参数规范化为可哈希的值, 正则以(pattern, flags)表示"""
+        if isinstance(value, re.Pattern):
+            return 're', value.pattern, value.flags
+        if isinstance(value, (dict, types.MappingProxyType)):
+            return tuple(sorted((key, cls.__spec_value(item)) for key, item in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(cls.__spec_value(item) for item in value)
+        return value
 
-        if parsed_method == '':
+    @classmethod
+    def __compile_call(cls, method: str, para: Any, log_msg: str) -> Call | None:
+        target_method = get_mapping().get(method.lower()) or method.lower()
+        if target_method == '':
             logger.error("无效的方法")
-        parsed_parameters = cls.__arguments_parse(operation_events)
-        logger.info(f'原参数: {operation_events}, 解析后的参数: {parsed_parameters}')
+        logger.debug('%s 解析为 %s', method, target_method)
+        parsed_parameters = cls.__arguments_parse(para)
         if parsed_parameters is None:
-            log_str = f"{log_msg}.{parsed_method}"
-            logger.info(f"执行操作: {log_str}")
-            return getattr(obj, parsed_method), log_str
-
-        elif isinstance(parsed_parameters, (str, int, float)):
+            return Call(target_method, None, f"{log_msg}.{target_method}")
+        if isinstance(parsed_parameters, (str, int, float, re.Pattern)):
             if parsed_parameters == "":
-                log_str = f"{log_msg}.{parsed_method}()"
-                logger.info(f"执行: {log_str}")
-                return getattr(obj, parsed_method)(), log_str
+                return Call(target_method, '', f"{log_msg}.{target_method}()")
+            return Call(target_method, parsed_parameters, f"{log_msg}.{target_method}({parsed_parameters})")
+        if isinstance(parsed_parameters, dict):
+            _str = ", ".join([f"{key}={value}" for key, value in parsed_parameters.items()])
+            return Call(target_method, types.MappingProxyType(dict(parsed_parameters)),
+                        f"{log_msg}.{target_method}({_str})")
+        logger.warning(f"不匹配的参数类型: {method}: {type(para)}, 将忽略该方法")
+        return None
+
+    @classmethod
+    def __compile_wait(cls, wait: Any, has_locator: bool, log_msg: str) -> Tuple[Tuple[str, Call], ...]:
+        """
+        解析节点的wait指令, 操作完成后依次等待
+            'wait': 'networkidle'  等待页面进入该加载状态(load/domcontentloaded/networkidle)
+            'wait': {'load_state': 'networkidle', 'url': '**/preapp/**', 'state': 'visible', 'timeout': 10000}
+                load_state: 页面加载状态; url: 等待页面跳转到匹配的URL; state: 等待locator进入该状态
+        """
+        if wait is None:
+            return ()
+        if isinstance(wait, str):
+            wait = {'load_state': wait}
+        if not isinstance(wait, dict):
+            logger.warning(f"不匹配的wait参数类型: {type(wait)}, 将忽略该等待")
+            return ()
+        timeout = {'timeout': wait['timeout']} if 'timeout' in wait else {}
+        waits = []
+        for key, value in wait.items():
+            if key == 'timeout':
+                continue
+            if key == 'load_state':
+                target, method, params = 'page', 'wait_for_load_state', {'state': value, **timeout}
+            elif key == 'url':
+                target, method, params = 'page', 'wait_for_url', {'url': value, **timeout}
+            elif key == 'state' and has_locator:
+                target, method, params = 'locator', 'wait_for', {'state': value, **timeout}
             else:
-                log_str = f"{log_msg}.{parsed_method}({parsed_parameters})"
-                logger.info(f'执行: {log_str}')
-                return getattr(obj, parsed_method)(parsed_parameters), log_str
+                logger.warning(f"{log_msg} 中无效的wait条件: {key}, 将忽略该等待")
+                continue
+            _str = ", ".join([f"{name}={item}" for name, item in params.items()])
+            owner = 'page' if target == 'page' else log_msg
+            waits.append((target, Call(method, types.MappingProxyType(params), f"{owner}.{method}({_str})")))
+        return tuple(waits)
 
-        elif isinstance(parsed_parameters, dict):
-            _str = ", ".join([f"{key}={value}" for key, value in parsed_parameters.items()])
-            log_str = f"{log_msg}.{parsed_method}({_str})"
-            logger.info(f'执行: {log_str}')
-            return getattr(obj, parsed_method)(**parsed_parameters), log_str
+    @classmethod
+    def __compile_node(cls, func: Callable[..., Dict[str, Any]], event: str, details: Dict[str, Any] | None,
+                       steps: list, parent_event: str = "", isolated: bool = False):
+        while details is not None:
+            locator_events = details.get('loc') or details.get('locator')
+            current_operation_events = details.get('op') or details.get('operation')
+
+            wait = details.get('wait')
+            assertion = details.get('assert')
+
+            event_node = f"{func.__name__}::{event}" if parent_event == '' else f"{parent_event}::next_operation"
+            if not locator_events and not current_operation_events and wait is None and assertion is None:
+                logger.warning(f"{event_node} 中不存在locator和page事件，将跳过本次执行")
+                return
+
+            locators = []
+            log_str = 'page'
+            for locator_method, para in (locator_events or {}).items():
+                call = cls.__compile_call(locator_method, para, log_str)
+                if call is not None:
+                    locators.append(call)
+                    log_str = call.log_str
+
+            operations = []
+            for method, para in (current_operation_events or {}).items():
+                call = cls.__compile_call(method, para, log_str)
+                if call is not None:
+                    operations.append(call)
 
-        else:
-            logger.warning(f"不匹配的方法: {method_name}, 当前方法: {locator_method_mapping.keys()}")
+            spec = tuple((call.method, cls.__spec_value(call.params)) for call in locators)
+            waits = cls.__compile_wait(wait, bool(locators), log_str)
+            try:
+                assertions = compile_assertions(assertion, bool(locators), log_str,
+                                                get_wait_config().get('assert_timeout', 5000))
+            except ValueError as e:
+                # 忽略无效的断言会让该节点永远通过, 跳过页面校验时也要在编译阶段失败
+                raise ValueError(f"{event_node} 中的断言无效: {e}") from e
+            steps.append(Step(event, event_node, tuple(locators), tuple(operations), log_str, spec, waits, isolated,
+                              assertions))
+            details = details.get('next_operation') or details.get('next')
+            parent_event = event_node
 
-        return obj, log_msg
+    @classmethod
+    def compile(cls, func: Callable[..., Dict[str, Any]], **kwargs: Any) -> Tuple[Step, ...]:
+        """
+        把页面函数的properties树编译为扁平的、不可变的执行步骤, 按页面函数和覆盖参数签名缓存
+        Args:
+            func: 未经装饰的页面函数
+            **kwargs: 需要执行的property及其覆盖参数
+
+        Returns:
+            Tuple[Step, ...]: 按执行顺序排列的步骤
+        """
+        try:
+            signature = cls.__freeze(kwargs)
+        except TypeError:
+            logger.debug(f"{func.__name__} 的覆盖参数不可哈希, 本次不缓存执行计划")
+            signature = None
+        plan = cls.__plans.get((func, signature)) if signature is not None else None
+        if plan is not None:
+            return plan
+
+        page_data = cls.__get_page_data(func)
+        events = cls.__update_page_properties(func, page_data, **kwargs)
+        steps = []
+        for event, details in events.items():
+            if details is None:
+                logger.warning("当前操作事件为None，停止进行操作")
+                continue
+            cls.__compile_node(func, event, details, steps, isolated=bool(details.get('isolated', False)))
+        plan = tuple(steps)
+        if signature is not None:
+            cls.__plans[(func, signature)] = plan
+        return plan
+
+    @classmethod
+    def clear_cache(cls):
+        """清空执行计划缓存, 页面函数内容发生变化时调用"""
+        cls.__plans.clear()
 
     @classmethod
-    def __handle_locator(cls, locator_events: Dict | None) -> Tuple[Locator | Page, str]:
-        page = WebManager().get_page()
-        log_str = 'page'
+    def _invoke(cls, obj: Any, call: Call) -> Any:
+        """在Page或Locator上执行一次预解析的调用, sync与async引擎共用"""
+        if call.params is None:
+            logger.info("执行操作: %s", call.log_str)
+            return getattr(obj, call.method)
+        logger.info('执行: %s', call.log_str)
+        if call.params == '':
+            return getattr(obj, call.method)()
+        if call.method == BATCH_METHOD:
+            return batch_fill(obj, call.params)
+        if isinstance(call.params, types.MappingProxyType):
+            return getattr(obj, call.method)(**call.params)
+        return getattr(obj, call.method)(call.params)
+
+    @classmethod
+    def __handle_locator(cls, page: "Page", step: Step) -> "Locator | Page":
         locator = page
-        if locator_events is None:
+        if not step.locators:
             logger.debug('当前没有可处理的Locator，将跳过Locator处理')
-            return page, log_str
-        logger.info(f"分解以下操作: {locator_events}")
-        for locator_method, para in locator_events.items():
-            logger.debug(f"原始操作: {locator_method}, 参数: {para}")
-            target_method = mapping_dict.get(locator_method.lower()) or locator_method.lower()
-            if target_method is None:
-                raise ValueError("mapping 中不存在该方法")
-            logger.info(f'{locator_method} 解析为 {target_method}')
-            locator = locator
-            print(f'locator: {locator}')
-            locator, log_str = cls.__operation_processor(locator, target_method, para,
-                                                         log_str)
-
-        if isinstance(locator, Page):
-            logger.error(f"locator为None，检查页面元素: {log_str}是否存在")
+            return page
+        cached = locator_cache.get(page, step.spec)
+        if cached is not None:
+            logger.debug("复用已构建的locator: %s", step.log_str)
+            return cached
+        for call in step.locators:
+            if cls.trace_stdout:
+                print(f'locator: {locator}')
+            with collector.span(step.node, 'locator', call.method):
+                locator = cls._invoke(locator, call)
+
+        if isinstance(locator, type(page)):
+            logger.error(f"locator为None，检查页面元素: {step.log_str}是否存在")
             assert False
-        return locator, log_str
+        locator_cache.put(page, step.spec, locator)
+        return locator
 
     @classmethod
-    def __handle_operation(cls, locator: Locator | Page, operation_events: Dict | None, log_msg: str):
-        if operation_events is None:
-            logger.error(f"不存在操作对象Locator 或者 Page，无法执行操作: {log_msg}.{operation_events}")
+    def __handle_operation(cls, locator: "Locator | Page", step: Step):
+        if not step.operations:
+            logger.error(f"不存在操作对象Locator 或者 Page，无法执行操作: {step.log_str}")
             return
         result = None
-        logger.info(f"分解以下操作: {operation_events}")
-        for method, para in operation_events.items():
-            logger.debug(f"原始操作: {method}, 参数: {para}")
-            target_method = mapping_dict.get(method.lower()) or method.lower()
-            if target_method is None:
-                raise ValueError("mapping 中不存在该方法")
-            logger.info(f'{method} 解析为 {target_method}')
-            result, _log = cls.__operation_processor(locator, target_method, para, log_msg)
+        for call in step.operations:
+            with collector.span(step.node, 'operation', call.method):
+                result = cls._invoke(locator, call)
         return result
 
+    @classmethod
+    def __handle_wait(cls, page: "Page", locator: "Locator | Page", step: Step):
+        for target, call in step.waits:
+            with collector.span(step.node, 'wait', call.method):
+                cls._invoke(page if target == 'page' else locator, call)
+
     @classmethod
     def __arguments_parse(cls, param: Any) -> None | Dict[str, Any] | str:
         if param is None:
@@ -145,48 +325,90 @@ class PropertyResolver:
         return param
 
     @classmethod
-    def __handle_assert(cls):
-        return None
-
-    @classmethod
-    def __process_page(cls, func: Callable[..., Dict[str, Any]], event: str, events: Dict[str, Any] | None,
-                       parent_event: str = "") -> Any:
-        if events is None:
-            if parent_event == "":
-                logger.warning("当前操作事件为None，停止进行操作")
+    def __handle_assert(cls, page: "Page", locator: "Locator | Page", step: Step):
+        if not step.assertions:
             return
+        logger.info("校验断言: %s", LazyMessage(lambda: ", ".join(check.log_str for check in step.assertions)))
+        with collector.span(step.node, 'assert', str(len(step.assertions))):
+            verify(page, locator, step.assertions)
 
-        details = events
-        locator_events = details.get('loc') or details.get('locator')
-        current_operation_events = details.get('op') or details.get('operation')
-        # page_events = details.get('page')
-
-        event_node = f"{func.__name__}::{event}" if parent_event == '' else f"{parent_event}::next_operation"
-
-        flag = not locator_events and not current_operation_events
-        if flag:
-            logger.warning(f"{event_node} 中不存在locator和page事件，将跳过本次执行")
-            return
+    @classmethod
+    def __process_step(cls, page: "Page", step: Step) -> Any:
+        logger.debug("处理节点: %s", step.node)
+        with collector.span(step.node, 'hop', step.log_str):
+            locator = cls.__handle_locator(page, step)
+            result = cls.__handle_operation(locator, step) \
+                if step.operations or not (step.waits or step.assertions) else None
+            cls.__handle_wait(page, locator, step)
+            cls.__handle_assert(page, locator, step)
+            return result
 
-        next_operation_events = details.get('next_operation') or details.get('next')
-        slider_events = details.get('slider')
-        assert_values = details.get('assert')
+    @classmethod
+    def execute(cls, page: "Page", plan: Tuple[Step, ...]) -> Any:
+        """在指定page上依次执行编译后的步骤, 返回最后一个步骤的结果"""
+        result = None
+        for step in plan:
+            result = cls.__process_step(page, step)
+        return result
 
-        logger.debug(
-            f"当前提取的方法: {json.dumps(current_operation_events, indent=4, ensure_ascii=False, default=cls.__custom_encoder)}, "
-            f"下一次要处理的操作: {json.dumps(next_operation_events, indent=4, ensure_ascii=False, default=cls.__custom_encoder)}")
+    @classmethod
+    def __execute_events(cls, func: Callable[..., Dict[str, Any]], plan: Tuple[Step, ...]) -> Dict[str, Any]:
+        """
+        isolated事件提交到工作线程, 在各自租用的context中并发执行; 其余事件同时在共享page上按顺序执行,
+        某个顺序事件失败后不再执行后续的顺序事件
+        Returns:
+            Dict[str, Any]: 事件名到最后一个步骤结果的映射
 
-        locator, _log_string = cls.__handle_locator(locator_events)
-        result = cls.__handle_operation(locator, current_operation_events, _log_string)
-        cls.__process_page(func, event, next_operation_events, event_node)
+        Raises:
+            Exception: 顺序事件失败时, 等isolated事件结束后原样抛出该异常
+            IsolatedEventsError: 只有isolated事件失败时, 等所有事件结束后统一抛出
+        """
+        from .webManger import WebManager
+        manager = WebManager()
+        events: Dict[str, List[Step]] = {}
+        for step in plan:
+            events.setdefault(step.event, []).append(step)
+        futures = {event: manager.submit_isolated(functools.partial(cls.execute, plan=tuple(steps)))
+                   for event, steps in events.items() if steps[0].isolated}
+        results: Dict[str, Any] = {}
+        failures: Dict[str, BaseException] = {}
+        sequential_error: Exception | None = None
+        try:
+            sequential = [(event, steps) for event, steps in events.items() if not steps[0].isolated]
+            page = manager.get_page() if sequential else None
+            for event, steps in sequential:
+                try:
+                    results[event] = cls.execute(page, tuple(steps))
+                except Exception as e:
+                    sequential_error = e
+                    break
+        finally:
+            for event, future in futures.items():
+                try:
+                    results[event] = future.result()
+                except Exception as e:
+                    failures[event] = e
+        for event, error in failures.items():
+            logger.error(f"{func.__name__}::{event} 执行失败: {error!r}")
+        if sequential_error is not None:
+            # 顺序事件的异常与不含isolated事件时一致, 调用方仍能按原异常类型处理
+            raise sequential_error
+        if failures:
+            raise IsolatedEventsError(func.__name__, failures)
+        return results
 
     @classmethod
     def base(cls, func):
+        """
+        页面函数装饰器, 调用时按覆盖参数编译并执行页面描述
+        Returns:
+            被装饰的函数返回事件名到最后一个步骤结果的映射
+        """
         @functools.wraps(func)
         def wrapper(**kwargs):
-            page_data = cls.__get_page_data(func)
-            events = cls.__update_page_properties(func, page_data, **kwargs)
-            for event, details in events.items():
-                cls.__process_page(func, event, details)
+            plan = cls.compile(func, **kwargs)
+            logger.info("开始处理事件: %s", func.__name__)
+            return cls.__execute_events(func, plan)
 
+        wrapper.is_page_function = True  # 供页面校验等工具识别被装饰的页面函数
         return wrapper
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple
+
+
+class Span(NamedTuple):
+    """一次locator构建、操作或next跳转的耗时记录"""
+    path: str  # 事件节点路径, 如 pre_application::refinance_my_home::next_operation
+    kind: str  # hop: 整个节点, locator: 构建locator链中的一次调用, operation: 一次操作, wait: 一次等待, assert: 节点的全部断言
+    method: str  # 调用的方法, hop时为节点的locator日志串
+    start: float  # 开始时间, 时间戳(秒)
+    duration: float  # 总耗时(秒)
+    self_time: float  # 扣除子span后的耗时(秒)
+    outcome: str  # ok 或异常类型名
+    thread: int
+
+
+class _SpanTimer:
+    """计时上下文, 退出时把span交给收集器, 并把自身耗时计入父span的子耗时"""
+
+    __slots__ = ("_collector", "_path", "_kind", "_method", "_start", "_begin", "_children", "_parent", "_token")
+
+    def __init__(self, collector: "SpanCollector", path: str, kind: str, method: str):
+        self._collector = collector
+        self._path = path
+        self._kind = kind
+        self._method = method
+        self._children = 0.0
+
+    def __enter__(self) -> "_SpanTimer":
+        self._parent = _active_span.get()
+        self._token = _active_span.set(self)
+        self._start = time.time()
+        self._begin = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._begin
+        _active_span.reset(self._token)
+        if self._parent is not None:
+            self._parent._children += duration
+        outcome = "ok" if exc_type is None else exc_type.__name__
+        self._collector.add(Span(self._path, self._kind, self._method, self._start, duration,
+                                 max(duration - self._children, 0.0), outcome, threading.get_ident()))
+        return False
+
+
+class _NullTimer:
+    """收集器关闭时使用的空计时上下文"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+# 当前正在计时的span, 协程和线程各自独立, 用于计算父span的自身耗时
+_active_span: ContextVar[_SpanTimer | None] = ContextVar("active_span", default=None)
+_null_timer = _NullTimer()
+
+
+class SpanCollector:
+    """内存中的span收集器, 可导出为JSONL和火焰图工具使用的collapsed stack格式"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def span(self, path: str, kind: str, method: str) -> _SpanTimer | _NullTimer:
+        """
+        创建一个计时上下文
+        Args:
+            path: 事件节点路径
+            kind: hop, locator, operation, wait 或 assert
+            method: 调用的方法
+        """
+        if not self.enabled:
+            return _null_timer
+        return _SpanTimer(self, path, kind, method)
+
+    def add(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def export_jsonl(self, filepath: str):
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as file:
+            for span in self.spans():
+                file.write(json.dumps(span._asdict(), ensure_ascii=False) + "\n")
+
+    def export_collapsed(self, filepath: str):
+        """
+        按 func;event;next_operation;...;kind:method 的调用栈聚合自身耗时(微秒),
+        可直接用于flamegraph.pl、speedscope等工具
+        """
+        stacks: Dict[str, int] = defaultdict(int)
+        for span in self.spans():
+            frames = span.path.split("::")
+            if span.kind != "hop":
+                frames.append(f"{span.kind}:{span.method}")
+            stacks[";".join(frame.replace(";", ",") for frame in frames)] += int(span.self_time * 1_000_000)
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as file:
+            for stack, value in stacks.items():
+                file.write(f"{stack} {value}\n")
+
+
+collector = SpanCollector()
@@ -0,0 +1,53 @@
+import os
+import time
+from core.path import CACHE_PATH
+from playwright.sync_api import BrowserContext
+
+STORAGE_STATE_PATH = os.path.join(CACHE_PATH, 'storage_state')
+
+
+class StorageStateCache:
+    """
+    登录态(storage_state)的磁盘缓存, 按系统、环境和用户区分, 超过ttl秒后失效
+
+    文件结构: .cache/storage_state/<system>/<env>/<user>.json
+    """
+
+    def __init__(self, ttl: int = 3600, root: str = STORAGE_STATE_PATH):
+        self.ttl = ttl
+        self.root = root
+
+    def path(self, system: str, env: str, user: str) -> str:
+        safe_user = "".join(char if char.isalnum() or char in "-_.@" else "_" for char in user)
+        return os.path.join(self.root, system, env, f"{safe_user}.json")
+
+    def get(self, system: str, env: str, user: str) -> str | None:
+        """
+        获取仍在有效期内的登录态文件路径
+        Returns:
+            str | None: 文件路径, 不存在或已过期时返回None
+        """
+        path = self.path(system, env, user)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+        if age > self.ttl:
+            self.invalidate(system, env, user)
+            return None
+        return path
+
+    def save(self, context: BrowserContext, system: str, env: str, user: str) -> str:
+        """把context当前的cookies和localStorage写入缓存"""
+        path = self.path(system, env, user)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        context.storage_state(path=tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def invalidate(self, system: str, env: str, user: str):
+        try:
+            os.remove(self.path(system, env, user))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,71 @@
+import time
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, Iterator, Mapping, NamedTuple, Tuple, Type, TypeVar
+from .loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+T = TypeVar("T")
+
+
+class RetryPolicy(NamedTuple):
+    """指数退避重试策略, 第n次重试前等待 min(max_delay, base_delay * 2**n) 秒, 并按jitter比例随机缩短"""
+    attempts: int = 3  # 总尝试次数
+    base_delay: float = 0.5  # 第一次重试前的基准等待(秒)
+    max_delay: float = 8.0  # 单次等待上限(秒)
+    jitter: float = 0.5  # 0~1, 随机缩短等待时间的最大比例, 避免多个worker同时重试
+
+    @classmethod
+    def from_settings(cls, settings: Mapping[str, Any] | None) -> "RetryPolicy":
+        settings = settings or {}
+        return cls(**{key: settings[key] for key in cls._fields if key in settings})
+
+    def delays(self) -> Iterator[float]:
+        """依次生成每次重试前的等待时间, 共 attempts - 1 个"""
+        for attempt in range(self.attempts - 1):
+            delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+            yield delay * (1 - self.jitter * random.random())
+
+
+def retry(action: Callable[[], T], policy: RetryPolicy = RetryPolicy(),
+          retry_on: Tuple[Type[BaseException], ...] = (Exception,), description: str = "") -> T:
+    """
+    按重试策略执行action, 只有retry_on中的异常会触发重试, 最后一次失败的异常原样抛出
+    Args:
+        action: 无参可调用对象
+        policy: 重试策略
+        retry_on: 需要重试的异常类型
+        description: 日志中使用的操作描述
+    """
+    delays = policy.delays()
+    attempt = 1
+    while True:
+        try:
+            return action()
+        except retry_on as e:
+            delay = next(delays, None)
+            if delay is None:
+                logger.error(f"{description} 失败, 已达到最大尝试次数 {policy.attempts}: {e!r}")
+                raise
+            logger.warning(f"{description} 第 {attempt}/{policy.attempts} 次失败, {delay:.2f}s后重试: {e!r}")
+            time.sleep(delay)
+            attempt += 1
+
+
+async def retry_async(action: Callable[[], Awaitable[T]], policy: RetryPolicy = RetryPolicy(),
+                      retry_on: Tuple[Type[BaseException], ...] = (Exception,), description: str = "") -> T:
+    """retry的asyncio版本, action返回可等待对象"""
+    delays = policy.delays()
+    attempt = 1
+    while True:
+        try:
+            return await action()
+        except retry_on as e:
+            delay = next(delays, None)
+            if delay is None:
+                logger.error(f"{description} 失败, 已达到最大尝试次数 {policy.attempts}: {e!r}")
+                raise
+            logger.warning(f"{description} 第 {attempt}/{policy.attempts} 次失败, {delay:.2f}s后重试: {e!r}")
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -1,6 +1,25 @@
+import weakref
 import threading
-from common.readConfig import get_application_config
-from playwright.sync_api import sync_playwright, Playwright, Browser, Page, TimeoutError as PlaywrightTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator
+from concurrent.futures import Future
+from core.browserPool import BrowserPool
+from core.isolatedWorkers import IsolatedWorkers
+from core.storageState import StorageStateCache
+from core.networkProfile import NetworkProfile, HarArchive
+from core.waiter import RetryPolicy, retry
+from core.launchProfile import LaunchProfile
+from common.readConfig import get_system_config, get_pool_config, get_network_profile, \
+    get_storage_state_config, get_wait_config, get_launch_profile
+from playwright.sync_api import sync_playwright, Playwright, Browser, BrowserContext, BrowserType, Page, \
+    Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from core.loggerManager import LazyLogger
+
+logger = LazyLogger()
+
+# 当前测试从浏览器池租到的page, 未租用时为None, get_page会回退到单例page
+_leased_page: ContextVar[Page | None] = ContextVar("leased_page", default=None)
 
 
 class SingletonMeta(type):
@@ -22,61 +41,229 @@ class SingletonMeta(type):
 
 class WebManager(metaclass=SingletonMeta):
 
-    def __init__(self, env='prod', browser_type='chrome'):
+    def __init__(self, env='prod', browser_type='chrome', pool_size=None, network_mode='live', system='application',
+                 user=None, profile='ci-fast'):
         self._page: Page | None = None
+        self._context: BrowserContext | None = None
         self._playwright: Playwright | None = None
         self._env = env
+        self._system = system
         self._browser_type = browser_type
-        self._config = get_application_config(self._env)
+        self._config = get_system_config(system, self._env)
         self._proxy_settings = self._config['proxy_settings']
         self._url_settings = self._config['url_settings']
-        self._options = {
-            'args': ['--start-maximized'],
-            'headless': False,
-        }
+        self._network_profile = NetworkProfile(get_network_profile(self._config.get('network_profile')),
+                                               system, self._env)
+        self._har = HarArchive.for_environment(system, self._env, network_mode)
+        self._storage_state = StorageStateCache(ttl=get_storage_state_config().get('ttl', 3600))
+        self._user = user
+        # 由缓存登录态创建的context及其对应的用户
+        self._context_users: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._pool_settings = get_pool_config()
+        self._pool_size = self._pool_settings.get('size', 0) if pool_size is None else pool_size
+        self._pools = threading.local()
+        self._isolated_workers: IsolatedWorkers | None = None
+        self._isolated_lock = threading.Lock()
+        self._wait_settings = get_wait_config()
+        self._retry_policy = RetryPolicy.from_settings(self._wait_settings.get('retry'))
+        self._launch_profile = LaunchProfile(get_launch_profile(profile))
+        self._options = self._launch_profile.launch_options(browser_type)
+        if self._proxy_settings['enable_proxy']:
+            self._options['proxy'] = {
+                'server': f'{self._proxy_settings["host"]}:{self._proxy_settings["port"]}'
+            }
         self._stat_playwright()
 
     def _stat_playwright(self):
         self._playwright = sync_playwright().start()
+        self._playwright_thread = threading.get_ident()
+
+    @property
+    def pool_enabled(self) -> bool:
+        return self._pool_size > 0
 
     def get_page(self) -> Page:
+        leased = _leased_page.get()
+        if leased is not None:
+            return leased
         if self._page is None:
             return self.create_page()
         return self._page
 
-    def create_page(self) -> Page:
+    def _select_browser(self, playwright: Playwright) -> BrowserType:
         if self._browser_type == 'firefox':
-            self._page = self._init_page(self._playwright.firefox)
-        elif self._browser_type == 'webkit':
-            self._page = self._init_page(self._playwright.webkit)
-        else:
-            self._page = self._init_page(self._playwright.chromium)
+            return playwright.firefox
+        if self._browser_type == 'webkit':
+            return playwright.webkit
+        return playwright.chromium
+
+    def create_page(self) -> Page:
+        self._page = self._init_page(self._select_browser(self._playwright))
         return self._page
 
-    def _init_page(self, page_type, retries=3):
-        attempt = 0
-        if self._proxy_settings['enable_proxy']:
-            self._options['proxy'] = {
-                'server': f'{self._proxy_settings["host"]}:{self._proxy_settings["port"]}'
-            }
+    def _init_page(self, page_type):
         browser = page_type.launch(**self._options)
-        context = browser.new_context(no_viewport=True)
-        self.page = context.new_page()
-        print()
-        while attempt < retries:
+        authenticated = self._authenticated_options()
+        self._context = browser.new_context(**self._launch_profile.context_options(), **authenticated)
+        self._prepare_context(self._context, authenticated)
+        page = self._context.new_page()
+        return self._open(page)
+
+    def _authenticated_options(self) -> Dict[str, Any]:
+        """当前用户存在有效的登录态缓存时, 返回创建context所需的storage_state参数"""
+        if self._user is None:
+            return {}
+        path = self._storage_state.get(self._system, self._env, self._user)
+        return {'storage_state': path} if path else {}
+
+    def _prepare_context(self, context: BrowserContext, authenticated: Dict[str, Any]):
+        """
+        为新创建的context注册网络路由, HAR最后注册以保证最先匹配
+        Args:
+            authenticated: 创建context时使用的_authenticated_options, 带storage_state时记录该context的登录用户
+        """
+        if 'storage_state' in authenticated:
+            self._context_users[context] = self._user
+        self._launch_profile.start_tracing(context)
+        self._network_profile.apply(context)
+        self._har.apply(context)
+
+    @property
+    def launch_profile(self) -> LaunchProfile:
+        return self._launch_profile
+
+    @property
+    def start_url(self) -> str:
+        """当前系统和环境的首页地址"""
+        return f"{self._url_settings['url']}{self._url_settings.get('path', '')}"
+
+    def _open(self, page: Page) -> Page:
+        """打开首页并等待到wait_until指定的加载状态, 网络错误和超时按指数退避重试"""
+        url = self.start_url
+        retry(lambda: page.goto(url, timeout=self._wait_settings.get('goto_timeout', 20000),
+                                wait_until=self._wait_settings.get('wait_until', 'load')),
+              self._retry_policy, retry_on=(PlaywrightError,), description=f"打开网页 {url}")
+        return page
+
+    def settle(self):
+        """等待当前page的网络空闲, 最多等待settle_timeout毫秒, 用于关闭浏览器前让未完成的请求结束"""
+        if self._page is None:
+            return
+        try:
+            self._page.wait_for_load_state('networkidle', timeout=self._wait_settings.get('settle_timeout', 2000))
+        except PlaywrightTimeoutError:
+            pass
+
+    def login(self, flow: Callable[[], Any], user: str, check: Callable[[Page], bool] | None = None) -> Page:
+        """
+        以指定用户登录当前page, 优先复用缓存的登录态
+        当前context由该用户的登录态创建且check通过时直接返回, 否则作废缓存、执行登录流程并保存新的登录态,
+        之后新建的context都会以该用户的登录态启动
+        Args:
+            flow: 登录流程, 如 lambda: pre_application(refinance_my_home=None)
+            user: 登录用户, 与系统、环境一起作为缓存的key
+            check: 校验当前page是否处于登录状态, 为None时只依赖缓存的有效期
+
+        Returns:
+            Page: 已登录的page
+        """
+        page = self.get_page()
+        context = page.context
+        if self._context_users.get(context) == user:
+            if check is None or check(page):
+                return page
+            logger.warning(f"{user} 的登录态校验失败，重新登录")
+            self._storage_state.invalidate(self._system, self._env, user)
+            self._context_users.pop(context, None)
+            # 缓存的登录态还包括localStorage/sessionStorage中的token, 需要在站点页面内清除后重新打开
+            context.clear_cookies()
+            self._open(page)
+            page.evaluate("() => { localStorage.clear(); sessionStorage.clear(); }")
+            self._open(page)
+
+        flow()
+        if check is not None and not check(page):
+            raise AssertionError(f"{user} 执行登录流程后校验失败")
+        self._storage_state.save(context, self._system, self._env, user)
+        self._context_users[context] = user
+        self._user = user
+        return page
+
+    def get_pool(self) -> BrowserPool:
+        """
+        获取当前线程的浏览器池, 不存在时创建并预热
+        Returns:
+            BrowserPool: 当前线程独占的浏览器池
+        """
+        pool = getattr(self._pools, 'pool', None)
+        if pool is None:
+            pool = BrowserPool(self._select_browser, self._options,
+                               size=self._pool_size or 1,
+                               max_uses=self._pool_settings.get('max_uses', 50),
+                               context_options=self._launch_profile.context_options(),
+                               playwright=self._playwright if threading.get_ident() == self._playwright_thread else None)
+            self._pools.pool = pool
+        return pool
+
+    @contextmanager
+    def lease_page(self) -> Iterator[Page]:
+        """
+        从浏览器池租用一个隔离的context并打开首页, 期间get_page返回该page
+        Yields:
+            Page: 已打开首页的page
+        """
+        authenticated = self._authenticated_options()
+        with self.get_pool().lease(**authenticated) as context:
+            self._prepare_context(context, authenticated)
+            page = self._open(context.new_page())
+            token = _leased_page.set(page)
             try:
-                self.page.goto(f"{self._url_settings['url']}{self._url_settings['path']}", timeout=20000)
-                return self.page
-            except Exception:
-                attempt += 1
-                print(f"打开网页失败，开始第 {attempt}/{retries} 次重试")
-                if attempt >= retries:
-                    raise Exception("已达到最大重连次数")
-        return self.page
+                yield page
+            finally:
+                _leased_page.reset(token)
+                self._launch_profile.stop_tracing(context)
+
+    def submit_isolated(self, task: Callable[[Page], Any]) -> Future:
+        """
+        在工作线程中租用一个隔离的page执行task, 不阻塞当前线程
+        Args:
+            task: 接收已打开首页的page的可调用对象
+
+        Returns:
+            Future: task的执行结果
+        """
+        with self._isolated_lock:
+            if self._isolated_workers is None:
+                self._isolated_workers = IsolatedWorkers(self._pool_settings.get('isolated_workers', 4),
+                                                         on_exit=self.close_pool)
+
+        def run():
+            with self.lease_page() as page:
+                return task(page)
+
+        return self._isolated_workers.submit(run)
+
+    def close_pool(self):
+        """关闭当前线程的浏览器池"""
+        pool = getattr(self._pools, 'pool', None)
+        if pool is not None:
+            pool.close()
+            self._pools.pool = None
 
     def close(self):
+        if self._isolated_workers is not None:
+            self._isolated_workers.close()
+            self._isolated_workers = None
+        self.close_pool()
         if self._page:
             self._page.close()
             self._page = None
+        if self._context:
+            try:
+                self._launch_profile.stop_tracing(self._context)
+            finally:
+                # HAR录制和视频在context关闭时落盘, 保存trace失败时也要关闭
+                self._context.close()
+                self._context = None
         if self._playwright:
             self._playwright.stop()